@@ -1,18 +1,34 @@
 import functools
+import glob
+import os
 import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
 
-import psutil
-from pydbus import SystemBus
+if TYPE_CHECKING:
+    from .discharge import DischargeEstimate
+    from .noise import NoiseResult
+
+POWER_SUPPLY_ROOT = "/sys/class/power_supply"
+
+
+@functools.cache
+def _upower_battery():
+    """
+    The UPower battery proxy. Built once and kept around, setting up a bus connection per read is slow.
+    """
+    from dasbus.connection import SystemMessageBus
+
+    bus = SystemMessageBus()
+    return bus.get_proxy("org.freedesktop.UPower", "/org/freedesktop/UPower/devices/battery_BAT0")
 
 
 def _get_battery_energy() -> float:
     """
     Gets the current battery energy (in Wh) by querying the UPower D-Bus service.
     """
-    bus = SystemBus()
-
     try:
-        battery = bus.get("org.freedesktop.UPower", "/org/freedesktop/UPower/devices/battery_BAT0")
+        battery = _upower_battery()
     except Exception as e:
         print(f"Error accessing D-Bus object. Is this a laptop?\n    {e}")
         return 0.0
@@ -24,6 +40,8 @@ def _get_battery_level() -> float:
     """
     Returns the current battery level in percent
     """
+    import psutil
+
     battery = psutil.sensors_battery()
     if battery is None:
         print("No battery found or can't ready battery level...")
@@ -31,17 +49,145 @@ def _get_battery_level() -> float:
     return battery.percent
 
 
-def measure_battery_life(func):
+class SysfsBattery:
+    """
+    Reads a battery straight from /sys/class/power_supply/BAT*.
+
+    The attribute files are opened once and re-read with pread, which is a lot cheaper than
+    open/read/close per sample. Batteries that only report charge_now/current_now (µAh/µA) get
+    converted with voltage_now, the rest report energy_now/power_now (µWh/µW) directly.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.name = os.path.basename(path)
+        self._fds = {}
+        for attr in ("energy_now", "power_now", "charge_now", "current_now", "voltage_now"):
+            try:
+                self._fds[attr] = os.open(os.path.join(path, attr), os.O_RDONLY)
+            except OSError:
+                pass
+        if "voltage_now" not in self._fds and not {"energy_now", "power_now"} <= self._fds.keys():
+            self.close()
+            raise FileNotFoundError(f"{path} doesn't expose energy/power or voltage readings")
+
+    @classmethod
+    def find(cls, root: str = POWER_SUPPLY_ROOT) -> "SysfsBattery | None":
+        """The first battery under `root` we can read, or None on a desktop."""
+        for path in sorted(glob.glob(os.path.join(root, "BAT*"))):
+            try:
+                return cls(path)
+            except OSError:
+                continue
+        return None
+
+    def _read(self, attr: str) -> float | None:
+        fd = self._fds.get(attr)
+        if fd is None:
+            return None
+        try:
+            return int(os.pread(fd, 32, 0))
+        except (OSError, ValueError):
+            # some firmware returns ENODEV while the battery is recalibrating
+            return None
+
+    def read(self) -> tuple[float, float, float]:
+        """Returns (energy in Wh, power in W, voltage in V). Anything the battery doesn't report is nan."""
+        voltage = self._read("voltage_now")
+        energy = self._read("energy_now")
+        power = self._read("power_now")
+        if energy is None and voltage is not None and (charge := self._read("charge_now")) is not None:
+            energy = charge * voltage / 1e6
+        if power is None and voltage is not None and (current := self._read("current_now")) is not None:
+            power = abs(current) * voltage / 1e6
+        nan = float("nan")
+        return (
+            energy / 1e6 if energy is not None else nan,
+            power / 1e6 if power is not None else nan,
+            voltage / 1e6 if voltage is not None else nan,
+        )
+
+    def close(self) -> None:
+        for fd in self._fds.values():
+            os.close(fd)
+        self._fds = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+@dataclass
+class BatteryMeasurement:
+    percent: float  # battery level spent
+    energy_wh: float  # UPower energy difference, in the battery's coarse steps
+    integrated_wh: float | None  # sampled power integrated over the run, if there's a sysfs battery
+    samples: int
+    elapsed: float
+    discharge: "DischargeEstimate | None" = None  # fitted Wh/hour with its CI, if there's a sysfs battery
+    noise: "NoiseResult | None" = None  # what every other process did meanwhile
+
+    @property
+    def best_wh(self) -> float:
+        return self.integrated_wh if self.integrated_wh is not None else self.energy_wh
+
+
+def measure_battery_life(
+    func=None,
+    *,
+    rate: float = 10.0,
+    target_ci: float | None = None,
+    min_duration: float = 60.0,
+    noise_threshold: float | None = 0.1,
+):
     """
     Decorator that tells us how much battery we spend during stuff
+    If there's a battery in sysfs, it also samples power at `rate` Hz and integrates it, and fits the
+    discharge rate with a confidence interval.
+    With `target_ci` (relative CI half width, e.g. 0.05), `func` gets a `should_stop` callable that turns
+    true once the discharge rate is known that well, so it can end early.
+    Every other process is sampled too; the run is flagged when their share of the CPU time goes over
+    `noise_threshold` (None to skip that).
+    The numbers of the latest call are kept on `wrapper.last_measurement`.
     """
+    if func is None:
+        return functools.partial(
+            measure_battery_life,
+            rate=rate,
+            target_ci=target_ci,
+            min_duration=min_duration,
+            noise_threshold=noise_threshold,
+        )
 
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
+        from .discharge import AdaptiveStop, estimate_discharge
+        from .noise import NoiseSampler
+        from .sampler import BatterySampler
+
+        sysfs_battery = SysfsBattery.find()
+        sampler = BatterySampler(sysfs_battery, rate=rate) if sysfs_battery is not None else None
+        if target_ci is not None:
+            if sampler is None:
+                raise RuntimeError("stopping on a confidence interval needs a battery in /sys/class/power_supply")
+            kwargs["should_stop"] = AdaptiveStop(sampler, target=target_ci, min_duration=min_duration)
         initial_time = time.time()
         initial_battery = _get_battery_level()
         initial_energy = _get_battery_energy()
-        result = func(*args, **kwargs)
+        noise = NoiseSampler(threshold=noise_threshold) if noise_threshold is not None else None
+        if sampler is not None:
+            sampler.start()
+        if noise is not None:
+            noise.start()
+        try:
+            result = func(*args, **kwargs)
+        finally:
+            noise_result = noise.stop() if noise is not None else None
+            if sampler is not None:
+                sampler.stop()
+                sysfs_battery.close()
         final_time = time.time()
         final_battery = _get_battery_level()
         final_energy = _get_battery_energy()
@@ -50,7 +196,28 @@ def measure_battery_life(func):
         print(f"Battery life spent: {initial_battery - final_battery:.1f}%")
         elapsed_time = final_time - initial_time
         print(f"Power spent: {initial_energy - final_energy:.1f}Wh")
+        discharge = None
+        if sampler is not None:
+            print(f"Power spent (integrated): {sampler.integrated_wh:.3f}Wh over {sampler.samples} samples")
+            data = sampler.buffer.snapshot()
+            discharge = estimate_discharge(data["t"], data["energy_wh"])
+            if discharge is not None:
+                print(discharge.report())
         print(f"Elapsed time: {elapsed_time:.1f}")
+        measurement = BatteryMeasurement(
+            percent=initial_battery - final_battery,
+            energy_wh=initial_energy - final_energy,
+            integrated_wh=sampler.integrated_wh if sampler is not None else None,
+            samples=sampler.samples if sampler is not None else 0,
+            elapsed=elapsed_time,
+            discharge=discharge,
+            noise=noise_result,
+        )
+        if noise_result is not None:
+            noise_result.energy_wh = measurement.best_wh
+            print(noise_result.report())
+        wrapper.last_measurement = measurement
         return result
 
+    wrapper.last_measurement = None
     return wrapper
@@ -0,0 +1,194 @@
+"""
+Per-machine quantum sizes.
+
+The governor's quanta are fixed amounts of work, so how long one takes depends on the machine: tens of
+microseconds on a fast desktop, milliseconds on an old laptop. That sets how finely a duty cycle can be
+sliced, so the same `-l 10` behaves differently across machines. Calibration finds, for each workload, the
+size that makes one quantum take about `target_us`.
+
+Results are cached on disk, keyed by what would change the answer: CPU model, core count, kernel release and
+batben version. An entry for this CPU with an older kernel or batben is stale and gets dropped on the next
+save, as does anything older than `MAX_AGE`. Entries for other machines (a shared home directory) are kept.
+"""
+
+import functools
+import json
+import os
+import statistics
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Callable
+
+from . import __version__, system, workload
+
+MAX_AGE = 30 * 24 * 3600  # firmware and microcode updates don't bump anything in the key
+
+
+@dataclass(frozen=True)
+class Sizable:
+    """A governor quantum with one size parameter that its work scales with."""
+
+    param: str
+    func: Callable[..., int]
+    default: int
+    low: int
+    high: int
+
+    def quantum(self, size: int) -> Callable[[], int]:
+        # a partial of a module-level function pickles, so it can go to the governor's workers
+        return functools.partial(self.func, **{self.param: size})
+
+
+SIZABLE = {
+    "cpu": Sizable("span", workload.cpu_quantum, 200, 10, 1_000_000),
+    "memory": Sizable("size_kb", workload.mem_quantum, 256, 4, 1 << 20),
+    "io": Sizable("block_kb", workload.io_quantum, 4, 4, 1024),
+}
+
+
+def default_path() -> str:
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(cache_home, "batben", "calibration.json")
+
+
+def machine_key(cpuinfo: str = "/proc/cpuinfo") -> dict:
+    return {
+        "cpu": system.cpu_model(cpuinfo),
+        "cores": os.cpu_count() or 1,
+        "kernel": system.kernel_release(),
+        "batben": __version__,
+    }
+
+
+def time_quantum(quantum: Callable[[], int], runs: int = 20, clock=time.perf_counter_ns) -> float:
+    """Median wall time of one quantum in microseconds, after a warmup call (which allocates buffers)."""
+    quantum()
+    timings = []
+    for _ in range(runs):
+        start = clock()
+        quantum()
+        timings.append((clock() - start) / 1e3)
+    return statistics.median(timings)
+
+
+def calibrate_size(sizable: Sizable, target_us: float, rounds: int = 6, timer=time_quantum) -> tuple[int, float]:
+    """
+    Scales the size until a quantum takes `target_us` (within 10%), assuming time is roughly proportional to
+    size. Returns (size, measured us). Sizes are clamped to the workload's limits: an fsync doesn't get
+    cheaper with smaller blocks.
+    """
+    size = sizable.default
+    us = timer(sizable.quantum(size))
+    for _ in range(rounds):
+        if us <= 0 or abs(us - target_us) <= 0.1 * target_us:
+            break
+        new = min(sizable.high, max(sizable.low, round(size * target_us / us)))
+        if new == size:
+            break
+        size = new
+        us = timer(sizable.quantum(size))
+    return size, us
+
+
+@dataclass
+class Calibration:
+    machine: dict
+    target_us: float
+    sizes: dict[str, int] = field(default_factory=dict)
+    quantum_us: dict[str, float] = field(default_factory=dict)
+    created: float = 0.0
+    cached: bool = False
+
+    def quantum(self, name: str) -> Callable[[], int]:
+        """The workload's quantum at the calibrated size (the default size if it wasn't calibrated)."""
+        sizable = SIZABLE[name]
+        return sizable.quantum(self.sizes.get(name, sizable.default))
+
+    def report(self) -> str:
+        source = "cached" if self.cached else "calibrated"
+        lines = [f"quantum sizes for {self.target_us:.0f}us ({source}, {self.machine['cpu']}):"]
+        for name, size in self.sizes.items():
+            setting = f"{SIZABLE[name].param}={size}"
+            lines.append(f"  {name:<8} {setting:<16} {self.quantum_us.get(name, 0):>6.0f}us")
+        return "\n".join(lines)
+
+
+def calibrate(
+    target_us: float = 1000.0, names=None, machine: dict | None = None, timer=time_quantum, clock=time.time
+) -> Calibration:
+    if target_us <= 0:
+        raise ValueError("target quantum time must be positive")
+    result = Calibration(machine or machine_key(), target_us, created=clock())
+    for name in names or SIZABLE:
+        result.sizes[name], result.quantum_us[name] = calibrate_size(SIZABLE[name], target_us, timer=timer)
+    return result
+
+
+def _read_entries(path: str) -> list[dict]:
+    try:
+        with open(path) as f:
+            entries = json.load(f).get("entries", [])
+    except (OSError, ValueError, AttributeError):
+        return []
+    return [e for e in entries if isinstance(e, dict) and isinstance(e.get("machine"), dict)]
+
+
+def _stale(entry: dict, machine: dict, now: float, max_age: float) -> bool:
+    """Too old, or this same CPU under a different kernel or batben."""
+    if now - entry.get("created", 0) > max_age:
+        return True
+    same_cpu = all(entry["machine"].get(k) == machine[k] for k in ("cpu", "cores"))
+    return same_cpu and entry["machine"] != machine
+
+
+def load_calibration(
+    target_us: float, path: str | None = None, machine: dict | None = None, max_age: float = MAX_AGE, clock=time.time
+) -> Calibration | None:
+    """The cached calibration for this machine and target, None if there's no fresh one."""
+    machine = machine or machine_key()
+    now = clock()
+    for entry in _read_entries(path or default_path()):
+        if entry["machine"] == machine and entry.get("target_us") == target_us:
+            if now - entry.get("created", 0) > max_age or set(entry.get("sizes", {})) - set(SIZABLE):
+                return None
+            return Calibration(
+                machine, target_us, entry["sizes"], entry.get("quantum_us", {}), entry["created"], cached=True
+            )
+    return None
+
+
+def save_calibration(calibration: Calibration, path: str | None = None, max_age: float = MAX_AGE) -> None:
+    """Writes the entry, replacing any for the same machine and target and dropping stale ones."""
+    path = path or default_path()
+    machine, now = calibration.machine, calibration.created
+    entries = [
+        e
+        for e in _read_entries(path)
+        if not _stale(e, machine, now, max_age)
+        and not (e["machine"] == machine and e.get("target_us") == calibration.target_us)
+    ]
+    entry = asdict(calibration)
+    del entry["cached"]
+    entries.append(entry)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump({"entries": entries}, f, indent=1)
+    os.replace(tmp, path)
+
+
+def get_calibration(
+    target_us: float = 1000.0, path: str | None = None, refresh: bool = False, timer=time_quantum, clock=time.time
+) -> Calibration:
+    """The cached calibration if there is a fresh one, otherwise calibrates now and caches the result."""
+    machine = machine_key()
+    if not refresh:
+        cached = load_calibration(target_us, path, machine, clock=clock)
+        if cached is not None:
+            return cached
+    result = calibrate(target_us, machine=machine, timer=timer, clock=clock)
+    try:
+        save_calibration(result, path)
+    except OSError:
+        pass  # a read-only home shouldn't stop the run, it just calibrates every time
+    return result
@@ -1,6 +1,7 @@
 # src/batben/cli.py
 
-import sys
+import contextlib
+
 import click
 
 from . import __version__
@@ -9,10 +10,57 @@ from . import __version__
 
 @click.group(context_settings={"help_option_names": ["-h", "--help"]})
 @click.version_option(__version__, "-V", "--version", prog_name="batben")
-def cli():
+@click.pass_context
+def cli(ctx: click.Context):
     """Battery benchmarking and sleep/wake helper."""
     # Top-level command group; subcommands below.
-    pass
+    # Only stdlib here: every command pays for what the group imports, and so does the measurement.
+    from .overhead import OverheadMeter
+
+    ctx.obj = OverheadMeter()
+
+
+def _overhead(in_process: bool = False):
+    """
+    Prints what batben itself has cost so far and returns it (None outside the cli group). `in_process` for
+    benchmarks that ran in this process: their cost can't be separated from batben's, only startup counts.
+    """
+    meter = click.get_current_context().find_root().obj
+    if meter is None:
+        return None
+    result = meter.stop(in_process)
+    click.echo(result.report())
+    return result
+
+
+def store_options(func):
+    """--profile, --save/--no-save and --store, for every command that saves its result."""
+    func = click.option(
+        "--store",
+        "store_path",
+        type=click.Path(dir_okay=False),
+        default=None,
+        help="Results database [default: ~/.local/share/batben/results.sqlite].",
+    )(func)
+    func = click.option("--save/--no-save", default=True, show_default=True, help="Save the result to the store.")(func)
+    func = click.option("-p", "--profile", default=None, help="Power profile label [default: detected].")(func)
+    return func
+
+
+def _save_result(store_path: str | None, profile: str | None, workload: str, command: str, metrics: dict) -> None:
+    from . import system
+    from .store import ResultStore
+
+    with ResultStore(store_path) as store:
+        run_id = store.add_run(
+            metrics,
+            machine=system.machine_name(),
+            profile=profile or system.detect_profile(),
+            workload=workload,
+            kernel=system.kernel_release(),
+            command=command,
+        )
+        click.echo(f"saved run #{run_id} to {store.path}")
 
 
 @cli.command("bench", help="Run a simple workload benchmark and report battery impact.")
@@ -23,7 +71,7 @@ def cli():
     type=int,
     default=30,
     show_default=True,
-    help="Run benchmark for N seconds.",
+    help="Run benchmark for N seconds (at most N with --target-ci).",
 )
 @click.option(
     "-w",
@@ -33,8 +81,729 @@ def cli():
     show_default=True,
     help="Which workload pattern to run.",
 )
-def bench_cmd(duration: int, workload: str) -> None:
+@click.option(
+    "-k",
+    "--kernel",
+    "kernel_names",
+    multiple=True,
+    help="Run these kernels instead of --workload, one after the other (repeatable, 'all' for every one). "
+    "See `batben kernels`.",
+)
+@click.option(
+    "-l",
+    "--target-load",
+    type=click.FloatRange(0, 100, min_open=True),
+    default=10.0,
+    show_default=True,
+    help="System-wide CPU load (percent) the governor holds during the run.",
+)
+@click.option(
+    "--battery/--no-battery",
+    default=True,
+    show_default=True,
+    help="Measure battery drain around the run.",
+)
+@click.option(
+    "--sample-rate",
+    type=click.FloatRange(0, min_open=True),
+    default=10.0,
+    show_default=True,
+    help="Battery sampling rate in Hz.",
+)
+@click.option(
+    "--calibrate/--no-calibrate",
+    default=True,
+    show_default=True,
+    help="Size the cpu/memory/io quanta for this machine (cached, see `batben calibrate`) instead of fixed sizes.",
+)
+@click.option(
+    "--quantum-us",
+    type=click.FloatRange(0, min_open=True),
+    default=1000.0,
+    show_default=True,
+    help="Time one calibrated quantum should take, in microseconds.",
+)
+@click.option(
+    "--window",
+    type=click.FloatRange(1),
+    default=30.0,
+    show_default=True,
+    help="Window length in seconds for the sustained-performance curve (needs a run of three windows or more).",
+)
+@click.option(
+    "--noise-threshold",
+    type=click.FloatRange(0, 100),
+    default=10.0,
+    show_default=True,
+    help="Flag the run when other processes use more than this percent of the CPU time spent during it.",
+)
+@click.option(
+    "--isolate/--no-isolate",
+    default=False,
+    show_default=True,
+    help="Pin the run, raise its priority, drop the page cache if allowed, and wait for the machine to settle first.",
+)
+@click.option(
+    "--pin",
+    default="all",
+    show_default=True,
+    help="With --isolate: CPUs to run on, 'performance' or 'efficiency' cores on a hybrid CPU, or a list like 2-5.",
+)
+@click.option(
+    "--nice",
+    type=click.IntRange(-20, 19),
+    default=-10,
+    show_default=True,
+    help="With --isolate: nice value for the run (below 0 needs privileges).",
+)
+@click.option(
+    "--sched",
+    type=click.Choice(["other", "batch", "fifo", "rr"]),
+    default="other",
+    show_default=True,
+    help="With --isolate: scheduling policy for the run (fifo and rr need privileges).",
+)
+@click.option(
+    "--settle-timeout",
+    type=click.FloatRange(0),
+    default=300.0,
+    show_default=True,
+    help="With --isolate: longest wait, in seconds, for the system to go idle and the battery draw to settle.",
+)
+@click.option(
+    "--sandbox/--no-sandbox",
+    default=False,
+    show_default=True,
+    help="Run the workload in a process and cgroup of its own and report exactly what it used.",
+)
+@click.option(
+    "--cgroup",
+    "cgroup_path",
+    type=click.Path(exists=True, file_okay=False),
+    default=None,
+    help="With --sandbox: a delegated cgroup v2 directory to create the run's cgroup in "
+    "[default: a systemd scope, or getrusage if there's none].",
+)
+@click.option(
+    "--cpu-max",
+    type=click.FloatRange(0, min_open=True),
+    default=None,
+    help="With --sandbox: cap the workload at this many CPUs' worth of time (cgroup cpu.max).",
+)
+@click.option(
+    "--target-ci",
+    type=click.FloatRange(0, 100, min_open=True),
+    default=None,
+    help="Stop once the Wh/hour estimate is within this many percent (95% CI), checked after the first minute.",
+)
+@click.option(
+    "--record",
+    "record_path",
+    type=click.Path(dir_okay=False, writable=True),
+    default=None,
+    help="Record battery/CPU telemetry and workload events to this file.",
+)
+@click.option(
+    "--trace",
+    "trace_path",
+    type=click.Path(exists=True, dir_okay=False),
+    default=None,
+    help="Trace to replay for the dev workload (see `batben trace record`).",
+)
+@store_options
+def bench_cmd(
+    duration: int,
+    workload: str,
+    kernel_names: tuple[str, ...],
+    target_load: float,
+    battery: bool,
+    sample_rate: float,
+    calibrate: bool,
+    quantum_us: float,
+    window: float,
+    noise_threshold: float,
+    isolate: bool,
+    pin: str,
+    nice: int,
+    sched: str,
+    settle_timeout: float,
+    sandbox: bool,
+    cgroup_path: str | None,
+    cpu_max: float | None,
+    target_ci: float | None,
+    record_path: str | None,
+    trace_path: str | None,
+    profile: str | None,
+    save: bool,
+    store_path: str | None,
+) -> None:
     """Entry point for the benchmark command."""
+    from . import governor
+    from . import workload as workload_mod
+
+    quanta = {
+        "quick": workload_mod.cpu_quantum,
+        "cpu": workload_mod.cpu_quantum,
+        "memory": workload_mod.mem_quantum,
+        "io": workload_mod.io_quantum,
+    }
+    calibration = None
+    pinned = None
+    if isolate:
+        from .isolation import resolve_cpus
+
+        try:
+            pinned = resolve_cpus(pin)
+        except ValueError as e:
+            raise click.UsageError(f"--pin: {e}") from e
+    if not sandbox and (cgroup_path is not None or cpu_max is not None):
+        raise click.UsageError("--cgroup and --cpu-max only apply with --sandbox")
+    if target_ci is not None:
+        from .battery import SysfsBattery
+
+        if sandbox:
+            raise click.UsageError("--target-ci stops the run from this process, it can't reach into --sandbox")
+        if not battery:
+            raise click.UsageError("--target-ci needs the battery measurement, drop --no-battery")
+        probe = SysfsBattery.find()
+        if probe is None:
+            raise click.UsageError("--target-ci needs a battery in /sys/class/power_supply")
+        probe.close()
+    if kernel_names:
+        from . import kernels
+
+        registry = kernels.available_kernels()
+        names = list(registry) if "all" in kernel_names else list(dict.fromkeys(kernel_names))
+        unknown = [name for name in names if name not in registry]
+        if unknown:
+            raise click.UsageError(f"unknown kernel(s): {', '.join(unknown)}; see `batben kernels`")
+        runner = kernels.run_kernels
+        kernel = [registry[name] for name in names]
+        # the corpus fingerprint is part of the name, so compare never mixes runs on different inputs
+        workload = f"kernels:{'+'.join(names)}@{kernels.corpus_fingerprint()}"
+    elif workload.lower() == "dev":
+        if target_ci is not None:
+            raise click.UsageError("a trace replay has a fixed length, --target-ci doesn't apply to the dev workload")
+        if trace_path is None:
+            raise click.UsageError("the dev workload replays a trace, pass one with --trace")
+        from . import trace
+
+        # the trace sets the load and the length, -t and -l don't apply
+        def runner(kernel, target, duration):
+            return trace.replay_trace(trace_path)
+
+        kernel = None
+    else:
+        runner = governor.run_governed
+        kernel = quanta[workload.lower()]
+        if calibrate:
+            from .calibration import get_calibration
+
+            calibration = get_calibration(quantum_us)
+            click.echo(calibration.report())
+            quantum_name = "cpu" if workload.lower() == "quick" else workload.lower()
+            kernel = calibration.quantum(quantum_name)
+
+    if sandbox:
+        from . import sandbox as sandbox_mod
+
+        try:
+            backend = sandbox_mod.find_backend(cgroup_path, cpu_max)
+        except sandbox_mod.SandboxError as e:
+            raise click.UsageError(f"--cgroup: {e}") from e
+        if backend is None:
+            capped = ", --cpu-max can't be enforced" if cpu_max is not None else ""
+            click.echo(f"no cgroup v2 backend, accounting the workload with getrusage{capped}")
+        runner = sandbox_mod.sandboxed(runner, backend=backend)
+
+    from .rapl import measure_energy
+
+    run = metered = measure_energy(runner)
+    if battery:
+        from .battery import measure_battery_life
+
+        run = measure_battery_life(
+            run,
+            rate=sample_rate,
+            target_ci=target_ci / 100 if target_ci else None,
+            noise_threshold=noise_threshold / 100,
+        )
+
+    from .cpufreq import CpuStateCollector
+    from .thermal import ThermalCollector, sustained_performance
+
+    with contextlib.ExitStack() as stack:
+        recorder = telemetry = isolation = None
+        if isolate:
+            from .battery import SysfsBattery
+            from .isolation import Isolation, wait_for_quiet
+
+            isolation = stack.enter_context(Isolation(cpus=pinned, nice=nice, policy=sched))
+            click.echo(f"waiting up to {settle_timeout:.0f}s for the system to settle...")
+            quiet_battery = SysfsBattery.find()
+            try:
+                isolation.quiet = wait_for_quiet(battery=quiet_battery, timeout=settle_timeout)
+            finally:
+                if quiet_battery is not None:
+                    quiet_battery.close()
+            click.echo(isolation.report())
+        cpu_states = stack.enter_context(CpuStateCollector(rate=sample_rate))
+        thermal = stack.enter_context(ThermalCollector())
+        if record_path is not None:
+            from . import system
+            from .battery import SysfsBattery
+            from .recording import Recorder
+            from .sampler import TELEMETRY_COLUMNS, TelemetrySampler
+
+            meta = {
+                "command": "bench",
+                "workload": workload,
+                "target_load": target_load,
+                "duration": duration,
+                "profile": profile or system.detect_profile(),
+                "machine": system.machine_name(),
+            }
+            if isolation is not None:
+                meta["isolation"] = isolation.applied
+            recorder = stack.enter_context(
+                Recorder(record_path, TELEMETRY_COLUMNS, meta={**meta, "batben": __version__})
+            )
+            sysfs_battery = SysfsBattery.find()
+            if sysfs_battery is not None:
+                stack.callback(sysfs_battery.close)
+            telemetry = TelemetrySampler(
+                recorder, rate=sample_rate, battery=sysfs_battery, utilization=governor.CpuUtilization()
+            )
+            telemetry.start()
+            stack.callback(telemetry.stop)
+            recorder.event("bench-start", **meta)
+
+        cpu_states.start()
+        thermal.start()
+        try:
+            result = run(kernel, target=target_load, duration=duration)
+        finally:
+            cpu_state_result = cpu_states.stop() if cpu_states else None
+            thermal_result = thermal.stop() if thermal else None
+
+        if recorder is not None:
+            recorder.event("bench-end", achieved_load=result.achieved, events=result.events, quanta=result.quanta)
+
+    click.echo(result.report())
+    usage = runner.last_usage if sandbox else None
+    if usage is not None:
+        click.echo(usage.report())
+    if cpu_state_result is not None:
+        click.echo(cpu_state_result.report())
+    # only governed runs keep a timeline; kernels and trace replays are several runs or none
+    sustained = sustained_performance(result.timeline, window, thermal_result) if hasattr(result, "timeline") else None
+    if sustained is not None:
+        click.echo(sustained.report())
+    elif thermal_result is not None:
+        click.echo(thermal_result.report())
+    overhead = _overhead()
+    if telemetry is not None:
+        click.echo(f"recorded {telemetry.samples} samples to {record_path}")
+
+    if save:
+        metrics = {
+            "score": result.events_per_second,
+            "events": result.events,
+            "duration": result.duration,
+            "achieved_load": result.achieved,
+        }
+        if cpu_state_result is not None:
+            metrics.update(cpu_state_result.metrics())
+        if sustained is not None:
+            metrics.update(sustained.metrics())
+        elif thermal_result is not None:
+            metrics.update(thermal_result.metrics())
+        if overhead is not None:
+            metrics.update(overhead.metrics())
+        if hasattr(result, "metrics"):
+            metrics.update(result.metrics())
+        if isolation is not None:
+            metrics.update(isolation.metrics())
+        if usage is not None:
+            metrics.update(usage.metrics())
+        if calibration is not None:
+            metrics["quantum_size"] = calibration.sizes[quantum_name]
+        measurement = getattr(run, "last_measurement", None)
+        if measurement is not None:
+            metrics["energy_wh"] = measurement.best_wh
+            metrics["battery_percent"] = measurement.percent
+            if measurement.discharge is not None:
+                metrics.update(measurement.discharge.metrics())
+            if measurement.noise is not None:
+                metrics.update(measurement.noise.metrics())
+        energy = metered.last_energy
+        if energy is not None:
+            metrics.update({f"rapl_{domain}_j": joules for domain, joules in energy.joules.items()})
+            package = next((d for d in energy.joules if d.startswith("package") and "/" not in d), None)
+            if package is not None:
+                metrics["events_per_joule"] = energy.events_per_joule(package)
+        _save_result(store_path, profile, workload.lower(), "bench", metrics)
+
+
+@cli.command("calibrate", help="Show the cached quantum sizes for this machine, calibrating if there are none.")
+@click.option(
+    "--quantum-us",
+    type=click.FloatRange(0, min_open=True),
+    default=1000.0,
+    show_default=True,
+    help="Time one quantum should take, in microseconds.",
+)
+@click.option("--refresh", is_flag=True, help="Calibrate again even if the cache has an entry.")
+def calibrate_cmd(quantum_us: float, refresh: bool) -> None:
+    from . import calibration
+
+    click.echo(calibration.get_calibration(quantum_us, refresh=refresh).report())
+    click.echo(f"cache: {calibration.default_path()}")
+
+
+@cli.command("kernels", help="List the workload kernels bench can run with -k.")
+def kernels_cmd() -> None:
+    from . import kernels
+
+    fingerprint = kernels.corpus_fingerprint()
+    click.echo(f"corpus: {len(kernels.corpus())} files, fingerprint {fingerprint}")
+    click.echo(f"runs are stored as workload kernels:<name>+...@{fingerprint}")
+    for name, kernel in kernels.available_kernels().items():
+        click.echo(f"  {name:<12} {kernel.unit:<8} {kernel.description}")
+
+
+@cli.group("suite", help="Run one of the flat-out benchmark suites.")
+def suite_group() -> None:
+    pass
+
+
+@suite_group.command("cpu", help="Single-core and all-core CPU scores.")
+@click.option("-j", "--workers", type=click.IntRange(1), default=None, help="Worker processes [default: core count].")
+@click.option("-r", "--repeats", type=click.IntRange(1), default=3, show_default=True, help="Rounds per kernel.")
+def suite_cpu_cmd(workers: int | None, repeats: int) -> None:
+    from . import cpu
+
+    click.echo(cpu.run_cpu_suite(workers=workers, repeats=repeats).report())
+    _overhead()
+
+
+@suite_group.command("kernels", help="Every workload kernel flat out, repeated trials with a confidence interval.")
+@click.option(
+    "-k", "--kernel", "kernel_names", multiple=True, help="Kernel(s) to run [default: all]. See `batben kernels`."
+)
+@click.option("--quanta", type=click.IntRange(1), default=100, show_default=True, help="Quanta per trial.")
+@click.option("--warmup", type=click.IntRange(0), default=1, show_default=True, help="Untimed trials first.")
+@click.option("--trials", type=click.IntRange(1), default=5, show_default=True, help="Timed trials per kernel.")
+def suite_kernels_cmd(kernel_names, quanta: int, warmup: int, trials: int) -> None:
+    from . import kernels
+
+    registry = kernels.available_kernels()
+    names = list(dict.fromkeys(kernel_names)) or list(registry)
+    unknown = [name for name in names if name not in registry]
+    if unknown:
+        raise click.UsageError(f"unknown kernel(s): {', '.join(unknown)}; see `batben kernels`")
+    click.echo(f"corpus {kernels.corpus_fingerprint()}, {quanta} quanta per trial")
+    for result in kernels.benchmark_kernels([registry[name] for name in names], quanta, warmup, trials):
+        click.echo(result.report())
+    _overhead(in_process=True)
+
+
+@suite_group.command("memory", help="Memory bandwidth (STREAM) and latency (pointer chase) per cache level.")
+@click.option("-r", "--repeats", type=click.IntRange(1), default=5, show_default=True, help="Timings per kernel.")
+def suite_memory_cmd(repeats: int) -> None:
+    from . import memory
+
+    click.echo(memory.run_memory_suite(repeats=repeats).report())
+    _overhead(in_process=True)
+
+
+@suite_group.command("matmul", help="Matrix multiply GFLOPS across sizes and BLAS thread counts.")
+@click.option(
+    "-s", "--size", "sizes", type=click.IntRange(16), multiple=True, help="Matrix size(s) [default: 256 512 1024]."
+)
+@click.option(
+    "-j", "--threads", type=click.IntRange(1), multiple=True, help="BLAS thread count(s) [default: 1, 2, 4... cores]."
+)
+@click.option("--min-time", type=click.FloatRange(0), default=0.2, show_default=True, help="Seconds per point.")
+def suite_matmul_cmd(sizes, threads, min_time) -> None:
+    from . import matmul
+
+    result = matmul.run_matmul(sizes or (256, 512, 1024), threads or None, min_time=min_time)
+    click.echo(result.report())
+    _overhead(in_process=True)
+
+
+@suite_group.command("io", help="Storage throughput, IOPS and latency percentiles.")
+@click.option("--pattern", type=click.Choice(["seq", "rand"]), default=None, help="Access pattern [default: matrix].")
+@click.option("--op", type=click.Choice(["read", "write"]), default="read", show_default=True)
+@click.option("--block-size", type=click.IntRange(512), default=4096, show_default=True, help="Bytes per request.")
+@click.option("--queue-depth", type=click.IntRange(1), default=1, show_default=True, help="Requests in flight.")
+@click.option("--mode", type=click.Choice(["buffered", "direct", "mmap"]), default="buffered", show_default=True)
+@click.option("--fsync", type=click.Choice(["none", "end", "every"]), default="end", show_default=True)
+@click.option(
+    "--size", "size_mb", type=click.IntRange(1), default=64, show_default=True, help="Scratch file size (MB)."
+)
+@click.option(
+    "--dir",
+    "target_dir",
+    type=click.Path(exists=True, file_okay=False, writable=True),
+    default=None,
+    help="Where to put the scratch file [default: system temp dir].",
+)
+def suite_io_cmd(pattern, op, block_size, queue_depth, mode, fsync, size_mb, target_dir) -> None:
+    """Without --pattern, runs the default matrix (seq 1M read/write, random 4K at QD1 and QD32)."""
+    from . import storage
+
+    common = dict(mode=mode, fsync=fsync, file_size=size_mb << 20, target_dir=target_dir)
+    try:
+        if pattern is None:
+            jobs = storage.default_matrix(**common)
+        else:
+            jobs = [storage.IoJob(pattern=pattern, op=op, block_size=block_size, queue_depth=queue_depth, **common)]
+    except ValueError as e:
+        raise click.UsageError(str(e)) from e
+    for job in jobs:
+        try:
+            result = storage.run_io_job(job)
+        except OSError as e:
+            raise click.ClickException(f"{job.describe()}: {e.strerror or e}") from e
+        click.echo(result.report())
+    _overhead(in_process=True)
+
+
+@suite_group.command("net", help="HTTP requests against a local server, pooled vs cold connections.")
+@click.option("-n", "--requests", type=click.IntRange(1), default=2000, show_default=True)
+@click.option("-c", "--concurrency", type=click.IntRange(1), default=8, show_default=True)
+@click.option("--payload", type=click.IntRange(0), default=1024, show_default=True, help="Response size in bytes.")
+@click.option(
+    "--connections",
+    type=click.Choice(["both", "pooled", "cold"]),
+    default="both",
+    show_default=True,
+    help="Keep-alive pooling, a fresh connect per request, or one run of each.",
+)
+def suite_net_cmd(requests: int, concurrency: int, payload: int, connections: str) -> None:
+    from . import network
+
+    for pooled in {"both": (True, False), "pooled": (True,), "cold": (False,)}[connections]:
+        click.echo(network.run_network(requests, concurrency, payload, pooled).report())
+    _overhead(in_process=True)
+
+
+@cli.command("latency", help="Timer wakeup latency under background load, or burst completion after idle.")
+@click.option(
+    "-t", "--time", "duration", type=click.IntRange(1), default=30, show_default=True, help="Seconds to probe."
+)
+@click.option(
+    "-l",
+    "--target-load",
+    type=click.FloatRange(0, 100),
+    default=10.0,
+    show_default=True,
+    help="Background CPU load (percent) from the governor, 0 for none.",
+)
+@click.option(
+    "--interval", "interval_us", type=click.IntRange(50), default=1000, show_default=True, help="Timer period (us)."
+)
+@click.option("--timers", type=click.IntRange(1), default=4, show_default=True, help="Timers per mechanism.")
+@click.option("--burst", is_flag=True, help="Time a short burst of work after idle instead.")
+@click.option("--idle", type=click.FloatRange(0), default=0.5, show_default=True, help="Idle before each burst (s).")
+@click.option("--repeats", type=click.IntRange(1), default=20, show_default=True, help="Bursts to time.")
+@store_options
+def latency_cmd(duration, target_load, interval_us, timers, burst, idle, repeats, profile, save, store_path) -> None:
+    from . import latency
+
+    if burst:
+        result = latency.burst_latency(idle=idle, repeats=repeats)
+        workload = "burst"
+    else:
+        probe = latency.LatencyProbe(interval=interval_us / 1e6, timers=timers)
+        probe.start()
+        try:
+            if target_load > 0:
+                from . import governor
+                from .workload import cpu_quantum
+
+                governor.run_governed(cpu_quantum, target=target_load, duration=duration)
+            else:
+                import time
+
+                time.sleep(duration)
+        finally:
+            result = probe.stop()
+        workload = "latency"
+    click.echo(result.report())
+    overhead = _overhead(in_process=True)
+
+    if save:
+        metrics = result.metrics()
+        if not burst:
+            metrics["target_load"] = target_load
+        if overhead is not None:
+            metrics.update(overhead.metrics())
+        _save_result(store_path, profile, workload, "latency", metrics)
+
+
+@cli.group("trace", help="Record real desktop activity for the dev workload.")
+def trace_group() -> None:
+    pass
+
+
+@trace_group.command("record", help="Sample per-process CPU, faults, I/O and wakeups from /proc into a trace.")
+@click.argument("path", type=click.Path(dir_okay=False, writable=True))
+@click.option(
+    "-t", "--time", "duration", type=click.IntRange(1), default=600, show_default=True, help="Seconds to record."
+)
+@click.option("--interval", type=click.FloatRange(0.1), default=1.0, show_default=True, help="Seconds per sample.")
+def trace_record_cmd(path: str, duration: int, interval: float) -> None:
+    """Work normally while this runs; batben's own process is left out of the trace."""
+    from . import trace
+
+    click.echo(f"recording activity for {duration}s, carry on working...")
+    rows = trace.record_trace(path, duration, interval=interval)
+    click.echo(f"recorded {rows} intervals to {path}")
+
+
+@cli.group("recording", help="Look at recorded runs without rerunning anything.")
+def recording_group() -> None:
+    pass
+
+
+@recording_group.command("summary", help="Per-column min/mean/max and the events of a recording.")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+def recording_summary_cmd(path: str) -> None:
+    from .recording import Recording
+
+    with Recording(path) as rec:
+        click.echo(rec.summary())
+
+
+@recording_group.command("replay", help="Print a recording sample by sample.")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--speed", type=click.FloatRange(0), default=0.0, show_default=True, help="Speed-up factor, 0 = no wait.")
+def recording_replay_cmd(path: str, speed: float) -> None:
+    from .recording import Event, Recording
+
+    with Recording(path) as rec:
+        start = None
+        for t, item in rec.replay(speed=speed):
+            start = t if start is None else start
+            if isinstance(item, Event):
+                click.echo(f"{t - start:>9.2f}s  * {item.name} {item.data or ''}")
+            else:
+                click.echo(f"{t - start:>9.2f}s  " + "  ".join(f"{k}={v:.3f}" for k, v in item.items() if k != "t"))
+
+
+@cli.command("report", help="Analyze recordings and write one self-contained HTML report comparing profiles.")
+@click.argument("paths", nargs=-1, required=True, type=click.Path(exists=True))
+@click.option(
+    "-o",
+    "--output",
+    type=click.Path(dir_okay=False, writable=True),
+    default="batben-report.html",
+    show_default=True,
+    help="Where to write the report.",
+)
+@click.option("--title", default="batben report", show_default=True, help="Report title.")
+def report_cmd(paths: tuple[str, ...], output: str, title: str) -> None:
+    import time
+
+    from . import report
+
+    start = time.perf_counter()
+    runs = []
+    for path in report.find_recordings(list(paths)):
+        try:
+            runs.append(report.analyze(path))
+        except ValueError as e:
+            click.echo(f"skipping {path}: {e}", err=True)
+    if not runs:
+        raise click.UsageError("no recordings found")
+    with open(output, "w", encoding="utf-8") as f:
+        f.write(report.render_html(runs, title))
+    for run in runs:
+        if run.plugged:
+            click.echo(f"{run.path}: plugged in for {sum(b - a for a, b in run.plugged):.0f}s, left out of the fit")
+    click.echo(f"wrote {output}: {len(runs)} runs in {time.perf_counter() - start:.2f}s")
+
+
+@cli.group("fleet", help="Run the bench matrix on many machines and collect the results in one place.")
+def fleet_group() -> None:
+    pass
+
+
+@fleet_group.command("agent", help="Run a bench matrix on a schedule and upload the results between runs.")
+@click.argument("matrix_path", metavar="MATRIX", type=click.Path(exists=True, dir_okay=False))
+@click.option("-c", "--collector", required=True, help="Collector URL, e.g. http://shelf-server:8642.")
+@click.option(
+    "--spool",
+    type=click.Path(file_okay=False),
+    default=None,
+    help="Where results wait for upload [default: ~/.local/share/batben/spool].",
+)
+@click.option(
+    "--every", type=click.FloatRange(0), default=3600.0, show_default=True, help="Seconds from round to round."
+)
+@click.option("--rounds", type=click.IntRange(1), default=None, help="Stop after N rounds [default: run forever].")
+@click.option("--token", envvar="BATBEN_FLEET_TOKEN", default=None, help="Shared secret the collector expects.")
+def fleet_agent_cmd(matrix_path, collector, spool, every, rounds, token) -> None:
+    import os
+
+    from . import fleet, store
+
+    spool = fleet.Spool(spool or os.path.join(os.path.dirname(store.default_path()), "spool"))
+    try:
+        matrix = fleet.load_matrix(matrix_path)
+    except (ValueError, KeyError, TypeError) as e:
+        raise click.UsageError(f"bad matrix: {e}") from e
+    click.echo(f"agent {spool.agent}: {len(matrix)} matrix entries, uploading to {collector}")
+    agent = fleet.Agent(spool, matrix, fleet.Uploader(collector, token=token), log=click.echo)
+    agent.run(every, rounds)
+
+
+@fleet_group.command("collect", help="Accept result batches from fleet agents into a results database.")
+@click.option("--host", default="127.0.0.1", show_default=True, help="Address to listen on.")
+@click.option("--port", type=click.IntRange(0, 65535), default=8642, show_default=True, help="Port to listen on.")
+@click.option("--token", envvar="BATBEN_FLEET_TOKEN", default=None, help="Only accept agents sending this secret.")
+@click.option("--store", "store_path", type=click.Path(dir_okay=False), default=None, help="Results database.")
+def fleet_collect_cmd(host, port, token, store_path) -> None:
+    from . import fleet
+
+    collector = fleet.Collector(store_path, host=host, port=port, token=token)
+    click.echo(f"collecting into {collector.store_path} on {collector.url}")
+    try:
+        collector.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+@cli.command("compare", help="Compare power profiles across every stored run.")
+@click.option("-w", "--workload", default="quick", show_default=True, help="Workload to compare on.")
+@click.option(
+    "-m",
+    "--metric",
+    "metrics",
+    multiple=True,
+    default=["score", "energy_wh", "events_per_wh"],
+    show_default=True,
+    help="Metric(s) to compare.",
+)
+@click.option("-b", "--baseline", default=None, help="Baseline profile [default: the one with the most runs].")
+@click.option("--machine", default=None, help="Only this machine [default: all machines].")
+@click.option("--kernel", default=None, help="Only this kernel release [default: all].")
+@click.option("--alpha", type=click.FloatRange(0, 1), default=0.05, show_default=True, help="Significance level.")
+@click.option("--store", "store_path", type=click.Path(dir_okay=False), default=None, help="Results database.")
+def compare_cmd(workload, metrics, baseline, machine, kernel, alpha, store_path) -> None:
+    from .store import ResultStore, format_comparison
+
+    with ResultStore(store_path) as store:
+        for metric in metrics:
+            try:
+                rows = store.compare(metric, workload, baseline=baseline, machine=machine, kernel=kernel)
+            except KeyError as e:
+                raise click.UsageError(str(e.args[0])) from e
+            click.echo(format_comparison(metric, rows, alpha=alpha))
+            click.echo()
 
 
 @cli.command("sleep-check", help="Measure battery during suspend/resume cycles.")
@@ -59,11 +828,43 @@ def bench_cmd(duration: int, workload: str) -> None:
     default=False,
     help="Skip the post-resume measurement (debugging/testing).",
 )
-def sleep_check_cmd(duration: int, no_sleep: bool, no_wake: bool) -> None:
+@store_options
+def sleep_check_cmd(
+    duration: int, no_sleep: bool, no_wake: bool, profile: str | None, save: bool, store_path: str | None
+) -> None:
     """Entry point for sleep/wake testing."""
-    # TODO: hook into `sleep_mod.quick_sleep`, `battery.sleep_check`, `battery.wake_check`.
-    click.echo(f"[stub] sleep-check: duration={duration}s, no_sleep={no_sleep}, no_wake={no_wake}")
-    sys.exit(0)
+    from . import sleep as sleep_mod
+    from .battery import SysfsBattery
+
+    battery = SysfsBattery.find()
+    results = []
+    try:
+        if not no_sleep:
+            try:
+                result = sleep_mod.measure_suspend(duration, battery=battery)
+            except sleep_mod.SuspendError as e:
+                raise click.ClickException(f"{e}. Are you allowed to suspend (polkit)? --no-sleep skips it.") from e
+            click.echo(result.report())
+            if result.suspended <= 0:
+                click.echo("The system never suspended. Are you allowed to suspend (polkit)?", err=True)
+            results.append(result)
+        if not no_wake:
+            result = sleep_mod.measure_idle(duration, battery=battery)
+            click.echo(result.report())
+            results.append(result)
+    finally:
+        if battery is not None:
+            battery.close()
+    overhead = _overhead()
+
+    if save:
+        for result in results:
+            metrics = {"duration": result.elapsed, "suspended_s": result.suspended, "energy_wh": result.energy_wh}
+            if result.deepest_share is not None:
+                metrics["deepest_share"] = result.deepest_share
+            if overhead is not None:
+                metrics.update(overhead.metrics())
+            _save_result(store_path, profile, result.kind, "sleep-check", metrics)
 
 
 def main() -> None:
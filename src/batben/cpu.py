@@ -0,0 +1,142 @@
+"""
+Multi-core CPU suite.
+
+A handful of deterministic kernels, each run once on a single core and then on every core at the same time.
+Power profiles mostly differ in how they handle all-core bursts (especially on hybrid P/E-core parts), so
+the interesting number is how far the all-core score falls short of single-core times the core count.
+"""
+
+import functools
+import math
+import os
+import statistics
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+
+MASK64 = (1 << 64) - 1
+
+
+def sieve_kernel(limit: int = 2_000_000) -> tuple[int, int]:
+    """Sieve of Eratosthenes up to `limit`. Returns (numbers sieved, primes found)."""
+    flags = bytearray([1]) * (limit + 1)
+    flags[0:2] = b"\x00\x00"
+    for i in range(2, math.isqrt(limit) + 1):
+        if flags[i]:
+            flags[i * i :: i] = bytes(len(range(i * i, limit + 1, i)))
+    return limit, sum(flags)
+
+
+def hash_kernel(count: int = 200_000, seed: int = 0x9E3779B97F4A7C15) -> tuple[int, int]:
+    """Chains `count` rounds of the splitmix64 finalizer. Returns (rounds, final hash)."""
+    x = seed
+    for _ in range(count):
+        x = (x + 0x9E3779B97F4A7C15) & MASK64
+        z = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+        z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & MASK64
+        x = z ^ (z >> 31)
+    return count, x
+
+
+@functools.cache
+def _corpus(size: int) -> bytes:
+    """Compressible but not trivially so: words picked by an LCG."""
+    words = [b"battery", b"power", b"profile", b"tuned", b"governor", b"idle", b"wakeup", b"suspend"]
+    out = bytearray()
+    state = 12345
+    while len(out) < size:
+        state = (state * 1103515245 + 12345) & 0x7FFFFFFF
+        out += words[state % len(words)] + b" " + str(state % 1000).encode() + b"\n"
+    return bytes(out[:size])
+
+
+def compress_kernel(size: int = 1 << 20, level: int = 6) -> tuple[int, int]:
+    """zlib round trip over `size` bytes. Returns (bytes processed, crc of the round-tripped data)."""
+    data = _corpus(size)
+    restored = zlib.decompress(zlib.compress(data, level))
+    if restored != data:
+        raise RuntimeError("zlib round trip didn't give back the input")
+    return size, zlib.crc32(restored)
+
+
+KERNELS = {
+    "sieve": sieve_kernel,
+    "hash": hash_kernel,
+    "compress": compress_kernel,
+}
+
+
+def _timed(name: str) -> tuple[int, int, float]:
+    start = time.perf_counter()
+    ops, check = KERNELS[name]()
+    return ops, check, time.perf_counter() - start
+
+
+@dataclass
+class KernelScore:
+    name: str
+    single: float  # ops/s on one core
+    multi: float  # ops/s summed over all cores
+    workers: int
+    checksum: int
+
+    @property
+    def efficiency(self) -> float:
+        """all-core throughput over single-core throughput times the core count, 1.0 is perfect scaling"""
+        return self.multi / (self.single * self.workers) if self.single else 0.0
+
+
+@dataclass
+class CpuSuiteResult:
+    workers: int
+    kernels: list[KernelScore] = field(default_factory=list)
+
+    @property
+    def single_score(self) -> float:
+        """geometric mean of the single-core rates, so no kernel dominates because of its unit"""
+        return statistics.geometric_mean(k.single for k in self.kernels)
+
+    @property
+    def multi_score(self) -> float:
+        return statistics.geometric_mean(k.multi for k in self.kernels)
+
+    @property
+    def efficiency(self) -> float:
+        return self.multi_score / (self.single_score * self.workers)
+
+    def report(self) -> str:
+        lines = [f"{'kernel':<10} {'single ops/s':>14} {'all-core ops/s':>16} {'scaling':>8}"]
+        for k in self.kernels:
+            lines.append(f"{k.name:<10} {k.single:>14.0f} {k.multi:>16.0f} {k.efficiency:>8.1%}")
+        lines.append(f"single-core score: {self.single_score:.0f}")
+        lines.append(f"all-core score ({self.workers} workers): {self.multi_score:.0f}")
+        lines.append(f"scaling efficiency: {self.efficiency:.1%}")
+        return "\n".join(lines)
+
+
+def run_cpu_suite(kernels=None, workers: int | None = None, repeats: int = 3) -> CpuSuiteResult:
+    """
+    Runs every kernel `repeats` times on one core, then `repeats` rounds of one copy per worker in parallel.
+    The best round counts, the worst ones are mostly the scheduler waking up cores.
+    """
+    workers = workers or os.cpu_count() or 1
+    result = CpuSuiteResult(workers=workers)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # spin every worker up once so process start-up doesn't count against the first kernel
+        list(pool.map(_timed, ["sieve"] * workers))
+        for name in kernels or KERNELS:
+            single = []
+            for _ in range(repeats):
+                ops, check, elapsed = pool.submit(_timed, name).result()
+                single.append(ops / elapsed)
+            multi = []
+            for _ in range(repeats):
+                start = time.perf_counter()
+                runs = list(pool.map(_timed, [name] * workers))
+                elapsed = time.perf_counter() - start
+                multi.append(sum(ops for ops, _, _ in runs) / elapsed)
+                if any(c != check for _, c, _ in runs):
+                    raise RuntimeError(f"kernel {name} isn't deterministic")
+            result.kernels.append(KernelScore(name, max(single), max(multi), workers, check))
+    return result
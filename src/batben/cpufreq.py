@@ -0,0 +1,247 @@
+"""
+CPU frequency and C-state telemetry.
+
+A profile can halve the score without touching the workload: a lower EPP, a capped max frequency or a
+governor that's slow to ramp. To see which, this samples every core's current frequency and cpuidle
+counters during the run. All the files are opened once and re-read with pread into preallocated numpy
+arrays, so sampling a 16 core machine at 10Hz is a few hundred cheap syscalls a second and no allocation.
+"""
+
+import glob
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from .system import read_text
+
+CPU_ROOT = "/sys/devices/system/cpu"
+
+
+def _open(path: str) -> int | None:
+    try:
+        return os.open(path, os.O_RDONLY)
+    except OSError:
+        return None
+
+
+def _pread_int(fd: int) -> int | None:
+    try:
+        return int(os.pread(fd, 32, 0))
+    except (OSError, ValueError):
+        return None  # a CPU that went offline, or a driver that reports <unknown>
+
+
+def cpu_dirs(root: str = CPU_ROOT) -> list[str]:
+    """cpuN directories in numeric order."""
+    dirs = [d for d in glob.glob(os.path.join(root, "cpu*")) if re.fullmatch(r"cpu\d+", os.path.basename(d))]
+    return sorted(dirs, key=lambda d: int(os.path.basename(d)[3:]))
+
+
+def cpufreq_settings(root: str = CPU_ROOT) -> dict[str, str]:
+    """
+    Driver, governor and EPP as set right now. Where cores disagree (rare, but tuned can do it),
+    the distinct values are joined with '/'.
+    """
+    settings = {}
+    for key, name in (
+        ("driver", "scaling_driver"),
+        ("governor", "scaling_governor"),
+        ("epp", "energy_performance_preference"),
+        ("max_khz", "scaling_max_freq"),
+    ):
+        values = [read_text(os.path.join(d, "cpufreq", name)) for d in cpu_dirs(root)]
+        values = list(dict.fromkeys(v for v in values if v))
+        if values:
+            settings[key] = "/".join(values)
+    return settings
+
+
+@dataclass
+class CpuStateResult:
+    duration: float
+    samples: int
+    settings: dict[str, str] = field(default_factory=dict)
+    freq_mhz: np.ndarray = field(default_factory=lambda: np.zeros(0))  # time-weighted average per core
+    freq_min_mhz: float = float("nan")
+    freq_max_mhz: float = float("nan")
+    residency: dict[str, float] = field(default_factory=dict)  # share of core-time per C-state
+    entries_per_s: dict[str, float] = field(default_factory=dict)  # per core
+
+    @property
+    def avg_freq_mhz(self) -> float:
+        return float(np.nanmean(self.freq_mhz)) if len(self.freq_mhz) else float("nan")
+
+    def metrics(self) -> dict[str, float]:
+        out = {"avg_freq_mhz": self.avg_freq_mhz}
+        out.update({f"residency_{name}": share for name, share in self.residency.items()})
+        return out
+
+    def report(self) -> str:
+        lines = []
+        if self.settings:
+            lines.append("cpufreq: " + ", ".join(f"{k} {v}" for k, v in self.settings.items()))
+        if len(self.freq_mhz):
+            lines.append(
+                f"frequency: avg {self.avg_freq_mhz:.0f}MHz (min {self.freq_min_mhz:.0f}, max {self.freq_max_mhz:.0f}) "
+                f"over {self.samples} samples"
+            )
+        if self.residency:
+            states = "  ".join(
+                f"{name} {share:.1%} ({self.entries_per_s[name]:.0f}/s)" for name, share in self.residency.items()
+            )
+            active = max(1.0 - sum(self.residency.values()), 0.0)
+            lines.append(f"C-states: {states}  ~active {active:.1%}")
+        return "\n".join(lines)
+
+
+class CpuStateCollector:
+    """
+    Samples scaling_cur_freq and cpuidle state time/usage of every core at `rate` Hz on a background thread
+    between `start` and `stop`. Frequencies are integrated over time as they come in (each reading holds until
+    the next), so the average covers the whole run however long it is, with nothing allocated per sample. The
+    cpuidle counters are cumulative, so only the first and latest readings are kept. A file that can't be read
+    keeps its previous reading; a core that never had one is left out of its average. False when there's
+    nothing to read.
+    """
+
+    def __init__(self, root: str = CPU_ROOT, rate: float = 10.0, clock=time.monotonic):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.root = root
+        self.interval = 1.0 / rate
+        self._clock = clock
+        self._freq_fds = []
+        self._state_names = []
+        self._idle_fds = []  # per core, per state: (time fd, usage fd)
+        for cpu in cpu_dirs(root):
+            fd = _open(os.path.join(cpu, "cpufreq", "scaling_cur_freq"))
+            if fd is not None:
+                self._freq_fds.append(fd)
+            states = sorted(glob.glob(os.path.join(cpu, "cpuidle", "state*")), key=lambda s: int(s.rsplit("e", 1)[1]))
+            if not states:
+                continue
+            names = [read_text(os.path.join(s, "name")) or os.path.basename(s) for s in states]
+            fds = [(_open(os.path.join(s, "time")), _open(os.path.join(s, "usage"))) for s in states]
+            opened = [fd for pair in fds for fd in pair if fd is not None]
+            # hybrid parts can have different states per core type; keep the cores that match the first
+            if len(opened) < 2 * len(fds) or (self._state_names and names != self._state_names):
+                for fd in opened:
+                    os.close(fd)
+                continue
+            self._state_names = names
+            self._idle_fds.append(fds)
+        cores = len(self._freq_fds)
+        self._freq = np.full(cores, np.nan)  # the latest reading, MHz, nan until there is one
+        self._freq_sum = np.zeros(cores)  # readings times how long they held, MHz*s
+        self._held_s = np.zeros(cores)
+        self._freq_plain_sum = np.zeros(cores)  # for the average when no time went by
+        self._freq_count = np.zeros(cores)
+        self._freq_min = self._freq_max = float("nan")
+        self._last_t = None
+        shape = (len(self._idle_fds), len(self._state_names), 2)
+        self._idle_first = np.zeros(shape, dtype=np.int64)
+        self._idle_last = np.zeros(shape, dtype=np.int64)
+        self._samples = 0
+        self._started = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __bool__(self) -> bool:
+        return bool(self._freq_fds or self._idle_fds)
+
+    def _read_idle(self, out: np.ndarray) -> None:
+        for c, fds in enumerate(self._idle_fds):
+            for s, pair in enumerate(fds):
+                for k, fd in enumerate(pair):
+                    value = _pread_int(fd)
+                    if value is not None:
+                        out[c, s, k] = value
+
+    def sample(self) -> None:
+        """Takes one reading. The thread calls this, tests can too."""
+        self._read_idle(self._idle_last)
+        now = self._clock()
+        read = ~np.isnan(self._freq)
+        if self._last_t is not None:
+            # the previous reading held until now
+            self._freq_sum[read] += self._freq[read] * (now - self._last_t)
+            self._held_s[read] += now - self._last_t
+        for c, fd in enumerate(self._freq_fds):
+            khz = _pread_int(fd)
+            if khz is not None:
+                self._freq[c] = khz / 1e3
+        read = ~np.isnan(self._freq)
+        if read.any():
+            self._freq_plain_sum[read] += self._freq[read]
+            self._freq_count[read] += 1
+            self._freq_min = float(np.fmin(self._freq_min, self._freq[read].min()))
+            self._freq_max = float(np.fmax(self._freq_max, self._freq[read].max()))
+        self._last_t = now
+        self._samples += 1
+
+    def _run(self) -> None:
+        next_tick = self._clock()
+        while not self._stop.is_set():
+            self.sample()
+            next_tick = max(next_tick + self.interval, self._clock())
+            self._stop.wait(next_tick - self._clock())
+
+    def start(self, thread: bool = True) -> None:
+        self._samples = 0
+        self._freq[:] = np.nan
+        self._freq_sum[:] = self._held_s[:] = 0
+        self._freq_plain_sum[:] = self._freq_count[:] = 0
+        self._freq_min = self._freq_max = float("nan")
+        self._last_t = None
+        self._started = self._clock()
+        self._read_idle(self._idle_first)
+        self._idle_last[:] = self._idle_first  # a counter that can't be read later counts nothing
+        if thread and self:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="batben-cpufreq", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> CpuStateResult:
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        self.sample()
+        duration = self._clock() - self._started
+        result = CpuStateResult(duration, self._samples, cpufreq_settings(self.root))
+
+        if self._freq_count.any():
+            with np.errstate(invalid="ignore", divide="ignore"):
+                # time-weighted where time went by, else the plain mean; nan for a core that never read
+                result.freq_mhz = np.where(
+                    self._held_s > 0, self._freq_sum / self._held_s, self._freq_plain_sum / self._freq_count
+                )
+            result.freq_min_mhz, result.freq_max_mhz = self._freq_min, self._freq_max
+
+        if self._idle_fds and duration > 0:
+            delta = self._idle_last - self._idle_first
+            cores = len(self._idle_fds)
+            for s, name in enumerate(self._state_names):
+                result.residency[name] = float(delta[:, s, 0].sum()) / 1e6 / (duration * cores)
+                result.entries_per_s[name] = float(delta[:, s, 1].sum()) / (duration * cores)
+        return result
+
+    def close(self) -> None:
+        for fd in self._freq_fds:
+            os.close(fd)
+        for fds in self._idle_fds:
+            for pair in fds:
+                for fd in pair:
+                    os.close(fd)
+        self._freq_fds = []
+        self._idle_fds = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
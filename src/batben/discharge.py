@@ -0,0 +1,115 @@
+"""
+Discharge rate from the sampled energy series, while the run is still going.
+
+Battery energy comes in coarse steps (anything from a few mWh to 0.1Wh, refreshed whenever the firmware
+feels like it), so fitting a line through every 10Hz sample mostly fits the staircase. The informative
+samples are the first ones after each step: that's when the counter crossed a value. A Theil-Sen fit through
+those is robust to the odd late refresh, and its confidence interval tells us when the run has gone on
+long enough, instead of draining for a fixed hour per profile.
+"""
+
+import math
+import time
+from dataclasses import dataclass
+
+import numpy as np
+
+from . import stats
+
+
+@dataclass
+class DischargeEstimate:
+    wh_per_hour: float
+    ci_low: float
+    ci_high: float
+    points: int  # energy steps the fit went through
+    span_s: float
+    confidence: float = 0.95
+
+    @property
+    def relative_error(self) -> float:
+        """CI half width relative to the estimate."""
+        if self.wh_per_hour <= 0:
+            return math.inf
+        return (self.ci_high - self.ci_low) / 2 / self.wh_per_hour
+
+    def metrics(self) -> dict[str, float]:
+        return {
+            "discharge_wh_per_hour": self.wh_per_hour,
+            "discharge_ci_low": self.ci_low,
+            "discharge_ci_high": self.ci_high,
+            "discharge_rel_error": self.relative_error,
+        }
+
+    def report(self) -> str:
+        return (
+            f"Discharge rate: {self.wh_per_hour:.3f}Wh/hour "
+            f"({self.confidence:.0%} CI {self.ci_low:.3f}-{self.ci_high:.3f}, +-{self.relative_error:.1%}) "
+            f"from {self.points} energy steps over {self.span_s:.0f}s"
+        )
+
+
+def step_points(t: np.ndarray, energy: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """The first sample of every distinct energy reading (nan readings dropped)."""
+    keep = ~np.isnan(energy)
+    t, energy = t[keep], energy[keep]
+    if not len(t):
+        return t, energy
+    changed = np.concatenate(([True], energy[1:] != energy[:-1]))
+    return t[changed], energy[changed]
+
+
+def estimate_discharge(
+    t: np.ndarray, energy: np.ndarray, confidence: float = 0.95, max_points: int = 300
+) -> DischargeEstimate | None:
+    """
+    Fits Wh/hour through the energy steps of a (t seconds, energy Wh) series. None until there are at
+    least three steps. Long runs are thinned to `max_points` steps, evenly.
+    """
+    t, energy = step_points(np.asarray(t, dtype=float), np.asarray(energy, dtype=float))
+    if len(t) < 3:
+        return None
+    if len(t) > max_points:
+        pick = np.linspace(0, len(t) - 1, max_points).round().astype(int)
+        t, energy = t[pick], energy[pick]
+    slope, low, high = stats.theil_sen(t, energy, confidence)
+    # energy goes down: the steepest slope is the highest rate
+    return DischargeEstimate(-slope * 3600, -high * 3600, -low * 3600, len(t), float(t[-1] - t[0]), confidence)
+
+
+class AdaptiveStop:
+    """
+    Stop condition for a run: true once the discharge rate fitted from `sampler` (a BatterySampler) has a
+    relative CI half width of at most `target`, and at least `min_duration` seconds have gone by.
+    The fit is redone at most every `every` seconds; the latest one is kept on `estimate`.
+    """
+
+    def __init__(
+        self,
+        sampler,
+        target: float = 0.05,
+        confidence: float = 0.95,
+        min_duration: float = 60.0,
+        every: float = 5.0,
+        clock=time.monotonic,
+    ):
+        if target <= 0:
+            raise ValueError("target must be positive")
+        self.sampler = sampler
+        self.target = target
+        self.confidence = confidence
+        self.min_duration = min_duration
+        self.every = every
+        self.estimate = None
+        self._clock = clock
+        self._started = clock()
+        self._checked = -math.inf
+
+    def __call__(self) -> bool:
+        now = self._clock()
+        if now - self._started < self.min_duration or now - self._checked < self.every:
+            return False
+        self._checked = now
+        data = self.sampler.buffer.snapshot()
+        self.estimate = estimate_discharge(data["t"], data["energy_wh"], self.confidence)
+        return self.estimate is not None and self.estimate.relative_error <= self.target
@@ -0,0 +1,362 @@
+"""
+Fleet mode: an agent per laptop, one collector for the shelf.
+
+Results depend heavily on the laptop model and its firmware, so the same matrix runs on many machines. The
+agent runs a bench matrix on a schedule, each bench in its own process writing to a local results store
+(the spool), and only talks to the network between measurements: after a round, pending runs go to the
+collector as gzipped JSON batches, retried with backoff, and stay spooled if the collector can't be reached.
+
+Every run carries a uid (agent id + its local run id) and every batch an id derived from its runs, so a batch
+re-sent after a lost acknowledgement, or runs that show up again in a bigger batch, are stored once.
+The collector is a threaded stdlib HTTP server in front of an ordinary ResultStore, so `batben compare`
+works on the collected results as is.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import uuid
+import zlib
+from dataclasses import dataclass, field
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable
+
+from . import system
+from .store import ResultStore
+
+BATCH_PATH = "/v1/batches"
+MAX_BODY = 64 << 20  # decompressed
+
+FLEET_SCHEMA = """
+CREATE TABLE IF NOT EXISTS fleet_batches (batch_id TEXT PRIMARY KEY, agent TEXT NOT NULL, ts REAL NOT NULL);
+CREATE TABLE IF NOT EXISTS fleet_runs (uid TEXT PRIMARY KEY, batch_id TEXT NOT NULL) WITHOUT ROWID;
+"""
+
+
+def gunzip(data: bytes, limit: int = MAX_BODY) -> bytes:
+    """gzip.decompress that stops at `limit` bytes instead of inflating whatever it's sent."""
+    inflater = zlib.decompressobj(wbits=31)
+    out = inflater.decompress(data, limit)
+    if inflater.unconsumed_tail:
+        raise ValueError(f"batch inflates to more than {limit} bytes")
+    return out
+
+
+class Spool:
+    """
+    The agent's side: a results store the benches write into, plus which of its runs the collector has
+    acknowledged. The agent id is made up once and kept, so uids stay stable across restarts.
+    """
+
+    def __init__(self, directory: str):
+        os.makedirs(directory, exist_ok=True)
+        self.store_path = os.path.join(directory, "results.sqlite")
+        self._state_path = os.path.join(directory, "agent.json")
+        try:
+            with open(self._state_path) as f:
+                self._state = json.load(f)
+        except (OSError, ValueError):
+            self._state = {"agent": f"{system.machine_name()}-{uuid.uuid4().hex[:8]}", "acked": 0}
+            self._save()
+
+    @property
+    def agent(self) -> str:
+        return self._state["agent"]
+
+    @property
+    def acked(self) -> int:
+        return self._state["acked"]
+
+    def _save(self) -> None:
+        tmp = f"{self._state_path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(self._state, f)
+        os.replace(tmp, self._state_path)
+
+    def pending(self, limit: int = 200) -> list[dict]:
+        with ResultStore(self.store_path) as store:
+            runs = store.runs_after(self.acked, limit)
+        for run in runs:
+            run["uid"] = f"{self.agent}:{run['id']}"
+        return runs
+
+    def ack(self, run_id: int) -> None:
+        self._state["acked"] = max(self.acked, run_id)
+        self._save()
+
+
+def encode_batch(agent: str, runs: list[dict]) -> tuple[str, bytes]:
+    """(batch id, gzipped body). The id only depends on which runs are in it, so a re-send has the same one."""
+    batch_id = hashlib.sha256("\n".join([agent, *(run["uid"] for run in runs)]).encode()).hexdigest()[:24]
+    body = json.dumps({"batch": batch_id, "agent": agent, "runs": runs}, separators=(",", ":")).encode()
+    return batch_id, gzip.compress(body, compresslevel=6)
+
+
+class UploadError(Exception):
+    pass
+
+
+class Uploader:
+    """
+    POSTs batches to a collector. Connection errors, 429 and 5xx are retried `attempts` times with exponential
+    backoff; anything else (a 4xx: bad token, malformed batch) isn't going to get better and fails at once.
+    A client is opened per upload round and closed after it, so no connection outlives the round.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        token: str | None = None,
+        attempts: int = 5,
+        backoff: float = 1.0,
+        timeout: float = 30.0,
+        transport=None,
+        sleep=time.sleep,
+    ):
+        self.url = url.rstrip("/") + BATCH_PATH
+        self.token = token
+        self.attempts = attempts
+        self.backoff = backoff
+        self.timeout = timeout
+        self._transport = transport
+        self._sleep = sleep
+
+    def client(self):
+        import httpx
+
+        headers = {"Content-Encoding": "gzip", "Content-Type": "application/json"}
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        return httpx.Client(headers=headers, timeout=self.timeout, transport=self._transport)
+
+    def send(self, client, batch_id: str, body: bytes) -> dict:
+        import httpx
+
+        delay = self.backoff
+        for attempt in range(1, self.attempts + 1):
+            try:
+                response = client.post(self.url, content=body, headers={"X-Batch-Id": batch_id})
+            except httpx.TransportError as e:
+                error = f"{type(e).__name__}: {e}"
+            else:
+                if response.status_code == HTTPStatus.OK:
+                    return response.json()
+                error = f"HTTP {response.status_code}: {response.text[:200]}"
+                if response.status_code != HTTPStatus.TOO_MANY_REQUESTS and response.status_code < 500:
+                    raise UploadError(error)
+            if attempt < self.attempts:
+                self._sleep(delay)
+                delay *= 2
+        raise UploadError(f"gave up after {self.attempts} attempts, last error {error}")
+
+
+def run_bench(args: list[str], store_path: str) -> int:
+    """One matrix entry: `batben bench <args>` in its own process, saving into the spool."""
+    return subprocess.call([sys.executable, "-m", "batben.cli", "bench", *args, "--save", "--store", store_path])
+
+
+@dataclass
+class MatrixEntry:
+    args: list[str]  # bench arguments, e.g. ["-w", "cpu", "-t", "600"]
+    setup: list[str] = field(default_factory=list)  # a command to run first, e.g. switching the profile
+
+    @classmethod
+    def parse(cls, entry) -> "MatrixEntry":
+        if isinstance(entry, list):
+            return cls([str(a) for a in entry])
+        return cls([str(a) for a in entry["args"]], [str(a) for a in entry.get("setup", [])])
+
+
+def load_matrix(path: str) -> list[MatrixEntry]:
+    """A JSON list of entries, each a list of bench arguments or {"args": [...], "setup": [...]}."""
+    with open(path) as f:
+        entries = json.load(f)
+    if not isinstance(entries, list) or not entries:
+        raise ValueError(f"{path}: expected a non-empty JSON list of matrix entries")
+    return [MatrixEntry.parse(entry) for entry in entries]
+
+
+class Agent:
+    """
+    Runs the matrix and uploads between measurements. `measuring` is true while a bench runs; uploading then
+    is a bug and raises, the network has to stay quiet for the numbers to mean anything.
+    """
+
+    def __init__(
+        self,
+        spool: Spool,
+        matrix: list[MatrixEntry],
+        uploader: Uploader,
+        runner: Callable[[list[str], str], int] = run_bench,
+        batch_size: int = 200,
+        log: Callable[[str], None] = print,
+    ):
+        self.spool = spool
+        self.matrix = matrix
+        self.uploader = uploader
+        self.runner = runner
+        self.batch_size = batch_size
+        self.log = log
+        self.measuring = False
+
+    def measure(self, entry: MatrixEntry) -> int:
+        if entry.setup:
+            subprocess.call(entry.setup)
+        self.measuring = True
+        try:
+            return self.runner(entry.args, self.spool.store_path)
+        finally:
+            self.measuring = False
+
+    def upload(self) -> int:
+        """Sends everything pending. Returns how many runs the collector acknowledged."""
+        if self.measuring:
+            raise RuntimeError("not uploading during a measurement")
+        sent = 0
+        with self.uploader.client() as client:
+            while runs := self.spool.pending(self.batch_size):
+                batch_id, body = encode_batch(self.spool.agent, runs)
+                reply = self.uploader.send(client, batch_id, body)
+                self.spool.ack(runs[-1]["id"])
+                sent += len(runs)
+                self.log(f"batch {batch_id}: {len(runs)} runs, {reply.get('accepted', 0)} new, {len(body)}B")
+        return sent
+
+    def run_round(self) -> None:
+        for entry in self.matrix:
+            status = self.measure(entry)
+            if status:
+                self.log(f"bench {' '.join(entry.args)} exited with {status}")
+        try:
+            self.upload()
+        except UploadError as e:
+            self.log(f"upload failed, keeping results spooled: {e}")
+
+    def run(self, every: float, rounds: int | None = None, sleep=time.sleep, clock=time.monotonic) -> None:
+        """A round every `every` seconds (back to back if a round takes longer), forever or `rounds` times."""
+        done = 0
+        while rounds is None or done < rounds:
+            start = clock()
+            self.run_round()
+            done += 1
+            if rounds is None or done < rounds:
+                sleep(max(every - (clock() - start), 0))
+
+
+class Collector:
+    """
+    Ingests batches into a ResultStore at `store_path`. Requests are handled on their own threads, reading
+    and decompressing in parallel; writes go through one lock. Each run is committed together with its uid,
+    and the batch is only marked as seen once all of its runs are in, so a batch cut short gets resent whole
+    and the runs that made it the first time are skipped.
+    Use as a context manager; `url` is valid inside it.
+    """
+
+    def __init__(self, store_path: str | None = None, host: str = "127.0.0.1", port: int = 0, token: str | None = None):
+        self.store_path = store_path
+        self.token = token
+        self._lock = threading.Lock()
+        with ResultStore(store_path) as store:
+            store.db.executescript(FLEET_SCHEMA)
+            self.store_path = store.path
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def ingest(self, batch: dict) -> dict:
+        runs = batch["runs"]
+        with self._lock, ResultStore(self.store_path) as store:
+            db = store.db
+            if db.execute("SELECT 1 FROM fleet_batches WHERE batch_id = ?", (batch["batch"],)).fetchone():
+                return {"batch": batch["batch"], "accepted": 0, "duplicates": len(runs)}
+            accepted = 0
+            with db:
+                for run in runs:
+                    if db.execute("SELECT 1 FROM fleet_runs WHERE uid = ?", (run["uid"],)).fetchone():
+                        continue
+                    db.execute("INSERT INTO fleet_runs (uid, batch_id) VALUES (?, ?)", (run["uid"], batch["batch"]))
+                    # add_run's own `with self.db` commits this row together with the run, or rolls both back
+                    store.add_run(
+                        run["metrics"],
+                        machine=run["machine"],
+                        profile=run["profile"],
+                        workload=run["workload"],
+                        kernel=run["kernel"],
+                        command=run["command"],
+                        ts=run["ts"],
+                    )
+                    accepted += 1
+                db.execute(
+                    "INSERT INTO fleet_batches (batch_id, agent, ts) VALUES (?, ?, ?)",
+                    (batch["batch"], batch["agent"], time.time()),
+                )
+        return {"batch": batch["batch"], "accepted": accepted, "duplicates": len(runs) - accepted}
+
+    def _handler(self):
+        collector = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _reply(self, status: int, payload: dict) -> None:
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if self.path == "/v1/health":
+                    self._reply(HTTPStatus.OK, {"ok": True})
+                else:
+                    self._reply(HTTPStatus.NOT_FOUND, {"error": "not found"})
+
+            def do_POST(self):
+                if self.path != BATCH_PATH:
+                    return self._reply(HTTPStatus.NOT_FOUND, {"error": "not found"})
+                if collector.token and self.headers.get("Authorization") != f"Bearer {collector.token}":
+                    return self._reply(HTTPStatus.UNAUTHORIZED, {"error": "bad token"})
+                length = int(self.headers.get("Content-Length") or 0)
+                if length > MAX_BODY:
+                    return self._reply(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {"error": "batch too large"})
+                body = self.rfile.read(length)
+                try:
+                    if self.headers.get("Content-Encoding") == "gzip":
+                        body = gunzip(body)
+                    batch = json.loads(body)
+                    if not isinstance(batch, dict) or not isinstance(batch.get("runs"), list):
+                        raise ValueError("not a batch")
+                    reply = collector.ingest(batch)
+                except (OSError, ValueError, KeyError, TypeError, zlib.error) as e:
+                    return self._reply(HTTPStatus.BAD_REQUEST, {"error": f"{type(e).__name__}: {e}"})
+                self._reply(HTTPStatus.OK, reply)
+
+        return Handler
+
+    def serve_forever(self) -> None:
+        self._server.serve_forever()
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="batben-collector", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
@@ -0,0 +1,244 @@
+"""
+Closed-loop load governor.
+
+The workloads in workload.py run flat out and stop. That's not what a laptop sitting in an IDE looks like,
+so this slices work into small quanta and runs them on a duty cycle (busy for part of a period, asleep for the
+rest) on one worker process per core. A controller in the parent keeps nudging the duty cycle from the measured
+system utilization, so the machine as a whole sits at the requested load, whatever else happens to be running.
+"""
+
+import multiprocessing as mp
+import os
+import statistics
+import time
+from dataclasses import dataclass, field
+from typing import Callable
+
+
+def _busy_total(fields: list[str]) -> tuple[int, int]:
+    values = [int(v) for v in fields[1:]]
+    idle = values[3] + (values[4] if len(values) > 4 else 0)
+    # steal (field 8) is time the hypervisor gave to someone else, so it's left out of both; guest and
+    # guest_nice (fields 9 and 10) are already included in user and nice
+    total = sum(values[:7])
+    return total - idle, total
+
+
+def read_proc_stat(path: str = "/proc/stat", cpus: set[int] | None = None) -> tuple[int, int]:
+    """
+    Returns (busy, total) jiffies from the aggregate `cpu` line of /proc/stat, or summed over the `cpuN`
+    lines of `cpus` only. iowait counts as idle. Steal isn't counted at all, so on a VM the load is of the time
+    the CPU was actually ours. Guest time is already folded into user time by the kernel.
+    """
+    with open(path) as f:
+        fields = f.readline().split()
+        if not fields or fields[0] != "cpu":
+            raise ValueError(f"unexpected first line in {path}")
+        if cpus is None:
+            return _busy_total(fields)
+        busy = total = 0
+        seen = 0
+        for line in f:
+            if not line.startswith("cpu"):
+                break
+            fields = line.split()
+            if int(fields[0][3:]) in cpus:
+                b, t = _busy_total(fields)
+                busy, total, seen = busy + b, total + t, seen + 1
+    if not seen:
+        raise ValueError(f"none of the CPUs {sorted(cpus)} are in {path}")
+    return busy, total
+
+
+def pinned_cpus() -> set[int] | None:
+    """The CPUs this process may run on, or None when that's all of them."""
+    if not hasattr(os, "sched_getaffinity"):
+        return None
+    cpus = os.sched_getaffinity(0)
+    return cpus if len(cpus) < (os.cpu_count() or len(cpus)) else None
+
+
+class CpuUtilization:
+    """
+    CPU utilization in percent, measured between consecutive calls to `sample`: system-wide, or over `cpus`
+    only. Uses /proc/stat deltas, and psutil if /proc/stat can't be read.
+    """
+
+    def __init__(self, path: str = "/proc/stat", cpus: set[int] | None = None):
+        self.path = path
+        self.cpus = cpus
+        try:
+            self._last = read_proc_stat(path, cpus)
+        except (OSError, ValueError):
+            import psutil
+
+            self._last = None
+            psutil.cpu_percent(interval=None, percpu=cpus is not None)  # prime psutil's own delta
+
+    def sample(self) -> float:
+        if self._last is None:
+            import psutil
+
+            if self.cpus is None:
+                return psutil.cpu_percent(interval=None)
+            per_cpu = psutil.cpu_percent(interval=None, percpu=True)
+            loads = [load for cpu, load in enumerate(per_cpu) if cpu in self.cpus]
+            return statistics.fmean(loads) if loads else 0.0
+        busy, total = read_proc_stat(self.path, self.cpus)
+        d_busy, d_total = busy - self._last[0], total - self._last[1]
+        self._last = (busy, total)
+        if d_total <= 0:
+            return 0.0
+        return 100.0 * d_busy / d_total
+
+
+@dataclass
+class DutyCycleController:
+    """
+    Integral controller for the duty cycle.
+    The plant is roughly linear (duty 0.1 on every core is ~10% load) so starting at target/100 and
+    integrating the error is enough; the clamp keeps it from winding up when something else hogs the CPU.
+    """
+
+    target: float
+    gain: float = 0.5
+    duty: float = field(default=-1.0)
+
+    def __post_init__(self):
+        if not 0 < self.target <= 100:
+            raise ValueError(f"target load must be in (0, 100], got {self.target}")
+        if self.duty < 0:
+            self.duty = self.target / 100
+
+    def update(self, measured: float) -> float:
+        error = (self.target - measured) / 100
+        self.duty = min(1.0, max(0.0, self.duty + self.gain * error))
+        return self.duty
+
+
+@dataclass
+class GovernorResult:
+    target: float
+    duration: float
+    workers: int
+    quanta: int
+    events: int
+    busy_s: float
+    load_samples: list[float] = field(default_factory=list)
+    duty_samples: list[float] = field(default_factory=list)
+    timeline: list[tuple[float, int]] = field(default_factory=list)  # (seconds since start, events so far)
+
+    @property
+    def achieved(self) -> float:
+        return statistics.fmean(self.load_samples) if self.load_samples else 0.0
+
+    @property
+    def achieved_stdev(self) -> float:
+        return statistics.stdev(self.load_samples) if len(self.load_samples) > 1 else 0.0
+
+    @property
+    def events_per_quantum(self) -> float:
+        return self.events / self.quanta if self.quanta else 0.0
+
+    @property
+    def quantum_us(self) -> float:
+        """Average wall time of one quantum, in microseconds."""
+        return self.busy_s * 1e6 / self.quanta if self.quanta else 0.0
+
+    @property
+    def events_per_second(self) -> float:
+        return self.events / self.duration if self.duration > 0 else 0.0
+
+    def report(self) -> str:
+        return (
+            f"requested load: {self.target:.1f}%  achieved: {self.achieved:.1f}% (stdev {self.achieved_stdev:.1f})\n"
+            f"workers: {self.workers}  quanta: {self.quanta}  events: {self.events}\n"
+            f"events per quantum: {self.events_per_quantum:.2f}  time per quantum: {self.quantum_us:.0f}us\n"
+            f"perf score of     events per second: {self.events_per_second:.2f}"
+        )
+
+
+def _worker(index, kernel, period, duty, stop, quanta, events, busy_ns):
+    """
+    Runs `kernel` on a duty cycle until `stop` is set.
+    Counters are flushed once per period into this worker's own slot, so there is no lock contention.
+    """
+    if hasattr(os, "sched_setaffinity"):
+        cpus = sorted(os.sched_getaffinity(0))
+        os.sched_setaffinity(0, {cpus[index % len(cpus)]})
+
+    period_ns = int(period * 1e9)
+    n_quanta = n_events = n_busy = 0
+    while not stop.is_set():
+        start = time.perf_counter_ns()
+        budget = start + int(duty.value * period_ns)
+        now = start
+        while now < budget:
+            n_events += kernel()
+            n_quanta += 1
+            now = time.perf_counter_ns()
+        n_busy += now - start
+        quanta[index], events[index], busy_ns[index] = n_quanta, n_events, n_busy
+        remaining = start + period_ns - time.perf_counter_ns()
+        if remaining > 0:
+            stop.wait(remaining / 1e9)
+
+
+def run_governed(
+    kernel: Callable[[], int],
+    target: float,
+    duration: float,
+    workers: int | None = None,
+    period: float = 0.1,
+    interval: float = 0.5,
+    utilization: CpuUtilization | None = None,
+    should_stop: Callable[[], bool] | None = None,
+) -> GovernorResult:
+    """
+    Holds the system at `target` percent load for `duration` seconds by running `kernel` quanta on
+    `workers` processes (one per CPU this process may run on by default). `kernel` must be picklable and
+    return the number of events it did. The duty cycle is re-evaluated every `interval` seconds.
+    When the process is pinned to some of the CPUs, "the system" is those CPUs: load is measured over them
+    only, so every target stays reachable and `achieved` means the same as in an unpinned run.
+    `should_stop` is checked just as often; when it returns true the run ends early, so `duration` is an upper bound.
+    """
+    controller = DutyCycleController(target)
+    if not workers:
+        workers = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1
+    ctx = mp.get_context()
+    duty = ctx.Value("d", controller.duty, lock=False)
+    stop = ctx.Event()
+    quanta = ctx.Array("q", workers, lock=False)
+    events = ctx.Array("q", workers, lock=False)
+    busy_ns = ctx.Array("q", workers, lock=False)
+
+    procs = [
+        ctx.Process(target=_worker, args=(i, kernel, period, duty, stop, quanta, events, busy_ns), daemon=True)
+        for i in range(workers)
+    ]
+    utilization = utilization or CpuUtilization(cpus=pinned_cpus())
+    result = GovernorResult(target=target, duration=0.0, workers=workers, quanta=0, events=0, busy_s=0.0)
+
+    start = time.perf_counter()
+    for p in procs:
+        p.start()
+    try:
+        deadline = start + duration
+        while (now := time.perf_counter()) < deadline:
+            time.sleep(min(interval, deadline - now))
+            load = utilization.sample()
+            result.load_samples.append(load)
+            duty.value = controller.update(load)
+            result.duty_samples.append(duty.value)
+            result.timeline.append((time.perf_counter() - start, sum(events)))
+            if should_stop is not None and should_stop():
+                break
+    finally:
+        stop.set()
+        for p in procs:
+            p.join()
+    result.duration = time.perf_counter() - start
+    result.quanta = sum(quanta)
+    result.events = sum(events)
+    result.busy_s = sum(busy_ns) / 1e9
+    return result
@@ -0,0 +1,83 @@
+"""
+Benchmark harness.
+
+Runs a function a few times to warm up, then times repeated trials with perf_counter_ns and
+hands back a result object with the spread, instead of printing a single number.
+Two scores are only different if their confidence intervals say so.
+"""
+
+import time
+from dataclasses import dataclass, field
+from typing import Callable
+
+from . import stats
+
+
+@dataclass
+class BenchmarkResult:
+    name: str
+    counts: list[int] = field(default_factory=list)  # events per trial
+    durations_ns: list[int] = field(default_factory=list)  # wall time per trial
+    warmup: int = 0
+    confidence: float = 0.95
+
+    @property
+    def rates(self) -> list[float]:
+        """events per second of every trial, 0 for trials too fast for the clock"""
+        return [c * 1e9 / d if d > 0 else 0.0 for c, d in zip(self.counts, self.durations_ns)]
+
+    @property
+    def summary(self) -> stats.Summary:
+        return stats.summarize(self.rates, self.confidence)
+
+    @property
+    def events(self) -> int:
+        return sum(self.counts)
+
+    @property
+    def duration(self) -> float:
+        return sum(self.durations_ns) / 1e9
+
+    def legacy_line(self) -> str:
+        """The line the old events_per_second decorator used to print."""
+        eps = self.events / self.duration if self.duration > 0 else 0
+        return f"{self.name}: {self.events} events in {self.duration:.2f}s ({eps:.2f} events/sec)"
+
+    def report(self) -> str:
+        s = self.summary
+        if s.n < 2:
+            return f"{self.name}: {s.median:.2f} events/sec (1 trial, no spread)"
+        pct = f"{s.confidence:.0%}"
+        return (
+            f"{self.name}: median {s.median:.2f} events/sec, stdev {s.stdev:.2f} over {s.n} trials, "
+            f"{pct} CI [{s.ci_low:.2f}, {s.ci_high:.2f}] (±{s.relative_error:.2%})"
+        )
+
+
+def run_benchmark(
+    func: Callable[..., int],
+    args: tuple = (),
+    kwargs: dict | None = None,
+    name: str | None = None,
+    warmup: int = 1,
+    trials: int = 5,
+    confidence: float = 0.95,
+    clock: Callable[[], int] = time.perf_counter_ns,
+) -> BenchmarkResult:
+    """
+    Calls `func(*args, **kwargs)` `warmup` times untimed, then `trials` times timed.
+    `func` returns how many events it did. `clock` returns nanoseconds.
+    """
+    if trials < 1:
+        raise ValueError("need at least one trial")
+    kwargs = kwargs or {}
+    result = BenchmarkResult(name=name or func.__name__, warmup=warmup, confidence=confidence)
+    for _ in range(warmup):
+        func(*args, **kwargs)
+    for _ in range(trials):
+        start = clock()
+        count = func(*args, **kwargs)
+        end = clock()
+        result.counts.append(count)
+        result.durations_ns.append(end - start)
+    return result
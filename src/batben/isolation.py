@@ -0,0 +1,311 @@
+"""
+Measurement isolation.
+
+Run-to-run variance easily swamps the difference between two power profiles: the scheduler moves the workers
+between fast and slow cores, a page cache full of someone else's files changes what the I/O quanta hit, and a
+run started while the machine is still busy from the login or the last compile measures that too. This pins
+the run to a set of CPUs (on hybrid CPUs: one core type), raises its CPU and I/O priority, sets the scheduling
+policy, drops the page cache where that's allowed, and then waits until the machine is idle and the battery
+draw has settled before anything gets measured. Everything that was applied, and what wasn't and why, ends up
+in the result.
+
+Settings are applied to the calling thread and inherited by whatever it starts afterwards, the governor's
+worker processes included; the governor then pins one worker per CPU within the inherited set.
+"""
+
+import math
+import os
+import statistics
+import time
+from dataclasses import dataclass, field
+
+from .system import read_text
+
+CPU_ROOT = "/sys/devices/system/cpu"
+DEVICES_ROOT = "/sys/devices"
+DROP_CACHES = "/proc/sys/vm/drop_caches"
+POLICIES = ("other", "batch", "fifo", "rr")
+
+
+def parse_cpu_list(text: str) -> set[int]:
+    """A kernel CPU list like '0-3,8,10-11'."""
+    cpus = set()
+    for part in text.replace(" ", "").split(","):
+        if not part:
+            continue
+        low, _, high = part.partition("-")
+        cpus.update(range(int(low), int(high or low) + 1))
+    return cpus
+
+
+def format_cpu_list(cpus) -> str:
+    ranges = []
+    for cpu in sorted(cpus):
+        if ranges and cpu == ranges[-1][1] + 1:
+            ranges[-1][1] = cpu
+        else:
+            ranges.append([cpu, cpu])
+    return ",".join(str(low) if low == high else f"{low}-{high}" for low, high in ranges)
+
+
+def core_types(cpu_root: str = CPU_ROOT, devices_root: str = DEVICES_ROOT) -> dict[str, set[int]]:
+    """
+    Performance and efficiency CPUs on a hybrid CPU, {} on anything else. Intel lists its P- and E-cores as
+    the cpu_core and cpu_atom PMUs; ARM big.LITTLE shows up as different cpu_capacity values.
+    """
+    performance = read_text(os.path.join(devices_root, "cpu_core", "cpus"))
+    efficiency = read_text(os.path.join(devices_root, "cpu_atom", "cpus"))
+    if performance and efficiency:
+        return {"performance": parse_cpu_list(performance), "efficiency": parse_cpu_list(efficiency)}
+    capacities = {}
+    for name in os.listdir(cpu_root) if os.path.isdir(cpu_root) else ():
+        if name[3:].isdigit() and name.startswith("cpu"):
+            capacity = read_text(os.path.join(cpu_root, name, "cpu_capacity"))
+            if capacity is not None:
+                capacities[int(name[3:])] = int(capacity)
+    if len(set(capacities.values())) < 2:
+        return {}
+    top = max(capacities.values())
+    return {
+        "performance": {cpu for cpu, c in capacities.items() if c == top},
+        "efficiency": {cpu for cpu, c in capacities.items() if c < top},
+    }
+
+
+def resolve_cpus(spec: str, cpu_root: str = CPU_ROOT, devices_root: str = DEVICES_ROOT) -> set[int] | None:
+    """
+    The CPUs `spec` asks for, within the ones we may run on: 'all' (None, leave the affinity alone),
+    'performance' or 'efficiency' for a core type, or a CPU list like '2-5'.
+    """
+    if spec == "all":
+        return None
+    if spec in ("performance", "efficiency"):
+        types = core_types(cpu_root, devices_root)
+        if not types:
+            raise ValueError(f"can't pin to {spec} cores, this isn't a hybrid CPU")
+        cpus = types[spec]
+    else:
+        try:
+            cpus = parse_cpu_list(spec)
+        except ValueError:
+            raise ValueError(f"expected all, performance, efficiency or a CPU list like 2-5, got {spec!r}") from None
+    allowed = os.sched_getaffinity(0) if hasattr(os, "sched_getaffinity") else cpus
+    if not cpus & allowed:
+        raise ValueError(f"none of CPUs {format_cpu_list(cpus)} are available to this process")
+    return cpus & allowed
+
+
+def drop_caches(path: str = DROP_CACHES) -> None:
+    """Writes back dirty pages and drops the page cache, dentries and inodes. Needs root."""
+    os.sync()
+    with open(path, "w") as f:
+        f.write("3\n")
+
+
+@dataclass
+class Quiescence:
+    settled: bool
+    waited_s: float
+    load: float  # mean system CPU load over the last window, percent
+    power_w: float  # mean battery draw over the last window, nan without a battery reading
+    power_spread: float  # relative stdev of the draw over the last window
+
+    def metrics(self) -> dict[str, float]:
+        out = {"quiet_settled": float(self.settled), "quiet_wait_s": self.waited_s, "quiet_load": self.load}
+        if not math.isnan(self.power_w):
+            out["quiet_power_w"] = self.power_w
+        return out
+
+    def report(self) -> str:
+        power = f", battery {self.power_w:.2f}W ±{self.power_spread:.1%}" if not math.isnan(self.power_w) else ""
+        state = "settled after" if self.settled else "gave up waiting after"
+        return f"quiescence: {state} {self.waited_s:.0f}s (load {self.load:.1f}%{power})"
+
+
+def _power_stable(power: list[float], tolerance: float) -> tuple[bool, float]:
+    """
+    Flat within `tolerance`: a small relative spread, and no trend that moves the draw by more than that across
+    the window (the halves' means are half a window apart, so twice their difference).
+    """
+    mean = statistics.fmean(power)
+    if mean <= 0:
+        return len(set(power)) == 1, 0.0
+    spread = statistics.pstdev(power) / mean
+    half = len(power) // 2
+    drift = 2 * abs(statistics.fmean(power[half:]) - statistics.fmean(power[:half])) / mean
+    return spread <= tolerance and drift <= tolerance, spread
+
+
+def wait_for_quiet(
+    utilization=None,
+    battery=None,
+    max_load: float = 5.0,
+    tolerance: float = 0.05,
+    window: int = 10,
+    interval: float = 1.0,
+    timeout: float = 300.0,
+    clock=time.monotonic,
+    sleep=time.sleep,
+) -> Quiescence:
+    """
+    Samples system load and battery draw every `interval` seconds until the last `window` samples average at
+    most `max_load` percent and the draw is flat within `tolerance` (see _power_stable), or `timeout` runs out.
+    `utilization` is a governor.CpuUtilization, `battery` a SysfsBattery or None. Battery draw is skipped when
+    there's no reading (on AC most batteries report nothing, or 0).
+    """
+    if window < 2:
+        raise ValueError("the window needs at least two samples")
+    if utilization is None:
+        from .governor import CpuUtilization
+
+        utilization = CpuUtilization()
+    start = clock()
+    loads, power = [], []
+    while True:
+        sleep(interval)
+        loads.append(utilization.sample())
+        power.append(battery.read()[1] if battery is not None else math.nan)
+        del loads[:-window], power[:-window]
+        waited = clock() - start
+        load = statistics.fmean(loads)
+        readings = [p for p in power if not math.isnan(p)]
+        if len(readings) == len(power) > 1:
+            stable, spread = _power_stable(readings, tolerance)
+            mean_power = statistics.fmean(readings)
+        else:
+            stable, spread, mean_power = True, math.nan, math.nan
+        settled = len(loads) == window and load <= max_load and stable
+        if settled or waited >= timeout:
+            return Quiescence(settled, waited, load, mean_power, spread)
+
+
+@dataclass
+class IsolationResult:
+    applied: dict[str, str] = field(default_factory=dict)  # setting -> what it was set to
+    skipped: dict[str, str] = field(default_factory=dict)  # setting -> why it wasn't
+    cpus: set[int] | None = None
+    nice: int | None = None
+    policy: int | None = None  # the kernel's SCHED_* number
+    ionice: tuple[int, int] | None = None  # (class, level)
+    caches_dropped: bool = False
+    quiet: Quiescence | None = None
+
+    def metrics(self) -> dict[str, float]:
+        out = {"isolated": 1.0, "caches_dropped": float(self.caches_dropped)}
+        if self.cpus is not None:
+            out["pinned_cpus"] = len(self.cpus)
+        if self.nice is not None:
+            out["nice"] = self.nice
+        if self.policy is not None:
+            out["sched_policy"] = self.policy
+        if self.ionice is not None:
+            out["ionice_class"], out["ionice_level"] = self.ionice
+        if self.quiet is not None:
+            out.update(self.quiet.metrics())
+        return out
+
+    def report(self) -> str:
+        lines = ["isolation: " + (", ".join(f"{k} {v}" for k, v in self.applied.items()) or "nothing applied")]
+        for setting, reason in self.skipped.items():
+            lines.append(f"  not applied: {setting} ({reason})")
+        if self.quiet is not None:
+            lines.append(self.quiet.report())
+        return "\n".join(lines)
+
+
+class Isolation:
+    """
+    Applies the settings on enter and puts back what it changed on exit; the result is filled in as it goes.
+    A setting the kernel refuses (negative nice, fifo/rr and dropping caches need privileges) is recorded in
+    `skipped` instead of failing the run.
+    """
+
+    def __init__(
+        self,
+        cpus: set[int] | None = None,
+        nice: int | None = -10,
+        policy: str = "other",
+        ionice: bool = True,
+        drop_caches: bool = True,
+        drop_caches_path: str = DROP_CACHES,
+    ):
+        if policy not in POLICIES:
+            raise ValueError(f"unknown scheduling policy {policy!r}, expected one of {', '.join(POLICIES)}")
+        self.cpus = cpus
+        self.nice = nice
+        self.policy = policy
+        self.use_ionice = ionice
+        self.drop_caches = drop_caches
+        self.drop_caches_path = drop_caches_path
+        self.result = IsolationResult()
+        self._restore = []
+
+    def _try(self, setting: str, apply) -> bool:
+        try:
+            apply()
+        except (OSError, ValueError, AttributeError) as e:
+            self.result.skipped[setting] = getattr(e, "strerror", None) or str(e) or type(e).__name__
+            return False
+        return True
+
+    def _pin(self) -> None:
+        before = os.sched_getaffinity(0)
+        os.sched_setaffinity(0, self.cpus)
+        self._restore.append(lambda: os.sched_setaffinity(0, before))
+        self.result.cpus = set(self.cpus)
+        self.result.applied["cpus"] = format_cpu_list(self.cpus)
+
+    def _set_nice(self) -> None:
+        before = os.getpriority(os.PRIO_PROCESS, 0)
+        os.setpriority(os.PRIO_PROCESS, 0, self.nice)
+        self._restore.append(lambda: os.setpriority(os.PRIO_PROCESS, 0, before))
+        self.result.nice = self.nice
+        self.result.applied["nice"] = str(self.nice)
+
+    def _set_policy(self) -> None:
+        policy = getattr(os, f"SCHED_{self.policy.upper()}")
+        # realtime policies take a priority; the lowest one is plenty to get ahead of everything else
+        priority = os.sched_get_priority_min(policy) if self.policy in ("fifo", "rr") else 0
+        before, before_param = os.sched_getscheduler(0), os.sched_getparam(0)
+        os.sched_setscheduler(0, policy, os.sched_param(priority))
+        self._restore.append(lambda: os.sched_setscheduler(0, before, before_param))
+        self.result.policy = policy
+        self.result.applied["policy"] = self.policy + (f" priority {priority}" if priority else "")
+
+    def _set_ionice(self) -> None:
+        import psutil
+
+        process = psutil.Process()
+        before = process.ionice()
+        # best effort at its highest level doesn't need privileges; realtime I/O could starve the system
+        process.ionice(psutil.IOPRIO_CLASS_BE, 0)
+        self._restore.append(lambda: process.ionice(before.ioclass, before.value))
+        self.result.ionice = (int(psutil.IOPRIO_CLASS_BE), 0)
+        self.result.applied["ionice"] = "best-effort 0"
+
+    def _drop_caches(self) -> None:
+        drop_caches(self.drop_caches_path)
+        self.result.caches_dropped = True
+        self.result.applied["caches"] = "dropped"
+
+    def __enter__(self) -> IsolationResult:
+        if self.cpus is not None:
+            self._try("cpus", self._pin)
+        if self.nice is not None:
+            self._try("nice", self._set_nice)
+        if self.policy != "other":
+            self._try("policy", self._set_policy)
+        if self.use_ionice:
+            self._try("ionice", self._set_ionice)
+        if self.drop_caches:
+            self._try("caches", self._drop_caches)
+        return self.result
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        # back to front, each setting is undone in the state it was applied in
+        for restore in reversed(self._restore):
+            try:
+                restore()
+            except OSError:
+                pass
+        self._restore = []
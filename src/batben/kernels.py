@@ -0,0 +1,307 @@
+"""
+Workload kernel registry.
+
+A kernel is one small, fixed slice of work (a quantum, for the load governor) plus the unit its events are
+counted in. The built-in ones look like what an IDE and its language server do all day: tokenize and parse
+source, search it with regexes, shuffle JSON, compress and hash. Their input is a fixed corpus of Python
+files shipped as package data (batben/corpus, a frozen snapshot of some of batben's modules, so editing
+batben doesn't change the input). Its fingerprint goes into the stored workload name, so runs on different
+corpora don't get compared by accident.
+
+More kernels can come from other packages through the `batben.kernels` entry point group, each entry point
+pointing at a Kernel:
+
+    [project.entry-points."batben.kernels"]
+    my_kernel = "my_package.module:MY_KERNEL"
+"""
+
+import ast
+import functools
+import hashlib
+import io
+import json
+import lzma
+import math
+import re
+import tokenize
+import zlib
+from dataclasses import dataclass, field
+from typing import Callable
+
+ENTRY_POINT_GROUP = "batben.kernels"
+CORPUS_SUFFIX = ".py.txt"  # not .py, so nothing imports, lints or collects the corpus
+
+
+@dataclass(frozen=True)
+class Kernel:
+    name: str
+    func: Callable[[], int]  # one quantum, returns events done; must be picklable (a module-level function)
+    unit: str
+    description: str = ""
+
+
+@functools.cache
+def corpus() -> tuple[tuple[str, str], ...]:
+    """(file name, source) of every file in the shipped corpus, sorted, so the input is the same everywhere."""
+    from importlib.resources import files
+
+    entries = sorted(
+        (entry.name.removesuffix(".txt"), entry)
+        for entry in files(__package__).joinpath("corpus").iterdir()
+        if entry.name.endswith(CORPUS_SUFFIX)
+    )
+    if not entries:
+        raise FileNotFoundError("batben's kernel corpus is missing from the installation")
+    return tuple((name, entry.read_text(encoding="utf-8")) for name, entry in entries)
+
+
+def corpus_fingerprint() -> str:
+    digest = hashlib.sha256()
+    for name, text in corpus():
+        digest.update(name.encode())
+        digest.update(text.encode())
+    return digest.hexdigest()[:12]
+
+
+_cursors = {}
+
+
+def _next_file(kernel: str) -> tuple[str, str]:
+    """Round robin over the corpus, separately for every kernel (and every worker process)."""
+    files = corpus()
+    i = _cursors.get(kernel, 0)
+    _cursors[kernel] = i + 1
+    return files[i % len(files)]
+
+
+def tokenize_kernel() -> int:
+    """Tokenizes one source file. Events: tokens."""
+    _, text = _next_file("tokenize")
+    return sum(1 for _ in tokenize.generate_tokens(io.StringIO(text).readline))
+
+
+def parse_kernel() -> int:
+    """Parses one source file into an AST and walks it. Events: lines."""
+    _, text = _next_file("parse")
+    for _ in ast.walk(ast.parse(text)):
+        pass
+    return text.count("\n")
+
+
+SEARCH_PATTERNS = [
+    re.compile(p, re.MULTILINE)
+    for p in (
+        r"^\s*def\s+(\w+)",
+        r"^\s*class\s+(\w+)",
+        r"\bTODO\b|\bFIXME\b",
+        r"self\.(\w+)\s*=",
+        r"\"[^\"\n]*\"|'[^'\n]*'",
+        r"\b\w+_\w+\(",
+    )
+]
+
+
+def regex_kernel() -> int:
+    """Find-in-files: every search pattern over one source file. Events: lines searched."""
+    _, text = _next_file("regex")
+    for pattern in SEARCH_PATTERNS:
+        for _ in pattern.finditer(text):
+            pass
+    return text.count("\n") * len(SEARCH_PATTERNS)
+
+
+@functools.cache
+def _outline(name: str, text: str) -> dict:
+    """What a language server would send for a file: its symbols and their positions."""
+    symbols = [
+        {"name": node.name, "kind": type(node).__name__, "line": node.lineno, "end": node.end_lineno}
+        for node in ast.walk(ast.parse(text))
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef))
+    ]
+    return {"uri": f"file:///{name}", "version": 1, "symbols": symbols, "lines": text.splitlines()}
+
+
+def json_kernel() -> int:
+    """Encodes and decodes one file's outline as JSON. Events: bytes encoded."""
+    name, text = _next_file("json")
+    encoded = json.dumps(_outline(name, text))
+    json.loads(encoded)
+    return len(encoded)
+
+
+def zlib_kernel() -> int:
+    """zlib round trip of one source file. Events: bytes in."""
+    _, text = _next_file("zlib")
+    data = text.encode()
+    zlib.decompress(zlib.compress(data, 6))
+    return len(data)
+
+
+def lzma_kernel() -> int:
+    """lzma compression of one source file, preset 1 (lzma is slow enough as it is). Events: bytes in."""
+    _, text = _next_file("lzma")
+    data = text.encode()
+    lzma.compress(data, preset=1)
+    return len(data)
+
+
+def hash_kernel() -> int:
+    """sha256 and blake2b of one source file, like a build cache checking what changed. Events: bytes hashed."""
+    _, text = _next_file("hash")
+    data = text.encode()
+    hashlib.sha256(data).digest()
+    hashlib.blake2b(data).digest()
+    return 2 * len(data)
+
+
+_matmul = None  # Operands, set up on first use in every process
+
+
+def matmul_kernel() -> int:
+    """
+    One 128x128 float64 matmul into a result allocated on first use, on one BLAS thread: the governor spreads
+    the load over its workers, a BLAS pool in each of them would add threads it doesn't know about. The pools
+    are set to one thread on first use and left there for the rest of the process.
+    Events: FLOPs.
+    """
+    global _matmul
+    from .matmul import Operands, thread_pools
+
+    if _matmul is None:
+        _matmul = Operands(128)  # imports numpy, so its BLAS is loaded before looking for pools
+        for pool in thread_pools():
+            pool.threads = 1
+    return _matmul.multiply()
+
+
+TOKENIZE = Kernel("tokenize", tokenize_kernel, "tokens", "tokenize Python source")
+PARSE = Kernel("parse", parse_kernel, "lines", "ast.parse and walk Python source")
+REGEX = Kernel("regex", regex_kernel, "lines", "find-in-files regex search")
+JSON = Kernel("json", json_kernel, "bytes", "JSON encode/decode of symbol outlines")
+ZLIB = Kernel("zlib", zlib_kernel, "bytes", "zlib compress/decompress")
+LZMA = Kernel("lzma", lzma_kernel, "bytes", "lzma compress")
+HASH = Kernel("hash", hash_kernel, "bytes", "sha256 + blake2b")
+MATMUL = Kernel("matmul", matmul_kernel, "flop", "128x128 float64 matrix multiply")
+
+BUILTIN_KERNELS = {k.name: k for k in (TOKENIZE, PARSE, REGEX, JSON, ZLIB, LZMA, HASH, MATMUL)}
+
+
+def available_kernels() -> dict[str, Kernel]:
+    """
+    The built-in kernels plus whatever the `batben.kernels` entry points provide. The built-ins are also
+    registered as entry points; listing them here too keeps a source checkout that isn't installed working.
+    An entry point that fails to load is skipped.
+    """
+    from importlib.metadata import entry_points
+
+    kernels = dict(BUILTIN_KERNELS)
+    for ep in entry_points(group=ENTRY_POINT_GROUP):
+        try:
+            kernel = ep.load()
+        except Exception:
+            continue
+        if isinstance(kernel, Kernel):
+            kernels[ep.name] = kernel
+    return kernels
+
+
+@dataclass
+class KernelRunResult:
+    """One governed run per kernel, back to back."""
+
+    corpus: str
+    runs: dict = field(default_factory=dict)  # kernel name -> (Kernel, GovernorResult)
+
+    @property
+    def duration(self) -> float:
+        return sum(r.duration for _, r in self.runs.values())
+
+    @property
+    def events(self) -> int:
+        return sum(r.events for _, r in self.runs.values())
+
+    @property
+    def quanta(self) -> int:
+        return sum(r.quanta for _, r in self.runs.values())
+
+    @property
+    def achieved(self) -> float:
+        if not self.duration:
+            return 0.0
+        return sum(r.achieved * r.duration for _, r in self.runs.values()) / self.duration
+
+    @property
+    def events_per_second(self) -> float:
+        """Geometric mean of the per-kernel rates: the units differ, so only ratios between runs mean anything."""
+        rates = [r.events_per_second for _, r in self.runs.values() if r.events_per_second > 0]
+        return math.exp(sum(map(math.log, rates)) / len(rates)) if rates else 0.0
+
+    def metrics(self) -> dict[str, float]:
+        return {f"kernel_{name}_per_s": r.events_per_second for name, (_, r) in self.runs.items()}
+
+    def report(self) -> str:
+        lines = [f"kernels on corpus {self.corpus}, average load {self.achieved:.1f}%"]
+        for name, (kernel, r) in self.runs.items():
+            lines.append(
+                f"  {name:<10} {r.events_per_second:>14.1f} {kernel.unit}/s  "
+                f"({r.quanta} quanta in {r.duration:.1f}s, {r.quantum_us:.0f}us each)"
+            )
+        lines.append(f"perf score of     events per second: {self.events_per_second:.2f}")
+        return "\n".join(lines)
+
+
+def run_kernels(
+    kernels: list[Kernel],
+    target: float,
+    duration: float,
+    should_stop: Callable[[], bool] | None = None,
+    **governor_kwargs,
+) -> KernelRunResult:
+    """
+    Runs every kernel under the load governor for an equal share of `duration`.
+    Once `should_stop` turns true, the remaining kernels are skipped.
+    """
+    from . import governor
+
+    if not kernels:
+        raise ValueError("no kernels to run")
+    result = KernelRunResult(corpus_fingerprint())
+    stopped = False
+
+    def stop() -> bool:
+        nonlocal stopped
+        stopped = stopped or (should_stop is not None and should_stop())
+        return stopped
+
+    for kernel in kernels:
+        run = governor.run_governed(kernel.func, target, duration / len(kernels), should_stop=stop, **governor_kwargs)
+        result.runs[kernel.name] = (kernel, run)
+        if stopped:
+            break
+    return result
+
+
+def _run_quanta(func: Callable[[], int], quanta: int) -> int:
+    return sum(func() for _ in range(quanta))
+
+
+def benchmark_kernels(kernels: list[Kernel], quanta: int = 100, warmup: int = 1, trials: int = 5, **harness_kwargs):
+    """
+    Every kernel flat out in this process, without the governor: `warmup` untimed and `trials` timed trials of
+    `quanta` quanta each, through harness.run_benchmark. One BenchmarkResult per kernel, in its own unit.
+    """
+    from .harness import run_benchmark
+
+    if not kernels:
+        raise ValueError("no kernels to run")
+    return [
+        run_benchmark(
+            _run_quanta,
+            (kernel.func, quanta),
+            name=f"{kernel.name} ({kernel.unit})",
+            warmup=warmup,
+            trials=trials,
+            **harness_kwargs,
+        )
+        for kernel in kernels
+    ]
@@ -0,0 +1,216 @@
+"""
+Interactive responsiveness.
+
+Profiles that save battery often do it by letting wakeups slip (deeper C-states, timer slack, slower
+frequency ramp-up), which is what people notice as UI lag. Two probes for that:
+
+- a cyclictest-style timer probe: a few periodic timers per mechanism (time.sleep, a selector, asyncio)
+  on absolute deadlines, recording how late every wakeup is. It runs next to the load governor.
+- a burst probe: sit idle, then time a short fixed burst of work. Compared with the same burst run
+  back to back, that's the cost of ramping the clock up from idle.
+
+Selectors and asyncio sit on epoll, which only takes milliseconds, so their lateness includes rounding
+up to the next millisecond. That's what an event-loop driven UI actually gets, so it's kept.
+"""
+
+import asyncio
+import selectors
+import statistics
+import threading
+import time
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from . import stats, workload
+
+MECHANISMS = ("sleep", "select", "asyncio")
+
+
+def _next_deadline(deadline: int, now: int, interval: int) -> int:
+    """Next deadline on the grid after `now`; periods we overran entirely are skipped, not made up."""
+    deadline += interval
+    if deadline <= now:
+        deadline += (now - deadline) // interval * interval + interval
+    return deadline
+
+
+def _sleep_timer(interval_ns: int, stop: threading.Event, out: list) -> None:
+    deadline = time.monotonic_ns() + interval_ns
+    while not stop.is_set():
+        delay = deadline - time.monotonic_ns()
+        if delay > 0:
+            time.sleep(delay / 1e9)
+        now = time.monotonic_ns()
+        out.append(now - deadline)
+        deadline = _next_deadline(deadline, now, interval_ns)
+
+
+def _select_timer(interval_ns: int, stop: threading.Event, out: list) -> None:
+    with selectors.DefaultSelector() as sel:
+        deadline = time.monotonic_ns() + interval_ns
+        while not stop.is_set():
+            delay = deadline - time.monotonic_ns()
+            if delay > 0:
+                sel.select(delay / 1e9)
+            now = time.monotonic_ns()
+            if now < deadline:
+                continue  # woke early, go back to sleep for the rest
+            out.append(now - deadline)
+            deadline = _next_deadline(deadline, now, interval_ns)
+
+
+async def _asyncio_timer(interval_ns: int, stop: threading.Event, out: list) -> None:
+    deadline = time.monotonic_ns() + interval_ns
+    while not stop.is_set():
+        delay = deadline - time.monotonic_ns()
+        if delay > 0:
+            await asyncio.sleep(delay / 1e9)
+        now = time.monotonic_ns()
+        if now < deadline:
+            continue
+        out.append(now - deadline)
+        deadline = _next_deadline(deadline, now, interval_ns)
+
+
+def _asyncio_timers(interval_ns: int, stop: threading.Event, outs: list[list]) -> None:
+    async def main():
+        await asyncio.gather(*(_asyncio_timer(interval_ns, stop, out) for out in outs))
+
+    asyncio.run(main())
+
+
+@dataclass
+class LatencyResult:
+    interval_us: float
+    duration: float
+    lateness_ns: dict[str, np.ndarray]  # per mechanism
+
+    def all_ns(self) -> np.ndarray:
+        parts = [v for v in self.lateness_ns.values() if len(v)]
+        return np.concatenate(parts) if parts else np.zeros(0, dtype=np.int64)
+
+    def percentile_us(self, q: float, mechanism: str | None = None) -> float:
+        values = self.all_ns() if mechanism is None else self.lateness_ns[mechanism]
+        return float(np.percentile(values, q)) / 1e3 if len(values) else float("nan")
+
+    def metrics(self) -> dict[str, float]:
+        """Flat numbers for the results store."""
+        out = {"duration": self.duration}
+        for name, q in (("p50", 50), ("p99", 99), ("p999", 99.9), ("max", 100)):
+            out[f"latency_{name}_us"] = self.percentile_us(q)
+        for mechanism in self.lateness_ns:
+            out[f"{mechanism}_p99_us"] = self.percentile_us(99, mechanism)
+        return out
+
+    def report(self) -> str:
+        lines = [f"Timer wakeup latency, {self.interval_us:.0f}us period, {self.duration:.1f}s"]
+        for mechanism, values in {**self.lateness_ns, "all": self.all_ns()}.items():
+            if not len(values):
+                lines.append(f"  {mechanism:<8} no wakeups")
+                continue
+            p = [self.percentile_us(q, None if mechanism == "all" else mechanism) for q in (50, 99, 99.9, 100)]
+            lines.append(
+                f"  {mechanism:<8} {len(values):>8} wakeups  p50 {p[0]:>8.1f}us  p99 {p[1]:>8.1f}us  "
+                f"p99.9 {p[2]:>8.1f}us  max {p[3]:>9.1f}us"
+            )
+        lines.append(stats.format_histogram(stats.log2_histogram((self.all_ns() / 1e3).tolist())))
+        return "\n".join(lines)
+
+
+class LatencyProbe:
+    """
+    Runs `timers` periodic timers per mechanism, every `interval` seconds, on background threads between
+    `start` and `stop`. The asyncio timers share one event loop, like the tasks of an app would.
+    """
+
+    def __init__(self, interval: float = 0.001, timers: int = 4, mechanisms=MECHANISMS):
+        unknown = set(mechanisms) - set(MECHANISMS)
+        if unknown:
+            raise ValueError(f"unknown timer mechanism(s): {', '.join(sorted(unknown))}")
+        if interval <= 0 or timers < 1:
+            raise ValueError("interval and timers must be positive")
+        self.interval = interval
+        self.timers = timers
+        self.mechanisms = tuple(mechanisms)
+        self._stop = threading.Event()
+        self._threads = []
+        self._samples = {}
+        self._started = None
+
+    def start(self) -> None:
+        interval_ns = int(self.interval * 1e9)
+        self._stop.clear()
+        self._samples = {m: [[] for _ in range(self.timers)] for m in self.mechanisms}
+        for mechanism, outs in self._samples.items():
+            if mechanism == "asyncio":
+                targets = [(_asyncio_timers, outs)]
+            else:
+                func = _sleep_timer if mechanism == "sleep" else _select_timer
+                targets = [(func, out) for out in outs]
+            for i, (func, out) in enumerate(targets):
+                thread = threading.Thread(
+                    target=func, args=(interval_ns, self._stop, out), name=f"batben-{mechanism}-{i}", daemon=True
+                )
+                self._threads.append(thread)
+        self._started = time.monotonic()
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self) -> LatencyResult:
+        self._stop.set()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        duration = time.monotonic() - self._started
+        lateness = {m: np.array([v for out in outs for v in out], dtype=np.int64) for m, outs in self._samples.items()}
+        return LatencyResult(self.interval * 1e6, duration, lateness)
+
+
+@dataclass
+class BurstResult:
+    idle: float
+    quanta: int
+    cold_ns: list[int] = field(default_factory=list)  # burst right after `idle` seconds asleep
+    warm_ns: list[int] = field(default_factory=list)  # the same burst again, right away
+
+    @property
+    def cold_us(self) -> float:
+        return statistics.median(self.cold_ns) / 1e3
+
+    @property
+    def warm_us(self) -> float:
+        return statistics.median(self.warm_ns) / 1e3
+
+    @property
+    def ramp_penalty(self) -> float:
+        """How much longer a burst takes coming out of idle; 1.0 means no penalty."""
+        return self.cold_us / self.warm_us if self.warm_us else float("nan")
+
+    def metrics(self) -> dict[str, float]:
+        return {"burst_cold_us": self.cold_us, "burst_warm_us": self.warm_us, "ramp_penalty": self.ramp_penalty}
+
+    def report(self) -> str:
+        return (
+            f"Burst of {self.quanta} quanta after {self.idle * 1e3:.0f}ms idle, {len(self.cold_ns)} repeats\n"
+            f"  from idle  p50 {self.cold_us:>9.1f}us  max {max(self.cold_ns) / 1e3:>9.1f}us\n"
+            f"  warm       p50 {self.warm_us:>9.1f}us  max {max(self.warm_ns) / 1e3:>9.1f}us\n"
+            f"  ramp-up penalty: {self.ramp_penalty:.2f}x"
+        )
+
+
+def burst_latency(
+    idle: float = 0.5, repeats: int = 20, quanta: int = 20, kernel=workload.cpu_quantum, wait=time.sleep
+) -> BurstResult:
+    """Sleeps `idle` seconds, times `quanta` calls of `kernel`, times them again right away; `repeats` times."""
+    if repeats < 1 or quanta < 1:
+        raise ValueError("repeats and quanta must be positive")
+    result = BurstResult(idle, quanta)
+    for _ in range(repeats):
+        wait(idle)
+        for samples in (result.cold_ns, result.warm_ns):
+            start = time.perf_counter_ns()
+            for _ in range(quanta):
+                kernel()
+            samples.append(time.perf_counter_ns() - start)
+    return result
@@ -0,0 +1,213 @@
+"""
+Matrix multiply GFLOPS, with the BLAS thread count under our control.
+
+Vector-heavy work reacts to power caps very differently from scalar Python loops: AVX clocks, package power
+limits and how many cores the BLAS decides to light up. gpu_task buried that under allocation and RNG cost
+and let BLAS pick its own thread count. This preallocates the operands, writes into a preallocated result
+with out=, counts FLOPs (2n^3 per multiply) and sweeps sizes and thread counts.
+
+Thread control talks to whichever BLAS/OpenMP runtimes are loaded in the process, the way threadpoolctl
+does: find them in /proc/self/maps and call their own get/set functions through ctypes.
+"""
+
+import contextlib
+import ctypes
+import os
+import re
+import statistics
+import time
+from dataclasses import dataclass, field
+
+# (api, library file pattern, getter symbols, setter symbols), symbols tried in order
+THREAD_APIS = [
+    (
+        "openblas",
+        r"openblas",
+        [
+            "openblas_get_num_threads",
+            "openblas_get_num_threads64_",
+            "scipy_openblas_get_num_threads",
+            "scipy_openblas_get_num_threads64_",
+        ],
+        [
+            "openblas_set_num_threads",
+            "openblas_set_num_threads64_",
+            "scipy_openblas_set_num_threads",
+            "scipy_openblas_set_num_threads64_",
+        ],
+    ),
+    ("mkl", r"mkl_rt|libmkl_core", ["MKL_Get_Max_Threads"], ["MKL_Set_Num_Threads"]),
+    ("blis", r"libblis", ["bli_thread_get_num_threads"], ["bli_thread_set_num_threads"]),
+    ("openmp", r"libgomp|libiomp|libomp", ["omp_get_max_threads"], ["omp_set_num_threads"]),
+]
+
+
+@dataclass
+class ThreadPool:
+    api: str
+    path: str
+    _get: object = field(repr=False)
+    _set: object = field(repr=False)
+
+    @property
+    def threads(self) -> int:
+        return self._get()
+
+    @threads.setter
+    def threads(self, n: int) -> None:
+        self._set(n)
+
+
+def _loaded_libraries(maps: str = "/proc/self/maps") -> list[str]:
+    try:
+        with open(maps) as f:
+            paths = {line.split()[-1] for line in f if ".so" in line}
+    except OSError:
+        return []
+    return sorted(p for p in paths if p.startswith("/"))
+
+
+def thread_pools(maps: str = "/proc/self/maps") -> list[ThreadPool]:
+    """Every BLAS/OpenMP runtime loaded right now that we know how to talk to. Import numpy first."""
+    pools = []
+    for path in _loaded_libraries(maps):
+        name = os.path.basename(path)
+        for api, pattern, getters, setters in THREAD_APIS:
+            if not re.search(pattern, name):
+                continue
+            try:
+                lib = ctypes.CDLL(path)
+            except OSError:
+                continue
+            get = next((getattr(lib, s) for s in getters if hasattr(lib, s)), None)
+            set_ = next((getattr(lib, s) for s in setters if hasattr(lib, s)), None)
+            if get is not None and set_ is not None:
+                get.restype = ctypes.c_int
+                set_.argtypes = [ctypes.c_int]
+                pools.append(ThreadPool(api, path, get, set_))
+            break
+    return pools
+
+
+@contextlib.contextmanager
+def limit_threads(n: int, pools: list[ThreadPool] | None = None):
+    """Sets every loaded BLAS/OpenMP pool to `n` threads for the duration of the block, then puts them back."""
+    pools = thread_pools() if pools is None else pools
+    before = [pool.threads for pool in pools]
+    for pool in pools:
+        pool.threads = n
+    try:
+        yield pools
+    finally:
+        for pool, threads in zip(pools, before):
+            pool.threads = threads
+
+
+class Operands:
+    """A, B and the result buffer for n x n float64 matmuls, allocated and filled once."""
+
+    def __init__(self, n: int, seed: int = 0):
+        import numpy as np
+
+        rng = np.random.default_rng(seed)
+        self.n = n
+        self.a = rng.random((n, n))
+        self.b = rng.random((n, n))
+        self.c = np.empty((n, n))
+
+    def multiply(self) -> int:
+        """One multiply into the preallocated result. Returns the FLOPs done."""
+        import numpy as np
+
+        np.matmul(self.a, self.b, out=self.c)
+        return 2 * self.n**3
+
+
+@dataclass
+class MatmulPoint:
+    size: int
+    threads: int  # 0 if no BLAS pool was found to pin, so the BLAS picked its own
+    seconds: float  # median time per multiply
+
+    @property
+    def gflops(self) -> float:
+        return 2 * self.size**3 / self.seconds / 1e9 if self.seconds > 0 else 0.0
+
+
+def time_multiply(operands: Operands, min_time: float = 0.2, min_repeats: int = 3, clock=time.perf_counter) -> float:
+    """Median seconds per multiply, after one warmup, repeating for at least `min_time` seconds."""
+    operands.multiply()
+    timings = []
+    start = clock()
+    while len(timings) < min_repeats or clock() - start < min_time:
+        t = clock()
+        operands.multiply()
+        timings.append(clock() - t)
+    return statistics.median(timings)
+
+
+@dataclass
+class MatmulResult:
+    pools: list[str]
+    points: list[MatmulPoint] = field(default_factory=list)
+
+    def point(self, size: int, threads: int) -> MatmulPoint | None:
+        return next((p for p in self.points if p.size == size and p.threads == threads), None)
+
+    def scaling(self, size: int) -> dict[int, float]:
+        """Parallel efficiency per thread count at `size`: GFLOPS(t) / (t * GFLOPS(1))."""
+        base = self.point(size, 1)
+        if base is None or not base.gflops:
+            return {}
+        return {p.threads: p.gflops / (p.threads * base.gflops) for p in self.points if p.size == size}
+
+    @property
+    def peak_gflops(self) -> float:
+        return max((p.gflops for p in self.points), default=0.0)
+
+    def metrics(self) -> dict[str, float]:
+        out = {"peak_gflops": self.peak_gflops}
+        out.update({f"gflops_{p.size}_t{p.threads}": p.gflops for p in self.points})
+        return out
+
+    def report(self) -> str:
+        sizes = sorted({p.size for p in self.points})
+        threads = sorted({p.threads for p in self.points})
+        control = ", ".join(self.pools) or "none found, threading left to the BLAS"
+        lines = [f"matmul GFLOPS (float64), thread control: {control}"]
+        lines.append(f"{'size':>6} " + " ".join(f"{f'{t} thr' if t else 'BLAS thr':>9}" for t in threads))
+        for size in sizes:
+            cells = [self.point(size, t) for t in threads]
+            lines.append(f"{size:>6} " + " ".join(f"{c.gflops:>9.1f}" if c else f"{'-':>9}" for c in cells))
+        if len(threads) > 1 and sizes:
+            eff = self.scaling(sizes[-1])
+            lines.append(f"scaling at {sizes[-1]}: " + ", ".join(f"{t} thr {e:.0%}" for t, e in sorted(eff.items())))
+        return "\n".join(lines)
+
+
+def default_threads() -> list[int]:
+    """1, 2, 4, ... up to the cores we may run on, always including that count."""
+    cores = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1
+    counts = []
+    t = 1
+    while t < cores:
+        counts.append(t)
+        t *= 2
+    return counts + [cores]
+
+
+def run_matmul(sizes=(256, 512, 1024), threads=None, min_time: float = 0.2) -> MatmulResult:
+    """GFLOPS for every size at every thread count. Operands are allocated once per size, outside the timing."""
+    import numpy as np  # noqa: F401  (loads the BLAS, so thread_pools can find it)
+
+    pools = thread_pools()
+    threads = default_threads() if threads is None else list(threads)
+    if not pools:
+        threads = [0]  # can't control it, so one pass with whatever the BLAS picks, count unknown
+    result = MatmulResult([f"{p.api} ({os.path.basename(p.path)})" for p in pools])
+    operands = {n: Operands(n) for n in sizes}
+    for t in threads:
+        with limit_threads(t, pools):
+            for n in sizes:
+                result.points.append(MatmulPoint(n, t, time_multiply(operands[n], min_time)))
+    return result
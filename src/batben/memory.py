@@ -0,0 +1,158 @@
+"""
+Memory bandwidth and latency suite.
+
+STREAM-style copy/scale/add/triad on preallocated numpy arrays for bandwidth, and a random pointer chase for
+latency, at working sets sized to land in each cache level and then in DRAM. Memory power states are one of
+the things TLP and tuned change, so this is worth running per profile.
+"""
+
+import glob
+import os
+import time
+from dataclasses import dataclass, field
+
+import numpy as np
+
+CACHE_ROOT = "/sys/devices/system/cpu/cpu0/cache"
+CACHE_LINE = 64
+SEED = 20251130
+
+# bytes the numpy version of each kernel moves per element, counting each array read or written once per pass.
+# numpy has no fused multiply-add, so triad is two passes (c * q into a, then b + a into a): 16 + 24, where
+# STREAM's own count is 24
+STREAM_BYTES = {"copy": 16, "scale": 16, "add": 24, "triad": 40}
+
+
+def _parse_size(text: str) -> int:
+    text = text.strip().upper()
+    units = {"K": 1 << 10, "M": 1 << 20, "G": 1 << 30}
+    if text and text[-1] in units:
+        return int(text[:-1]) * units[text[-1]]
+    return int(text)
+
+
+def cache_sizes(root: str = CACHE_ROOT) -> dict[str, int]:
+    """Data/unified cache sizes of cpu0 from sysfs, keyed L1/L2/L3..."""
+    sizes = {}
+    for index in sorted(glob.glob(os.path.join(root, "index*"))):
+        try:
+            with open(os.path.join(index, "type")) as f:
+                if f.read().strip() == "Instruction":
+                    continue
+            with open(os.path.join(index, "level")) as f:
+                level = f"L{f.read().strip()}"
+            with open(os.path.join(index, "size")) as f:
+                sizes[level] = _parse_size(f.read())
+        except (OSError, ValueError):
+            continue
+    return sizes
+
+
+def working_sets(caches: dict[str, int] | None = None) -> list[tuple[str, int]]:
+    """
+    (label, bytes) pairs that step through the hierarchy: half of each cache level, then 4x the
+    last level for DRAM. Falls back to typical laptop sizes if sysfs doesn't say.
+    """
+    caches = caches if caches is not None else cache_sizes()
+    if not caches:
+        caches = {"L1": 32 << 10, "L2": 512 << 10, "L3": 8 << 20}
+    sets = [(level, size // 2) for level, size in sorted(caches.items())]
+    sets.append(("DRAM", max(caches.values()) * 4))
+    return sets
+
+
+@dataclass
+class MemoryLevelResult:
+    label: str
+    size_bytes: int
+    bandwidth: dict[str, float] = field(default_factory=dict)  # GB/s per STREAM kernel
+    latency_ns: float = 0.0
+
+
+@dataclass
+class MemorySuiteResult:
+    levels: list[MemoryLevelResult] = field(default_factory=list)
+
+    @property
+    def baseline_ns(self) -> float:
+        """Latency of the smallest working set: mostly interpreter overhead plus an L1 hit."""
+        return min(level.latency_ns for level in self.levels) if self.levels else 0.0
+
+    def report(self) -> str:
+        header = f"{'level':<6} {'size':>10}" + "".join(f" {k + ' GB/s':>12}" for k in STREAM_BYTES)
+        lines = [header + f" {'ns/access':>10} {'above L1':>9}"]
+        for lvl in self.levels:
+            row = f"{lvl.label:<6} {lvl.size_bytes >> 10:>8}K"
+            row += "".join(f" {lvl.bandwidth[k]:>12.2f}" for k in STREAM_BYTES)
+            row += f" {lvl.latency_ns:>10.1f} {lvl.latency_ns - self.baseline_ns:>9.1f}"
+            lines.append(row)
+        return "\n".join(lines)
+
+
+def stream(size_bytes: int, repeats: int = 5, min_bytes: int = 256 << 20) -> dict[str, float]:
+    """
+    GB/s for each STREAM kernel over three float64 arrays that together take `size_bytes`.
+    Small working sets are looped until each timing covers at least `min_bytes` of traffic,
+    otherwise the numpy call overhead is all you'd see. Best of `repeats`.
+    """
+    n = max(size_bytes // (3 * 8), 1)
+    rng = np.random.default_rng(SEED)
+    a, b, c = rng.random(n), rng.random(n), np.empty(n)
+    q = 3.0
+    kernels = {
+        "copy": lambda: np.copyto(c, a),
+        "scale": lambda: np.multiply(c, q, out=b),
+        "add": lambda: np.add(a, b, out=c),
+        "triad": lambda: np.add(b, np.multiply(c, q, out=a), out=a),
+    }
+    result = {}
+    for name, kernel in kernels.items():
+        moved = STREAM_BYTES[name] * n
+        inner = max(1, min_bytes // moved)
+        best = None
+        for _ in range(repeats):
+            start = time.perf_counter_ns()
+            for _ in range(inner):
+                kernel()
+            elapsed = time.perf_counter_ns() - start
+            best = elapsed if best is None else min(best, elapsed)
+        result[name] = moved * inner / max(best, 1)  # bytes per ns == GB/s
+    return result
+
+
+def chase_buffer(size_bytes: int, seed: int = SEED) -> np.ndarray:
+    """
+    A single random cycle through one slot per cache line: shuffle the lines, then point each one at the next
+    in shuffled order. Every line gets visited before the chase comes back around, and the prefetcher can't guess.
+    """
+    slots = CACHE_LINE // 8
+    lines = max(size_bytes // CACHE_LINE, 2)
+    order = np.random.default_rng(seed).permutation(lines)
+    buf = np.zeros(lines * slots, dtype=np.int64)
+    buf[order * slots] = np.roll(order, -1) * slots
+    return buf
+
+
+def pointer_chase(buf: np.ndarray, steps: int = 200_000) -> float:
+    """
+    ns per dependent load, chasing through `buf` via a memoryview so each hop reads the numpy buffer itself.
+    Includes the interpreter's per-iteration cost, compare against the smallest working set.
+    """
+    mv = memoryview(buf)
+    i = 0
+    start = time.perf_counter_ns()
+    for _ in range(steps):
+        i = mv[i]
+    return (time.perf_counter_ns() - start) / steps
+
+
+def run_memory_suite(sets: list[tuple[str, int]] | None = None, repeats: int = 5, steps: int = 200_000):
+    result = MemorySuiteResult()
+    for label, size in sets or working_sets():
+        level = MemoryLevelResult(label, size)
+        level.bandwidth = stream(size, repeats=repeats)
+        buf = chase_buffer(size)
+        pointer_chase(buf, steps=min(steps, len(buf)))  # warm the TLB and the caches
+        level.latency_ns = pointer_chase(buf, steps=steps)
+        result.levels.append(level)
+    return result
@@ -0,0 +1,177 @@
+"""
+Network workload against a local HTTP server.
+
+Hitting google.com needs internet, picks up the remote server's noise and gets rate limited.
+This starts a tiny asyncio HTTP/1.1 server on localhost (on its own thread and event loop) and drives
+it with httpx.AsyncClient, either over pooled keep-alive connections or with a fresh connect per request.
+It's still the full socket path with all its wakeups, just deterministic and offline.
+"""
+
+import asyncio
+import functools
+import threading
+import time
+from dataclasses import dataclass, field
+
+import httpx
+import numpy as np
+
+from . import stats
+
+
+@functools.cache
+def _payload(size: int) -> bytes:
+    return bytes(i % 251 for i in range(size))
+
+
+async def _handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    """
+    Serves GET /bytes/<n> with n bytes of payload, keeping the connection open unless asked not to.
+    """
+    try:
+        while True:
+            try:
+                head = await reader.readuntil(b"\r\n\r\n")
+            except (asyncio.IncompleteReadError, ConnectionError):
+                return
+            request_line, *headers = head.decode("latin-1").split("\r\n")
+            _, path, _ = request_line.split(" ", 2)
+            close = any(h.lower() == "connection: close" for h in headers)
+            try:
+                body = _payload(int(path.rsplit("/", 1)[-1]))
+                status = "200 OK"
+            except ValueError:
+                body, status = b"not found", "404 Not Found"
+            writer.write(
+                f"HTTP/1.1 {status}\r\nContent-Length: {len(body)}\r\nContent-Type: application/octet-stream\r\n"
+                f"{'Connection: close' if close else 'Connection: keep-alive'}\r\n\r\n".encode("latin-1")
+                + body
+            )
+            await writer.drain()
+            if close:
+                return
+    finally:
+        writer.close()
+
+
+class LocalServer:
+    """
+    The HTTP server on 127.0.0.1 and a free port, running on a background thread.
+    Use as a context manager; `url` is only valid inside it.
+    """
+
+    def __init__(self, host: str = "127.0.0.1"):
+        self.host = host
+        self.port = None
+        self._loop = None
+        self._thread = None
+        self._ready = threading.Event()
+        self._stopped = None
+        self._error = None  # what stopped the server from starting, raised again in __enter__
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def _run(self) -> None:
+        self._loop = asyncio.new_event_loop()
+        try:
+            self._loop.run_until_complete(self._serve())
+        except BaseException as e:
+            self._error = e
+        finally:
+            self._ready.set()  # also when it failed, so __enter__ doesn't wait forever
+            self._loop.close()
+
+    async def _serve(self) -> None:
+        self._stopped = asyncio.Event()
+        server = await asyncio.start_server(_handle, self.host, 0, backlog=1024)
+        self.port = server.sockets[0].getsockname()[1]
+        self._ready.set()
+        async with server:
+            await self._stopped.wait()
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._run, name="batben-http-server", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        if self._error is not None:
+            self._thread.join()
+            raise self._error
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._loop.call_soon_threadsafe(self._stopped.set)
+        self._thread.join()
+
+
+@dataclass
+class NetResult:
+    requests: int
+    concurrency: int
+    payload: int
+    pooled: bool
+    elapsed: float
+    failures: int = 0
+    latencies_ns: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.int64), repr=False)
+
+    @property
+    def requests_per_s(self) -> float:
+        return (self.requests - self.failures) / self.elapsed if self.elapsed > 0 else 0.0
+
+    def percentile_us(self, q: float) -> float:
+        return float(np.percentile(self.latencies_ns, q)) / 1e3 if len(self.latencies_ns) else 0.0
+
+    def report(self) -> str:
+        kind = "pooled keep-alive" if self.pooled else "cold connects"
+        lines = [
+            f"{kind}, concurrency {self.concurrency}, {self.payload}B payload: "
+            f"{self.requests_per_s:.0f} req/s, p50 {self.percentile_us(50):.0f}us, "
+            f"p99 {self.percentile_us(99):.0f}us, {self.failures} failed",
+            stats.format_histogram(stats.log2_histogram(self.latencies_ns / 1e3)),
+        ]
+        return "\n".join(lines)
+
+
+async def _drive(url: str, requests: int, concurrency: int, payload: int, pooled: bool) -> NetResult:
+    latencies = np.zeros(requests, dtype=np.int64)
+    ok = np.zeros(requests, dtype=bool)
+    if pooled:
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        headers = {}
+    else:
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=0)
+        headers = {"Connection": "close"}
+    target = f"{url}/bytes/{payload}"
+    next_request = iter(range(requests))
+
+    async with httpx.AsyncClient(limits=limits, headers=headers, timeout=10) as client:
+
+        async def worker():
+            for i in next_request:
+                start = time.perf_counter_ns()
+                try:
+                    response = await client.get(target)
+                    ok[i] = response.status_code == 200 and len(response.content) == payload
+                except httpx.HTTPError:
+                    pass
+                latencies[i] = time.perf_counter_ns() - start
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    return NetResult(requests, concurrency, payload, pooled, elapsed, int((~ok).sum()), latencies[ok])
+
+
+def run_network(
+    requests: int = 2000, concurrency: int = 8, payload: int = 1024, pooled: bool = True, url: str | None = None
+) -> NetResult:
+    """
+    Fires `requests` GETs at the local server (or at `url` if you bring your own that speaks /bytes/<n>)
+    from `concurrency` coroutines at once.
+    """
+    if url is not None:
+        return asyncio.run(_drive(url, requests, concurrency, payload, pooled))
+    with LocalServer() as server:
+        return asyncio.run(_drive(server.url, requests, concurrency, payload, pooled))
@@ -0,0 +1,288 @@
+"""
+Background noise attribution.
+
+A 10% load run is easy to skew: an indexer, a browser tab or a package update waking up halfway through
+burns battery that the benchmark gets blamed for. This samples every process's CPU time and I/O during the
+run and splits them into batben (this process and everything it spawned) and everyone else, so a run with
+too much going on next to it gets flagged instead of quietly landing in the results.
+
+With hundreds of processes this has to stay cheap: /proc/<pid>/stat and io are opened once per process and
+re-read with pread, and each sample only opens files for pids that appeared and closes the ones that went.
+"""
+
+import os
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+
+_TICK = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+
+@dataclass
+class ProcCounters:
+    comm: str
+    ppid: int
+    starttime: int  # in ticks since boot; with the pid it identifies a process across pid reuse
+    cpu_s: float
+    minor_faults: int = 0
+    read_bytes: int = 0
+    write_bytes: int = 0
+
+
+def parse_stat(stat: str) -> ProcCounters:
+    """A /proc/<pid>/stat line; the I/O counters are left at 0, they come from parse_io."""
+    # comm can contain spaces and parentheses, the fields after the last ')' can't
+    comm = stat[stat.index("(") + 1 : stat.rindex(")")]
+    fields = stat[stat.rindex(")") + 2 :].split()
+    # fields[0] is field 3 (state) in proc(5): ppid is 4, minflt 10, utime 14, stime 15, starttime 22
+    return ProcCounters(
+        comm,
+        ppid=int(fields[1]),
+        starttime=int(fields[19]),
+        cpu_s=(int(fields[11]) + int(fields[12])) / _TICK,
+        minor_faults=int(fields[7]),
+    )
+
+
+def parse_io(io: str) -> tuple[int, int]:
+    read_bytes = write_bytes = 0
+    for line in io.splitlines():
+        key, _, value = line.partition(":")
+        if key == "read_bytes":
+            read_bytes = int(value)
+        elif key == "write_bytes":
+            write_bytes = int(value)
+    return read_bytes, write_bytes
+
+
+def _raise_fd_limit() -> None:
+    """Two fds per process adds up; lift the soft limit to the hard one where we can."""
+    try:
+        import resource
+
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        if soft != resource.RLIM_INFINITY and (hard == resource.RLIM_INFINITY or soft < hard):
+            resource.setrlimit(resource.RLIMIT_NOFILE, (hard if hard != resource.RLIM_INFINITY else 65536, hard))
+    except (ImportError, ValueError, OSError):
+        pass
+
+
+def _open(path: str) -> int | None:
+    try:
+        return os.open(path, os.O_RDONLY)
+    except OSError:
+        return None
+
+
+class ProcessTable:
+    """
+    Counters of every process under `proc_root`, read through cached fds. /proc/<pid>/io is only readable
+    for our own processes (or as root); without it a process's I/O counters stay 0.
+    """
+
+    def __init__(self, proc_root: str = "/proc"):
+        self.proc_root = proc_root
+        self._fds = {}  # pid -> (stat fd, io fd or None)
+
+    def _read(self, pid: int) -> ProcCounters | None:
+        stat_fd, io_fd = self._fds[pid]
+        try:
+            counters = parse_stat(os.pread(stat_fd, 4096, 0).decode(errors="replace"))
+        except (OSError, ValueError, IndexError):
+            return None  # gone (ESRCH), or a zombie mid-teardown
+        if io_fd is not None:
+            try:
+                counters.read_bytes, counters.write_bytes = parse_io(os.pread(io_fd, 4096, 0).decode())
+            except (OSError, ValueError):
+                pass
+        return counters
+
+    def _forget(self, pid: int) -> None:
+        for fd in self._fds.pop(pid):
+            if fd is not None:
+                os.close(fd)
+
+    def sample(self) -> dict[int, ProcCounters]:
+        try:
+            pids = {int(name) for name in os.listdir(self.proc_root) if name.isdigit()}
+        except OSError:
+            return {}
+        for pid in self._fds.keys() - pids:
+            self._forget(pid)
+        for pid in pids - self._fds.keys():
+            stat_fd = _open(os.path.join(self.proc_root, str(pid), "stat"))
+            if stat_fd is not None:
+                self._fds[pid] = (stat_fd, _open(os.path.join(self.proc_root, str(pid), "io")))
+        out = {}
+        for pid in list(self._fds):
+            counters = self._read(pid)
+            if counters is None:
+                self._forget(pid)
+            else:
+                out[pid] = counters
+        return out
+
+    def close(self) -> None:
+        for pid in list(self._fds):
+            self._forget(pid)
+
+    def __len__(self) -> int:
+        return len(self._fds)
+
+
+@dataclass
+class ProcessUsage:
+    comm: str
+    processes: int
+    cpu_s: float
+    read_bytes: int
+    write_bytes: int
+
+
+@dataclass
+class NoiseResult:
+    duration: float
+    ours_cpu_s: float
+    other_cpu_s: float
+    threshold: float
+    processes: int  # distinct processes seen
+    offenders: list[ProcessUsage] = field(default_factory=list)  # everyone else by command, busiest first
+    energy_wh: float | None = None  # what the run spent, filled in by whoever measured it
+
+    @property
+    def share(self) -> float:
+        """Everyone else's part of the CPU time spent by all processes during the run."""
+        total = self.ours_cpu_s + self.other_cpu_s
+        return self.other_cpu_s / total if total > 0 else 0.0
+
+    @property
+    def flagged(self) -> bool:
+        return self.share > self.threshold
+
+    @property
+    def other_wh(self) -> float | None:
+        """
+        Rough energy estimate for everyone else: the run's energy split by CPU time. Idle power and the
+        display don't belong to any process, so this overstates both sides in absolute terms.
+        """
+        return self.energy_wh * self.share if self.energy_wh is not None else None
+
+    def metrics(self) -> dict[str, float]:
+        out = {
+            "noise_share": self.share,
+            "noise_cpu_s": self.other_cpu_s,
+            "batben_cpu_s": self.ours_cpu_s,
+            "noise_flagged": float(self.flagged),
+        }
+        if self.other_wh is not None:
+            out["noise_wh"] = self.other_wh
+        return out
+
+    def report(self, top: int = 5) -> str:
+        energy = f", ~{self.other_wh:.3f}Wh of {self.energy_wh:.3f}Wh" if self.other_wh is not None else ""
+        lines = [
+            f"background: {self.share:.1%} of CPU time ({self.other_cpu_s:.1f}s vs batben {self.ours_cpu_s:.1f}s"
+            f"{energy}) across {self.processes} processes"
+        ]
+        if self.flagged:
+            lines.append(f"WARNING: background activity above {self.threshold:.0%}, this run is probably skewed")
+        for usage in self.offenders[:top]:
+            io = (usage.read_bytes + usage.write_bytes) / 1e6
+            count = f" x{usage.processes}" if usage.processes > 1 else ""
+            lines.append(f"  {usage.comm + count:<24} {usage.cpu_s:>7.2f}s CPU {io:>9.1f}MB I/O")
+        return "\n".join(lines)
+
+
+class NoiseSampler:
+    """
+    Samples the process table every `interval` seconds on a background thread between `start` and `stop`.
+    A process's usage is its latest reading minus its first one (zero if it started during the run); one that
+    exits keeps what it had at the last sample before it went.
+    """
+
+    def __init__(
+        self,
+        proc_root: str = "/proc",
+        interval: float = 1.0,
+        threshold: float = 0.1,
+        pid: int | None = None,
+        clock=time.monotonic,
+    ):
+        if interval <= 0:
+            raise ValueError("interval must be positive")
+        self.interval = interval
+        self.threshold = threshold
+        self.pid = os.getpid() if pid is None else pid
+        self._clock = clock
+        self._table = ProcessTable(proc_root)
+        self._first = {}  # (pid, starttime) -> ProcCounters at the first sample
+        self._last = {}
+        self._ours = set()
+        self._started = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _update(self, snapshot: dict[int, ProcCounters], first: bool = False) -> None:
+        children = defaultdict(list)
+        for pid, counters in snapshot.items():
+            children[counters.ppid].append(pid)
+        todo = [self.pid]
+        while todo:
+            pid = todo.pop()
+            if pid in snapshot:
+                self._ours.add((pid, snapshot[pid].starttime))
+            todo.extend(children.get(pid, ()))
+        for pid, counters in snapshot.items():
+            key = (pid, counters.starttime)
+            if first:
+                self._first[key] = counters
+            self._last[key] = counters
+
+    def sample(self) -> None:
+        """Takes one reading. The thread calls this, tests can too."""
+        self._update(self._table.sample())
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def start(self, thread: bool = True) -> None:
+        _raise_fd_limit()
+        self._first, self._last, self._ours = {}, {}, set()
+        self._started = self._clock()
+        self._update(self._table.sample(), first=True)
+        if thread:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="batben-noise", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> NoiseResult:
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        self.sample()
+        self._table.close()
+        ours = other = 0.0
+        by_comm = {}
+        for key, last in self._last.items():
+            first = self._first.get(key)
+            cpu = last.cpu_s - (first.cpu_s if first else 0.0)
+            read = last.read_bytes - (first.read_bytes if first else 0)
+            write = last.write_bytes - (first.write_bytes if first else 0)
+            if key in self._ours:
+                ours += cpu
+                continue
+            other += cpu
+            usage = by_comm.setdefault(last.comm, ProcessUsage(last.comm, 0, 0.0, 0, 0))
+            usage.processes += 1
+            usage.cpu_s += cpu
+            usage.read_bytes += read
+            usage.write_bytes += write
+        offenders = sorted(
+            (u for u in by_comm.values() if u.cpu_s > 0 or u.read_bytes or u.write_bytes),
+            key=lambda u: (u.cpu_s, u.read_bytes + u.write_bytes),
+            reverse=True,
+        )
+        return NoiseResult(self._clock() - self._started, ours, other, self.threshold, len(self._last), offenders)
@@ -0,0 +1,100 @@
+"""
+What batben itself costs.
+
+On a machine that's supposed to sit at 10% load, the tool's own startup, samplers and printing are part of
+the measurement. This accounts for them: CPU time, context switches (each voluntary one is a wakeup) and
+peak RSS of the batben process itself, from getrusage(RUSAGE_SELF). Worker processes are children and are
+deliberately left out, they're the workload. Benchmarks that run inside the batben process (the memory, io,
+net and matmul suites, the latency probe) can't be told apart from it that way; their result is marked
+`in_process` and only the startup cost counts as overhead.
+"""
+
+import os
+import resource
+import time
+from dataclasses import dataclass
+
+
+def _cpu_s(usage) -> float:
+    return usage.ru_utime + usage.ru_stime
+
+
+def process_age(stat_path: str = "/proc/self/stat") -> float:
+    """Seconds since this process started (nan where /proc isn't there), to time interpreter startup."""
+    try:
+        with open(stat_path) as f:
+            stat = f.read()
+        # field 22, counted after the ')' that closes comm
+        start_ticks = int(stat[stat.rindex(")") + 2 :].split()[19])
+    except (OSError, ValueError, IndexError):
+        return float("nan")
+    return time.clock_gettime(time.CLOCK_BOOTTIME) - start_ticks / os.sysconf("SC_CLK_TCK")
+
+
+@dataclass
+class OverheadResult:
+    duration: float
+    cpu_s: float
+    wakeups: int  # voluntary context switches
+    preemptions: int  # involuntary ones
+    max_rss_mb: float
+    startup_s: float  # wall time from exec to the meter being created
+    startup_cpu_s: float
+    in_process: bool = False  # the benchmark ran in this process, so cpu_s etc. include it
+
+    @property
+    def cpu_percent(self) -> float:
+        """Share of one core the harness used."""
+        return 100.0 * self.cpu_s / self.duration if self.duration > 0 else 0.0
+
+    @property
+    def wakeups_per_s(self) -> float:
+        return self.wakeups / self.duration if self.duration > 0 else 0.0
+
+    def metrics(self) -> dict[str, float]:
+        if self.in_process:
+            return {"startup_s": self.startup_s}
+        return {
+            "overhead_cpu_s": self.cpu_s,
+            "overhead_cpu_percent": self.cpu_percent,
+            "overhead_wakeups_per_s": self.wakeups_per_s,
+            "overhead_max_rss_mb": self.max_rss_mb,
+            "startup_s": self.startup_s,
+        }
+
+    def report(self) -> str:
+        startup = f"startup {self.startup_s * 1e3:.0f}ms ({self.startup_cpu_s * 1e3:.0f}ms CPU)"
+        if self.in_process:
+            return (
+                f"batben {startup}; the benchmark ran in-process, so its {self.cpu_s:.2f}s CPU and "
+                f"max RSS {self.max_rss_mb:.0f}MB include batben's own"
+            )
+        return (
+            f"batben overhead: {self.cpu_s:.2f}s CPU ({self.cpu_percent:.2f}% of a core), "
+            f"{self.wakeups_per_s:.1f} wakeups/s, max RSS {self.max_rss_mb:.0f}MB, {startup}"
+        )
+
+
+class OverheadMeter:
+    """Takes a getrusage snapshot when created; `stop` gives what the process used since then."""
+
+    def __init__(self, clock=time.monotonic, usage=lambda: resource.getrusage(resource.RUSAGE_SELF)):
+        self._clock = clock
+        self._usage = usage
+        self._started = clock()
+        self._first = usage()
+        self.startup_s = process_age()
+
+    def stop(self, in_process: bool = False) -> OverheadResult:
+        """`in_process`: the benchmark ran in this process, see OverheadResult."""
+        last = self._usage()
+        return OverheadResult(
+            duration=self._clock() - self._started,
+            cpu_s=_cpu_s(last) - _cpu_s(self._first),
+            wakeups=last.ru_nvcsw - self._first.ru_nvcsw,
+            preemptions=last.ru_nivcsw - self._first.ru_nivcsw,
+            max_rss_mb=last.ru_maxrss / 1024,  # kilobytes on Linux
+            startup_s=self.startup_s,
+            startup_cpu_s=_cpu_s(self._first),
+            in_process=in_process,
+        )
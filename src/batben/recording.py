@@ -0,0 +1,206 @@
+"""
+Run recordings.
+
+A compact, append-only binary format for run telemetry, so an hour at 10Hz across a pile of profiles
+doesn't turn into text logs that take longer to parse than to record.
+
+Layout (little endian):
+
+    b"BATREC1\\n"                              magic
+    u32 header length, JSON header            column names, run metadata; padded to 8 bytes
+    chunks, each:
+        u8 tag, 3 pad bytes, u32 payload length
+        tag D: u32 rows, 4 pad bytes, then one float64 block per column (columnar)
+        tag E: JSON event {"t": ..., "name": ..., "data": {...}}, padded to 8 bytes
+
+Everything stays 8-byte aligned, so a reader can mmap the file and hand out numpy views without copying.
+A chunk cut short by a crash is ignored, everything before it still loads.
+"""
+
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from dataclasses import dataclass
+
+import numpy as np
+
+MAGIC = b"BATREC1\n"
+_CHUNK = struct.Struct("<B3xI")
+_ROWS = struct.Struct("<I4x")
+
+
+def _pad(data: bytes) -> bytes:
+    return data + b"\0" * (-len(data) % 8)
+
+
+class Recorder:
+    """
+    Appends rows (one float per column) and events to a recording.
+    Rows are buffered and written a chunk at a time; `close` writes whatever is left.
+    """
+
+    def __init__(self, path: str, columns: list[str], meta: dict | None = None, chunk_rows: int = 600):
+        if not columns or columns[0] != "t":
+            raise ValueError("the first column has to be the timestamp, 't'")
+        self.path = path
+        self.columns = list(columns)
+        self._buffer = np.zeros((chunk_rows, len(columns)), dtype="<f8")
+        self._rows = 0
+        self._lock = threading.Lock()  # samplers append from their own threads
+        header = _pad(json.dumps({"version": 1, "columns": self.columns, "meta": meta or {}}).encode())
+        self._file = open(path, "xb")
+        self._file.write(MAGIC + struct.pack("<I", len(header)) + b"\0" * 4 + header)
+
+    def append(self, row) -> None:
+        with self._lock:
+            self._buffer[self._rows] = row
+            self._rows += 1
+            if self._rows == len(self._buffer):
+                self._flush()
+
+    def event(self, name: str, t: float | None = None, **data) -> None:
+        payload = _pad(json.dumps({"t": time.time() if t is None else t, "name": name, "data": data}).encode())
+        with self._lock:
+            self._file.write(_CHUNK.pack(ord("E"), len(payload)) + payload)
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush()
+
+    def _flush(self) -> None:
+        if self._rows:
+            # transpose so each column is one contiguous block
+            block = np.ascontiguousarray(self._buffer[: self._rows].T)
+            payload = _ROWS.pack(self._rows) + block.tobytes()
+            self._file.write(_CHUNK.pack(ord("D"), len(payload)) + payload)
+            self._rows = 0
+        self._file.flush()
+
+    def close(self) -> None:
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+@dataclass
+class Event:
+    t: float
+    name: str
+    data: dict
+
+
+class Recording:
+    """
+    A recording opened for reading. The file is memory-mapped; `chunks` hands out numpy views into it.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        if self._map[: len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} isn't a batben recording")
+        (header_len,) = struct.unpack_from("<I", self._map, len(MAGIC))
+        start = len(MAGIC) + 8
+        header = json.loads(bytes(self._map[start : start + header_len]).rstrip(b"\0"))
+        self.columns = header["columns"]
+        self.meta = header["meta"]
+        self.events = []
+        self._chunks = []  # (offset of the first column, rows)
+        self._index(start + header_len)
+
+    def _index(self, pos: int) -> None:
+        end = len(self._map)
+        while pos + _CHUNK.size <= end:
+            tag, length = _CHUNK.unpack_from(self._map, pos)
+            body = pos + _CHUNK.size
+            if body + length > end:
+                break  # torn write at the end
+            if tag == ord("D"):
+                (rows,) = _ROWS.unpack_from(self._map, body)
+                self._chunks.append((body + _ROWS.size, rows))
+            elif tag == ord("E"):
+                event = json.loads(bytes(self._map[body : body + length]).rstrip(b"\0"))
+                self.events.append(Event(event["t"], event["name"], event["data"]))
+            pos = body + length
+
+    def __len__(self) -> int:
+        return sum(rows for _, rows in self._chunks)
+
+    def chunks(self):
+        """Yields {column: array} per chunk, without copying."""
+        for offset, rows in self._chunks:
+            yield {
+                name: np.frombuffer(self._map, dtype="<f8", count=rows, offset=offset + i * rows * 8)
+                for i, name in enumerate(self.columns)
+            }
+
+    def column(self, name: str) -> np.ndarray:
+        if name not in self.columns:
+            raise KeyError(name)
+        parts = [chunk[name] for chunk in self.chunks()]
+        if not parts:
+            return np.zeros(0)
+        return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+    def summary(self) -> str:
+        t = self.column("t")
+        lines = [
+            f"{self.path}: {len(self)} samples over {t[-1] - t[0] if len(t) else 0:.1f}s, {len(self.events)} events"
+        ]
+        for key, value in self.meta.items():
+            lines.append(f"  {key}: {value}")
+        for name in self.columns[1:]:
+            values = self.column(name)
+            values = values[~np.isnan(values)]
+            if len(values):
+                lines.append(
+                    f"  {name:<12} min {values.min():>10.3f}  mean {values.mean():>10.3f}  max {values.max():>10.3f}"
+                )
+            else:
+                lines.append(f"  {name:<12} (no data)")
+        for event in self.events:
+            lines.append(f"  event @{event.t - (t[0] if len(t) else event.t):>8.1f}s {event.name} {event.data or ''}")
+        return "\n".join(lines)
+
+    def replay(self, speed: float = 0.0):
+        """
+        Yields (t, row dict) and (t, Event) in time order. With `speed` > 0 it sleeps so the replay
+        runs `speed` times faster than the original, 0 means as fast as possible.
+        """
+        items = []
+        for chunk in self.chunks():
+            for i, t in enumerate(chunk["t"].tolist()):
+                items.append((t, 1, {name: float(chunk[name][i]) for name in self.columns}))
+        items.extend((event.t, 0, event) for event in self.events)
+        items.sort(key=lambda item: (item[0], item[1]))
+        wall_start = time.monotonic()
+        for t, _, item in items:
+            if speed > 0:
+                delay = (t - items[0][0]) / speed - (time.monotonic() - wall_start)
+                if delay > 0:
+                    time.sleep(delay)
+            yield t, item
+
+    def close(self) -> None:
+        if isinstance(self._map, mmap.mmap):
+            try:
+                self._map.close()
+            except BufferError:
+                pass  # someone still holds a view from chunks(), the map goes away with it
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,382 @@
+"""
+Offline analysis of recordings, and a static HTML report comparing profiles.
+
+An hour at 10Hz is 36k rows per run, and a profile matrix is dozens of runs, so everything here works on
+whole columns with numpy: time binning with bincount, plug-in detection from the energy steps, phase
+boundaries with searchsorted, the discharge fit with vectorized Theil-Sen. The report is one HTML file with
+inline SVG charts and no scripts, so it can be mailed around or attached to a ticket as is.
+"""
+
+import html
+import math
+import os
+import statistics
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from .discharge import DischargeEstimate, estimate_discharge
+from .recording import MAGIC, Recording
+
+PALETTE = ["#1f77b4", "#d62728", "#2ca02c", "#ff7f0e", "#9467bd", "#8c564b", "#e377c2", "#17becf"]
+
+
+def resample(
+    t: np.ndarray, values: np.ndarray, step: float, start: float | None = None
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Mean of `values` per `step` seconds bin, nan samples ignored. Returns (bin start times, means);
+    bins without a sample are nan.
+    """
+    if not len(t):
+        return np.zeros(0), np.zeros(0)
+    start = t[0] if start is None else start
+    bins = ((t - start) // step).astype(np.int64)
+    n = int(bins.max()) + 1
+    valid = ~np.isnan(values)
+    sums = np.bincount(bins[valid], weights=values[valid], minlength=n)
+    counts = np.bincount(bins[valid], minlength=n)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = np.where(counts > 0, sums / counts, np.nan)
+    return start + np.arange(n) * step, means
+
+
+def charging_intervals(t: np.ndarray, energy: np.ndarray) -> list[tuple[float, float]]:
+    """
+    Stretches where the battery gained energy: from the last reading before a rise to the first reading
+    after it stopped rising. measure_battery_life only notices this at the very end, as a net gain.
+    """
+    keep = ~np.isnan(energy)
+    t, energy = t[keep], energy[keep]
+    steps = np.flatnonzero(np.concatenate(([True], energy[1:] != energy[:-1])))  # first sample of each reading
+    if len(steps) < 2:
+        return []
+    rising = np.diff(energy[steps]) > 0
+    # run boundaries of consecutive rising steps
+    edges = np.diff(np.concatenate(([0], rising.astype(np.int8), [0])))
+    starts, ends = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+    return [(float(t[steps[s + 1] - 1]), float(t[steps[e]])) for s, e in zip(starts, ends)]
+
+
+def in_intervals(t: np.ndarray, intervals: list[tuple[float, float]]) -> np.ndarray:
+    """Boolean mask of the samples that fall inside any of the (sorted, disjoint) intervals."""
+    if not intervals:
+        return np.zeros(len(t), dtype=bool)
+    bounds = np.asarray(intervals).ravel()
+    # inside when an odd number of bounds lie at or before the sample
+    return np.searchsorted(bounds, t, side="right") % 2 == 1
+
+
+def stitch_on_battery(
+    t: np.ndarray, energy: np.ndarray, intervals: list[tuple[float, float]]
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    The on-battery stretches of (t, energy) joined end to end, for a discharge fit. Every sample after a
+    charging interval moves back by the interval's length and down by the energy it gained, so the reading
+    at its end lands where the one at its start was. Fitting straight across the gaps would pull the slope
+    towards zero by whatever the charger put in.
+    """
+    keep = ~in_intervals(t, intervals)
+    t_shift, energy_shift = np.zeros(len(t)), np.zeros(len(t))
+    for start, end in intervals:
+        after = t >= end
+        t_shift[after] += end - start
+        energy_shift[after] += energy[np.searchsorted(t, end)] - energy[np.searchsorted(t, start)]
+    return (t - t_shift)[keep], (energy - energy_shift)[keep]
+
+
+@dataclass
+class Phase:
+    name: str
+    start: float  # seconds since the recording started
+    end: float
+    energy_wh: float  # integrated power while on battery
+    plugged_s: float
+    avg_power_w: float
+    avg_cpu: float
+    events: float = math.nan  # work done, when the event closing the phase says
+
+    @property
+    def duration(self) -> float:
+        return self.end - self.start
+
+    @property
+    def score(self) -> float:
+        return self.events / self.duration if self.duration > 0 else math.nan
+
+    @property
+    def events_per_wh(self) -> float:
+        return self.events / self.energy_wh if self.energy_wh > 0 else math.nan
+
+
+def _phase_name(event_name: str) -> str:
+    if event_name.endswith("-end"):
+        return f"after {event_name.removesuffix('-end')}"
+    return event_name.removesuffix("-start")
+
+
+def split_phases(t, power, cpu, on_battery, events) -> list[Phase]:
+    """Cuts a run at its events. Times are seconds since the first sample."""
+    if not len(t):
+        return []
+    rel = t - t[0]
+    inside = [e for e in events if 0 < e.t - t[0] < rel[-1]]
+    bounds = [0.0] + [e.t - t[0] for e in inside] + [float(rel[-1])]
+    names = ["before"] + [_phase_name(e.name) for e in inside]
+    closers = inside + [None]  # the event that ends each phase
+    cuts = np.searchsorted(rel, bounds)
+    dt = np.diff(rel, append=rel[-1])  # each sample holds until the next
+    phases = []
+    for k, name in enumerate(names):
+        lo, hi = cuts[k], cuts[k + 1]
+        if bounds[k + 1] <= bounds[k]:
+            continue
+        p, c, ob, d = power[lo:hi], cpu[lo:hi], on_battery[lo:hi], dt[lo:hi]
+        valid = ~np.isnan(p) & ob
+        closer = closers[k]
+        events_done = float(closer.data["events"]) if closer is not None and "events" in closer.data else math.nan
+        phases.append(
+            Phase(
+                name,
+                bounds[k],
+                bounds[k + 1],
+                float((p[valid] * d[valid]).sum() / 3600),
+                float(d[~ob].sum()),
+                float(np.nanmean(p)) if (~np.isnan(p)).any() else math.nan,
+                float(np.nanmean(c)) if (~np.isnan(c)).any() else math.nan,
+                events_done,
+            )
+        )
+    return phases
+
+
+@dataclass
+class RunSummary:
+    path: str
+    meta: dict
+    duration: float
+    samples: int
+    plugged: list[tuple[float, float]] = field(default_factory=list)  # seconds since start
+    discharge: DischargeEstimate | None = None
+    phases: list[Phase] = field(default_factory=list)
+    curve: tuple[np.ndarray, np.ndarray] = (np.zeros(0), np.zeros(0))  # resampled (s, power W)
+
+    @property
+    def profile(self) -> str:
+        return str(self.meta.get("profile", "unknown"))
+
+    @property
+    def workload(self) -> str:
+        return str(self.meta.get("workload", self.meta.get("command", "?")))
+
+    @property
+    def main_phase(self) -> Phase | None:
+        """The phase that did the work: the one with an event count, else the longest."""
+        scored = [p for p in self.phases if not math.isnan(p.events)]
+        return max(scored or self.phases, key=lambda p: p.duration, default=None)
+
+
+def analyze(path: str, points: int = 600) -> RunSummary:
+    """Everything the report needs from one recording. The power curve is binned to about `points` points."""
+    with Recording(path) as rec:
+        t = rec.column("t").copy()
+        columns = {
+            name: rec.column(name).copy() for name in ("energy_wh", "power_w", "cpu_percent") if name in rec.columns
+        }
+        events = sorted(rec.events, key=lambda e: e.t)
+        meta = dict(rec.meta)
+    nan = np.full(len(t), np.nan)
+    energy, power, cpu = (columns.get(name, nan) for name in ("energy_wh", "power_w", "cpu_percent"))
+    summary = RunSummary(path, meta, float(t[-1] - t[0]) if len(t) else 0.0, len(t))
+    if not len(t):
+        return summary
+    plugged = charging_intervals(t, energy)
+    on_battery = ~in_intervals(t, plugged)
+    summary.plugged = [(a - t[0], b - t[0]) for a, b in plugged]
+    summary.discharge = estimate_discharge(*stitch_on_battery(t, energy, plugged))
+    summary.phases = split_phases(t, power, cpu, on_battery, events)
+    step = max(summary.duration / points, 1e-3)
+    grid, curve = resample(t - t[0], power, step, start=0.0)
+    summary.curve = (grid, curve)
+    return summary
+
+
+def find_recordings(paths: list[str]) -> list[str]:
+    """Files as given, directories searched recursively for anything that starts like a recording."""
+    found = []
+    for path in paths:
+        if not os.path.isdir(path):
+            found.append(path)
+            continue
+        for root, _, files in os.walk(path):
+            for name in sorted(files):
+                full = os.path.join(root, name)
+                try:
+                    with open(full, "rb") as f:
+                        if f.read(len(MAGIC)) == MAGIC:
+                            found.append(full)
+                except OSError:
+                    continue
+    return found
+
+
+@dataclass
+class ProfileRow:
+    workload: str
+    profile: str
+    runs: int
+    wh_per_hour: float
+    wh_per_hour_stdev: float
+    score: float
+    events_per_wh: float
+    plugged_runs: int
+
+
+def _mean(values: list[float]) -> float:
+    values = [v for v in values if not math.isnan(v)]
+    return statistics.fmean(values) if values else math.nan
+
+
+def profile_table(runs: list[RunSummary]) -> list[ProfileRow]:
+    groups = {}
+    for run in runs:
+        groups.setdefault((run.workload, run.profile), []).append(run)
+    rows = []
+    for (workload, profile), group in sorted(groups.items()):
+        rates = [r.discharge.wh_per_hour for r in group if r.discharge is not None]
+        mains = [r.main_phase for r in group if r.main_phase is not None]
+        rows.append(
+            ProfileRow(
+                workload,
+                profile,
+                len(group),
+                _mean(rates),
+                statistics.stdev(rates) if len(rates) > 1 else math.nan,
+                _mean([p.score for p in mains]),
+                _mean([p.events_per_wh for p in mains]),
+                sum(1 for r in group if r.plugged),
+            )
+        )
+    return rows
+
+
+def _fmt(value: float, spec: str = ".3f") -> str:
+    return "–" if value is None or math.isnan(value) else format(value, spec)
+
+
+def _power_chart(runs: list[RunSummary], colors: dict[str, str], width: int = 900, height: int = 280) -> str:
+    pad = 40
+    t_max = max((r.duration for r in runs), default=0) or 1.0
+    p_max = max((float(np.nanmax(r.curve[1])) for r in runs if np.isfinite(r.curve[1]).any()), default=0) or 1.0
+    sx, sy = (width - 2 * pad) / t_max, (height - 2 * pad) / p_max
+    parts = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" class="chart">']
+    for run in runs:
+        for a, b in run.plugged:
+            parts.append(
+                f'<rect x="{pad + a * sx:.1f}" y="{pad}" width="{max((b - a) * sx, 1):.1f}" '
+                f'height="{height - 2 * pad}" fill="#f2c94c" opacity="0.3"><title>plugged in</title></rect>'
+            )
+    for run in runs:
+        grid, power = run.curve
+        ok = ~np.isnan(power)
+        if not ok.any():
+            continue
+        xs, ys = pad + grid[ok] * sx, height - pad - power[ok] * sy
+        points = " ".join(f"{x:.1f},{y:.1f}" for x, y in zip(xs.tolist(), ys.tolist()))
+        parts.append(
+            f'<polyline points="{points}" fill="none" stroke="{colors[run.profile]}" stroke-width="1" opacity="0.8">'
+            f"<title>{html.escape(os.path.basename(run.path))} ({html.escape(run.profile)})</title></polyline>"
+        )
+    parts.append(
+        f'<line x1="{pad}" y1="{height - pad}" x2="{width - pad}" y2="{height - pad}" stroke="#444"/>'
+        f'<line x1="{pad}" y1="{pad}" x2="{pad}" y2="{height - pad}" stroke="#444"/>'
+        f'<text x="{pad}" y="{pad - 8}">{p_max:.1f} W</text>'
+        f'<text x="{width - pad}" y="{height - pad + 16}" text-anchor="end">{t_max:.0f} s</text></svg>'
+    )
+    return "".join(parts)
+
+
+def _rate_chart(rows: list[ProfileRow], colors: dict[str, str], width: int = 900) -> str:
+    rows = [r for r in rows if not math.isnan(r.wh_per_hour)]
+    if not rows:
+        return "<p>No discharge fits (no battery data on battery power).</p>"
+    bar, pad, label = 22, 10, 260
+    height = pad * 2 + len(rows) * (bar + 6)
+    top = max(r.wh_per_hour + (0 if math.isnan(r.wh_per_hour_stdev) else r.wh_per_hour_stdev) for r in rows)
+    scale = (width - label - 80) / (top or 1.0)
+    parts = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" class="chart">']
+    for i, row in enumerate(rows):
+        y = pad + i * (bar + 6)
+        name = html.escape(f"{row.workload} / {row.profile}")
+        parts.append(
+            f'<text x="{label - 8}" y="{y + bar * 0.7:.1f}" text-anchor="end">{name}</text>'
+            f'<rect x="{label}" y="{y}" width="{row.wh_per_hour * scale:.1f}" height="{bar}" '
+            f'fill="{colors[row.profile]}"/>'
+            f'<text x="{label + row.wh_per_hour * scale + 6:.1f}" y="{y + bar * 0.7:.1f}">'
+            f"{row.wh_per_hour:.2f} Wh/h</text>"
+        )
+        if not math.isnan(row.wh_per_hour_stdev):
+            lo = label + (row.wh_per_hour - row.wh_per_hour_stdev) * scale
+            hi = label + (row.wh_per_hour + row.wh_per_hour_stdev) * scale
+            parts.append(f'<line x1="{lo:.1f}" y1="{y + bar / 2}" x2="{hi:.1f}" y2="{y + bar / 2}" stroke="#222"/>')
+    parts.append("</svg>")
+    return "".join(parts)
+
+
+def render_html(runs: list[RunSummary], title: str = "batben report") -> str:
+    profiles = sorted({r.profile for r in runs})
+    colors = {p: PALETTE[i % len(PALETTE)] for i, p in enumerate(profiles)}
+    rows = profile_table(runs)
+    e = html.escape
+    out = [
+        "<!DOCTYPE html>",
+        f'<html><head><meta charset="utf-8"><title>{e(title)}</title><style>',
+        "body{font-family:sans-serif;margin:2em;color:#222} table{border-collapse:collapse;margin:1em 0}",
+        "td,th{border:1px solid #ccc;padding:3px 8px;text-align:right} th{background:#f4f4f4}",
+        "td:first-child,td:nth-child(2){text-align:left} .chart text{font-size:12px} .warn{color:#b00}",
+        "</style></head><body>",
+        f"<h1>{e(title)}</h1>",
+        f"<p>{len(runs)} runs, {len(profiles)} profiles, {sum(r.samples for r in runs)} samples. Legend: "
+        + " ".join(f'<span style="color:{colors[p]}">&#9632; {e(p)}</span>' for p in profiles)
+        + "</p>",
+        "<h2>Profiles</h2><table><tr><th>workload</th><th>profile</th><th>runs</th><th>Wh/hour</th>"
+        "<th>stdev</th><th>score (events/s)</th><th>events/Wh</th><th>plugged in</th></tr>",
+    ]
+    for row in rows:
+        plugged = f'<span class="warn">{row.plugged_runs}</span>' if row.plugged_runs else "0"
+        out.append(
+            f"<tr><td>{e(row.workload)}</td><td>{e(row.profile)}</td><td>{row.runs}</td>"
+            f"<td>{_fmt(row.wh_per_hour)}</td><td>{_fmt(row.wh_per_hour_stdev)}</td><td>{_fmt(row.score, '.2f')}</td>"
+            f"<td>{_fmt(row.events_per_wh, '.1f')}</td><td>{plugged}</td></tr>"
+        )
+    out.append("</table>")
+    out.append("<h2>Discharge rate</h2>" + _rate_chart(rows, colors))
+    out.append("<h2>Power over time</h2>" + _power_chart(runs, colors))
+    out.append(
+        "<h2>Runs</h2><table><tr><th>recording</th><th>profile</th><th>length</th><th>Wh/hour (95% CI)</th>"
+        "<th>phase</th><th>duration</th><th>energy Wh</th><th>avg W</th><th>avg CPU %</th><th>score</th>"
+        "<th>on AC</th></tr>"
+    )
+    for run in runs:
+        fit = run.discharge
+        rate = f"{fit.wh_per_hour:.3f} ({fit.ci_low:.3f}–{fit.ci_high:.3f})" if fit is not None else "–"
+        phases = run.phases or [None]
+        for i, phase in enumerate(phases):
+            head = (
+                f'<td rowspan="{len(phases)}">{e(os.path.basename(run.path))}</td>'
+                f'<td rowspan="{len(phases)}">{e(run.profile)}</td>'
+                f'<td rowspan="{len(phases)}">{run.duration:.0f}s</td><td rowspan="{len(phases)}">{rate}</td>'
+                if i == 0
+                else ""
+            )
+            if phase is None:
+                out.append(f"<tr>{head}<td colspan='7'>no samples</td></tr>")
+                continue
+            on_ac = f'<span class="warn">{phase.plugged_s:.0f}s</span>' if phase.plugged_s else ""
+            out.append(
+                f"<tr>{head}<td>{e(phase.name)}</td><td>{phase.duration:.0f}s</td><td>{_fmt(phase.energy_wh)}</td>"
+                f"<td>{_fmt(phase.avg_power_w, '.2f')}</td><td>{_fmt(phase.avg_cpu, '.1f')}</td>"
+                f"<td>{_fmt(phase.score, '.2f')}</td><td>{on_ac}</td></tr>"
+            )
+    out.append("</table></body></html>")
+    return "\n".join(out)
@@ -0,0 +1,166 @@
+"""
+Background samplers.
+
+Two readings per run (before and after) can't resolve anything below the 0.1Wh or so that
+the battery reports in steps. Sampling power at a steady rate and integrating it can.
+"""
+
+import math
+import threading
+import time
+
+import numpy as np
+
+BATTERY_DTYPE = np.dtype([("t", "f8"), ("energy_wh", "f8"), ("power_w", "f8"), ("voltage_v", "f8")])
+
+
+class RingBuffer:
+    """
+    Fixed-size ring buffer on top of a numpy structured array.
+    Nothing gets allocated after construction, the oldest rows get overwritten once it's full.
+    """
+
+    def __init__(self, capacity: int, dtype: np.dtype):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self._data = np.zeros(capacity, dtype=dtype)
+        self._next = 0
+        self.total = 0  # rows ever appended, including overwritten ones
+
+    @property
+    def capacity(self) -> int:
+        return len(self._data)
+
+    def __len__(self) -> int:
+        return min(self.total, self.capacity)
+
+    def append(self, row: tuple) -> None:
+        self._data[self._next] = row
+        self._next = (self._next + 1) % self.capacity
+        self.total += 1
+
+    def snapshot(self) -> np.ndarray:
+        """A copy of the buffered rows, oldest first."""
+        if self.total < self.capacity:
+            return self._data[: self._next].copy()
+        return np.concatenate((self._data[self._next :], self._data[: self._next]))
+
+
+class BatterySampler:
+    """
+    Samples a battery (anything with a `read()` returning (Wh, W, V), usually a SysfsBattery)
+    at `rate` Hz on a background thread.
+
+    Power is integrated as it comes in (trapezoid rule), so the energy figure covers the whole run
+    even after the ring buffer has wrapped around.
+    """
+
+    def __init__(self, battery, rate: float = 10.0, capacity: int = 36_000, clock=time.monotonic):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.battery = battery
+        self.interval = 1.0 / rate
+        self.buffer = RingBuffer(capacity, BATTERY_DTYPE)
+        self.integrated_wh = 0.0
+        self._clock = clock
+        self._last = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def samples(self) -> int:
+        return self.buffer.total
+
+    def sample(self) -> None:
+        """Takes one reading. The thread calls this, tests can too."""
+        now = self._clock()
+        energy, power, voltage = self.battery.read()
+        if self._last is not None and not (math.isnan(power) or math.isnan(self._last[1])):
+            self.integrated_wh += (power + self._last[1]) / 2 * (now - self._last[0]) / 3600
+        self._last = (now, power)
+        self.buffer.append((now, energy, power, voltage))
+
+    def _run(self) -> None:
+        next_tick = self._clock()
+        while not self._stop.is_set():
+            self.sample()
+            next_tick += self.interval
+            # don't try to catch up after a stall (e.g. suspend), just carry on from now
+            next_tick = max(next_tick, self._clock())
+            self._stop.wait(next_tick - self._clock())
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="batben-battery-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.sample()  # close the integral at the exact end of the run
+
+    def energy_drop_wh(self) -> float:
+        """Energy counter difference between the oldest buffered sample and the newest."""
+        data = self.buffer.snapshot()
+        energy = data["energy_wh"][~np.isnan(data["energy_wh"])]
+        if len(energy) < 2:
+            return float("nan")
+        return float(energy[0] - energy[-1])
+
+
+TELEMETRY_COLUMNS = ["t", "energy_wh", "power_w", "voltage_v", "cpu_percent", "freq_mhz"]
+
+
+def _average_freq_mhz() -> float:
+    import psutil
+
+    freq = psutil.cpu_freq()
+    return freq.current if freq is not None else float("nan")
+
+
+class TelemetrySampler:
+    """
+    Samples battery, CPU utilization and frequency at `rate` Hz into `sink` (anything with `append(row)`,
+    usually a recording.Recorder), one row per TELEMETRY_COLUMNS.
+    Every source is optional/injectable; missing ones are recorded as nan.
+    """
+
+    def __init__(self, sink, rate: float = 10.0, battery=None, utilization=None, freq=_average_freq_mhz):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.sink = sink
+        self.interval = 1.0 / rate
+        self.battery = battery
+        self.utilization = utilization
+        self.freq = freq
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def sample(self) -> None:
+        nan = float("nan")
+        energy, power, voltage = self.battery.read() if self.battery is not None else (nan, nan, nan)
+        cpu = self.utilization.sample() if self.utilization is not None else nan
+        freq = self.freq() if self.freq is not None else nan
+        self.sink.append((time.time(), energy, power, voltage, cpu, freq))
+        self.samples += 1
+
+    def _run(self) -> None:
+        next_tick = time.monotonic()
+        while not self._stop.is_set():
+            self.sample()
+            next_tick = max(next_tick + self.interval, time.monotonic())
+            self._stop.wait(next_tick - time.monotonic())
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="batben-telemetry", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
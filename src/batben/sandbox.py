@@ -0,0 +1,418 @@
+"""
+Sandboxed execution with exact resource accounting.
+
+The governor's workers are children of batben, and whatever they use is mixed with what the harness (samplers,
+controller, recorder) uses. When tuned or a power daemon moves things around, "the workload used X" then
+can't be told apart from "the run used X". This runs the workload in a child process of its own, in its own
+cgroup v2, and reads the kernel's accounting for exactly that subtree afterwards: cpu.stat, memory.peak and
+memory.stat, io.stat and cpu.pressure. A cpu.max cap can turn the cgroup into a hard capacity limit.
+
+The cgroup comes from a delegated subtree (--cgroup, a directory we may create cgroups in) or from a transient
+systemd scope over D-Bus. Without either, the child still runs on its own and its getrusage totals (itself
+plus every worker it waited for) stand in: no pressure or throttling numbers, but the same CPU split and a peak
+RSS, and nothing that needs a cgroup to test.
+"""
+
+import functools
+import multiprocessing as mp
+import os
+import resource
+import time
+from dataclasses import dataclass, field
+
+from .system import read_text
+
+MOUNTINFO = "/proc/self/mountinfo"
+CONTROLLERS = ("cpu", "memory", "io")
+CPU_MAX_PERIOD_US = 100_000
+
+
+class SandboxError(Exception):
+    pass
+
+
+def parse_keyed(text: str) -> dict[str, int]:
+    """'key value' lines, as in cpu.stat and memory.stat."""
+    out = {}
+    for line in text.splitlines():
+        key, _, value = line.partition(" ")
+        if value.strip().lstrip("-").isdigit():
+            out[key] = int(value)
+    return out
+
+
+def parse_io_stat(text: str) -> dict[str, int]:
+    """io.stat summed over devices: '8:0 rbytes=… wbytes=… rios=… wios=… dbytes=… dios=…' per line."""
+    out = {}
+    for line in text.splitlines():
+        for field_ in line.split()[1:]:
+            key, _, value = field_.partition("=")
+            if value.isdigit():
+                out[key] = out.get(key, 0) + int(value)
+    return out
+
+
+def parse_pressure(text: str) -> dict[str, float]:
+    """A PSI file: {'some_avg10': …, 'some_total': µs, 'full_…': …}."""
+    out = {}
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        kind, *fields = line.split()
+        for field_ in fields:
+            key, _, value = field_.partition("=")
+            out[f"{kind}_{key}"] = float(value)
+    return out
+
+
+def cgroup2_mount(mountinfo: str = MOUNTINFO) -> str | None:
+    """Where the unified hierarchy is mounted: /sys/fs/cgroup usually, /sys/fs/cgroup/unified on hybrid setups."""
+    for line in (read_text(mountinfo) or "").splitlines():
+        # fields: id parent major:minor root mountpoint options [optional...] - fstype source superoptions
+        left, _, right = line.partition(" - ")
+        if right.split(" ", 1)[0] == "cgroup2":
+            return left.split()[4]
+    return None
+
+
+def cgroup_of(pid: int | str = "self", proc_root: str = "/proc") -> str | None:
+    """The cgroup v2 path of a process, relative to the mount, from its '0::/path' line."""
+    for line in (read_text(os.path.join(proc_root, str(pid), "cgroup")) or "").splitlines():
+        if line.startswith("0::"):
+            return line[3:]
+    return None
+
+
+@dataclass
+class ResourceUsage:
+    backend: str  # "cgroup", "systemd" or "rusage"
+    wall_s: float
+    user_s: float
+    system_s: float
+    memory_peak_bytes: int | None = None
+    io_read_bytes: int | None = None
+    io_write_bytes: int | None = None
+    throttled_s: float | None = None  # time the cpu.max cap held the workload back
+    cpu_pressure: dict[str, float] = field(default_factory=dict)  # some/full totals over the run, in s
+    memory_stat: dict[str, int] = field(default_factory=dict)  # memory.stat at the end of the run, in bytes
+    cpu_max: float | None = None  # the cap in CPUs, if one was enforced
+    notes: list[str] = field(default_factory=list)  # what was asked for and couldn't be done
+
+    @property
+    def cpu_s(self) -> float:
+        return self.user_s + self.system_s
+
+    @property
+    def cpu_percent(self) -> float:
+        """Percent of one core over the run."""
+        return 100 * self.cpu_s / self.wall_s if self.wall_s > 0 else 0.0
+
+    @property
+    def exact(self) -> bool:
+        return self.backend != "rusage"
+
+    def metrics(self) -> dict[str, float]:
+        out = {
+            "sandbox_cgroup": float(self.exact),
+            "sandbox_cpu_s": self.cpu_s,
+            "sandbox_user_s": self.user_s,
+            "sandbox_system_s": self.system_s,
+            "sandbox_cpu_percent": self.cpu_percent,
+        }
+        if self.memory_peak_bytes is not None:
+            out["sandbox_memory_peak_mb"] = self.memory_peak_bytes / 2**20
+        for kind in ("anon", "file"):
+            if kind in self.memory_stat:
+                out[f"sandbox_memory_{kind}_mb"] = self.memory_stat[kind] / 2**20
+        if self.io_read_bytes is not None:
+            out["sandbox_io_read_mb"] = self.io_read_bytes / 2**20
+            out["sandbox_io_write_mb"] = self.io_write_bytes / 2**20
+        if self.throttled_s is not None:
+            out["sandbox_throttled_s"] = self.throttled_s
+        for kind, seconds in self.cpu_pressure.items():
+            out[f"sandbox_cpu_pressure_{kind}_s"] = seconds
+        if self.cpu_max is not None:
+            out["sandbox_cpu_max"] = self.cpu_max
+        return out
+
+    def report(self) -> str:
+        source = {"cgroup": "cgroup", "systemd": "systemd scope", "rusage": "getrusage, not exact"}[self.backend]
+        line = (
+            f"workload ({source}): {self.cpu_s:.2f}s CPU ({self.user_s:.2f}s user, {self.system_s:.2f}s system, "
+            f"{self.cpu_percent:.0f}% of a core)"
+        )
+        if self.memory_peak_bytes is not None:
+            line += f", peak memory {self.memory_peak_bytes / 2**20:.0f}MB"
+        if self.io_read_bytes is not None:
+            line += f", I/O {self.io_read_bytes / 2**20:.1f}MB read {self.io_write_bytes / 2**20:.1f}MB written"
+        lines = [line]
+        if self.cpu_max is not None:
+            throttled = f", throttled {self.throttled_s:.2f}s" if self.throttled_s is not None else ""
+            lines.append(f"  capped at {self.cpu_max:g} CPUs{throttled}")
+        if self.cpu_pressure:
+            lines.append("  CPU pressure: " + ", ".join(f"{k} {v:.2f}s" for k, v in self.cpu_pressure.items()))
+        lines.extend(f"  note: {note}" for note in self.notes)
+        return "\n".join(lines)
+
+
+def _pressure_totals(path: str) -> dict[str, float]:
+    pressure = parse_pressure(read_text(os.path.join(path, "cpu.pressure")) or "")
+    return {kind: pressure[f"{kind}_total"] / 1e6 for kind in ("some", "full") if f"{kind}_total" in pressure}
+
+
+def read_cgroup_usage(path: str, wall_s: float, backend: str, pressure_before: dict[str, float]) -> ResourceUsage:
+    """Usage of the cgroup at `path` since it was created; files a controller isn't enabled for are skipped."""
+    cpu = parse_keyed(read_text(os.path.join(path, "cpu.stat")) or "")
+    usage = ResourceUsage(backend, wall_s, cpu.get("user_usec", 0) / 1e6, cpu.get("system_usec", 0) / 1e6)
+    if "throttled_usec" in cpu:
+        usage.throttled_s = cpu["throttled_usec"] / 1e6
+    peak = read_text(os.path.join(path, "memory.peak"))
+    if peak is not None and peak.isdigit():
+        usage.memory_peak_bytes = int(peak)
+    usage.memory_stat = parse_keyed(read_text(os.path.join(path, "memory.stat")) or "")
+    io_path = os.path.join(path, "io.stat")
+    if os.path.exists(io_path):  # empty until the cgroup has done some I/O
+        totals = parse_io_stat(read_text(io_path) or "")
+        usage.io_read_bytes, usage.io_write_bytes = totals.get("rbytes", 0), totals.get("wbytes", 0)
+    usage.cpu_pressure = {k: v - pressure_before.get(k, 0.0) for k, v in _pressure_totals(path).items()}
+    return usage
+
+
+def rusage_usage(totals: dict[str, float], wall_s: float) -> ResourceUsage:
+    """From the child's own getrusage totals (see _child): block I/O counts 512-byte sectors."""
+    return ResourceUsage(
+        "rusage",
+        wall_s,
+        totals["user_s"],
+        totals["system_s"],
+        memory_peak_bytes=int(totals["maxrss_kb"] * 1024),
+        io_read_bytes=int(totals["inblock"] * 512),
+        io_write_bytes=int(totals["oublock"] * 512),
+    )
+
+
+class DelegatedCgroup:
+    """
+    Creates a child cgroup per run under `parent`, a cgroup v2 directory we're allowed to write to (the root as
+    root, or one handed out with `systemd-run --user -p Delegate=yes`). Controllers the parent offers are enabled
+    for its children; that fails if processes live in `parent` itself, in which case only cpu.stat is there.
+    """
+
+    name = "cgroup"
+
+    def __init__(self, parent: str, cpu_max: float | None = None):
+        if not os.path.exists(os.path.join(parent, "cgroup.controllers")):
+            raise SandboxError(f"{parent} is not a cgroup v2 directory")
+        self.parent = parent
+        self.cpu_max = cpu_max
+        self.cap = None  # the cpu_max that actually got applied
+        self.path = None
+        self.notes = []
+
+    def place(self, pid: int) -> str:
+        self.notes = []
+        offered = (read_text(os.path.join(self.parent, "cgroup.controllers")) or "").split()
+        wanted = [c for c in CONTROLLERS if c in offered]
+        if wanted:
+            try:
+                with open(os.path.join(self.parent, "cgroup.subtree_control"), "w") as f:
+                    f.write(" ".join(f"+{c}" for c in wanted))
+            except OSError as e:
+                self.notes.append(f"couldn't enable {', '.join(wanted)} in {self.parent}: {e.strerror}")
+        path = os.path.join(self.parent, f"batben-{pid}")
+        try:
+            os.mkdir(path)
+        except OSError as e:
+            raise SandboxError(f"can't create {path}: {e.strerror or e}") from e
+        self.path = path
+        self.cap = None
+        if self.cpu_max is not None:
+            try:
+                with open(os.path.join(path, "cpu.max"), "w") as f:
+                    f.write(f"{round(self.cpu_max * CPU_MAX_PERIOD_US)} {CPU_MAX_PERIOD_US}")
+                self.cap = self.cpu_max
+            except OSError as e:
+                self.notes.append(f"couldn't write cpu.max ({e.strerror or e}), the CPU cap wasn't enforced")
+        try:
+            with open(os.path.join(path, "cgroup.procs"), "w") as f:
+                f.write(str(pid))
+        except OSError as e:
+            self.release()
+            raise SandboxError(f"can't move the workload into {path}: {e.strerror or e}") from e
+        return path
+
+    def release(self) -> None:
+        if self.path is not None:
+            try:
+                os.rmdir(self.path)
+            except OSError:
+                pass
+            self.path = None
+
+
+def _variant(signature: str, value):
+    from dasbus.typing import Variant
+
+    return Variant(signature, value)
+
+
+class SystemdScope:
+    """
+    Asks systemd for a transient scope around the child (the user manager, or the system one as root), with
+    CPU, memory and I/O accounting on. systemd removes the scope once it's empty. `bus` is a dasbus message
+    bus, the session or system one by default.
+    """
+
+    name = "systemd"
+
+    def __init__(self, cpu_max: float | None = None, mount: str | None = None, timeout: float = 5.0, bus=None):
+        self.cpu_max = cpu_max
+        self.cap = cpu_max  # systemd refuses the whole unit if it can't apply it
+        self.mount = mount or cgroup2_mount()
+        self.timeout = timeout
+        self.bus = bus
+        self.notes = []
+        if self.mount is None:
+            raise SandboxError("no cgroup v2 hierarchy mounted")
+
+    def properties(self, pid: int) -> list[tuple[str, str, object]]:
+        """The unit's properties as (name, D-Bus signature, value)."""
+        out = [
+            ("PIDs", "au", [pid]),
+            ("Delegate", "b", True),
+            ("CPUAccounting", "b", True),
+            ("MemoryAccounting", "b", True),
+            ("IOAccounting", "b", True),
+        ]
+        if self.cpu_max is not None:
+            out.append(("CPUQuotaPerSecUSec", "t", round(self.cpu_max * 1e6)))
+        return out
+
+    def place(self, pid: int) -> str:
+        unit = f"batben-{pid}.scope"
+        try:
+            bus = self.bus
+            if bus is None:
+                from dasbus.connection import SessionMessageBus, SystemMessageBus
+
+                bus = SystemMessageBus() if os.geteuid() == 0 else SessionMessageBus()
+            manager = bus.get_proxy("org.freedesktop.systemd1", "/org/freedesktop/systemd1")
+            properties = [(name, _variant(signature, value)) for name, signature, value in self.properties(pid)]
+            manager.StartTransientUnit(unit, "fail", properties, [])
+        except Exception as e:
+            raise SandboxError(f"systemd wouldn't start {unit}: {e}") from e
+        # starting the unit is a job; the pid moves once it has run
+        deadline = time.monotonic() + self.timeout
+        while time.monotonic() < deadline:
+            path = cgroup_of(pid)
+            if path is not None and path.endswith(unit):
+                return os.path.join(self.mount, path.lstrip("/"))
+            time.sleep(0.01)
+        raise SandboxError(f"{unit} didn't show up within {self.timeout:.0f}s")
+
+    def release(self) -> None:
+        pass
+
+
+def find_backend(cgroup: str | None = None, cpu_max: float | None = None):
+    """DelegatedCgroup under `cgroup` if given, else a SystemdScope if there's dasbus and cgroup v2, else None."""
+    if cgroup is not None:
+        return DelegatedCgroup(cgroup, cpu_max)
+    try:
+        import dasbus  # noqa: F401
+
+        return SystemdScope(cpu_max)
+    except (ImportError, SandboxError):
+        return None
+
+
+def _child(conn, func, args, kwargs) -> None:
+    conn.recv()  # wait until we're in the cgroup
+    try:
+        reply = ("ok", func(*args, **kwargs))
+    except BaseException as e:
+        reply = ("error", e)
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    waited = resource.getrusage(resource.RUSAGE_CHILDREN)
+    totals = {
+        "user_s": own.ru_utime + waited.ru_utime,
+        "system_s": own.ru_stime + waited.ru_stime,
+        "maxrss_kb": max(own.ru_maxrss, waited.ru_maxrss),
+        "inblock": own.ru_inblock + waited.ru_inblock,
+        "oublock": own.ru_oublock + waited.ru_oublock,
+    }
+    try:
+        conn.send((*reply, totals))
+    except Exception as e:  # the result or the exception didn't pickle
+        conn.send(("error", RuntimeError(f"{type(e).__name__}: {e}"), totals))
+    try:
+        conn.recv()  # stay in the cgroup until the parent has read it
+    except EOFError:
+        pass
+
+
+def run_sandboxed(func, args=(), kwargs=None, backend=None, clock=time.perf_counter):
+    """
+    Calls `func(*args, **kwargs)` in a forked child, in a cgroup of its own when `backend` can set one up.
+    Returns (result, ResourceUsage); an exception in the child is raised here. The child is forked, so `func`
+    can be a closure, but what it returns has to pickle.
+    """
+    ctx = mp.get_context("fork")
+    parent_conn, child_conn = ctx.Pipe()
+    proc = ctx.Process(target=_child, args=(child_conn, func, args, kwargs or {}), name="batben-sandbox")
+    proc.start()
+    child_conn.close()
+    notes, path = [], None
+    try:
+        if backend is not None:
+            try:
+                path = backend.place(proc.pid)
+            except SandboxError as e:
+                notes.append(f"{e}; falling back to getrusage")
+            notes.extend(backend.notes)
+        pressure_before = _pressure_totals(path) if path is not None else {}
+        start = clock()
+        parent_conn.send("go")
+        try:
+            status, value, totals = parent_conn.recv()
+        except EOFError:
+            proc.join()
+            raise SandboxError(f"the sandboxed workload died with exit code {proc.exitcode}") from None
+        wall = clock() - start
+        if path is not None:
+            usage = read_cgroup_usage(path, wall, backend.name, pressure_before)
+            usage.cpu_max = backend.cap
+        else:
+            usage = rusage_usage(totals, wall)
+            if backend is not None and backend.cpu_max is not None:
+                notes.append("no cgroup, so the CPU cap wasn't enforced")
+        usage.notes = notes
+        parent_conn.send("done")
+    finally:
+        parent_conn.close()
+        proc.join(timeout=10)
+        if proc.is_alive():
+            proc.kill()
+            proc.join()
+        if backend is not None:
+            backend.release()
+    if status == "error":
+        raise value
+    return value, usage
+
+
+def sandboxed(func=None, *, backend=None):
+    """
+    Decorator form of run_sandboxed, like rapl.measure_energy. The latest ResourceUsage is kept on
+    `wrapper.last_usage`.
+    """
+    if func is None:
+        return functools.partial(sandboxed, backend=backend)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        result, wrapper.last_usage = run_sandboxed(func, args, kwargs, backend)
+        return result
+
+    wrapper.last_usage = None
+    return wrapper
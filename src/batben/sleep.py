@@ -1,23 +1,191 @@
-from pydbus import SystemBus
+import math
+import os
+import re
+import time
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 
 
-def quick_sleep_dbus(time_secs: int) -> None:
+class SuspendError(Exception):
+    pass
+
+
+def quick_sleep_dbus(time_secs: int, bus=None) -> None:
     """
     Suspends the system and sets a scheduled wakeup time via systemd-logind
-    using D-Bus, avoiding the need for rtcwake and subprocess.
+    using D-Bus, avoiding the need for rtcwake and subprocess. `bus` is a dasbus
+    message bus, the system one by default.
 
     NOTE: This requires the calling user to be allowed to suspend/hibernate,
           usually via polkit/sudoers configuration, but avoids full root for D-Bus.
-    Example usage (uncomment to test):
-    quick_sleep_dbus(600) # Sleep for 10 minutes (600 seconds)
+    Raises SuspendError when there's no bus or logind refuses.
     """
-    bus = SystemBus()
+    try:
+        if bus is None:
+            from dasbus.connection import SystemMessageBus
+
+            bus = SystemMessageBus()
+        manager = bus.get_proxy("org.freedesktop.login1", "/org/freedesktop/login1")
+
+        now = datetime.now()
+        wakeup_time = now + timedelta(seconds=time_secs)
+        wakeup_us = int(wakeup_time.timestamp() * 1000000)
+        manager.SetWakeup("suspend", wakeup_us)
+        manager.Suspend(False)
+    except Exception as e:
+        raise SuspendError(f"logind wouldn't suspend: {e}") from e
+
+
+# ███████╗██████╗ ██╗██████╗ ██╗     ███████╗
+# ██╔════╝╚════██╗██║██╔══██╗██║     ██╔════╝
+# ███████╗ █████╔╝██║██║  ██║██║     █████╗
+# ╚════██║██╔═══╝ ██║██║  ██║██║     ██╔══╝
+# ███████║███████╗██║██████╔╝███████╗███████╗
+# ╚══════╝╚══════╝╚═╝╚═════╝ ╚══════╝╚══════╝
+# Where the kernel and the platform drivers keep score of how deep we actually went. Paths are relative
+# to a root so tests can point them at a fake tree. Every counter is in microseconds.
+RESIDENCY_SOURCES = {
+    # total time the hardware reported being in its deepest state during suspend (6.4+, AMD and Intel)
+    "total_hw_sleep": "sys/power/suspend_stats/total_hw_sleep",
+    # Intel S0ix residency from the ACPI LPIT table
+    "lpit_system": "sys/devices/system/cpu/cpuidle/low_power_idle_system_residency_us",
+    # Intel PMC SLP_S0 residency
+    "pmc_core_slp_s0": "sys/kernel/debug/pmc_core/slp_s0_residency_usec",
+    # AMD PMC: parsed out of s0ix_stats
+    "amd_pmc_s0i3": "sys/kernel/debug/amd_pmc/s0ix_stats",
+}
+SUSPEND_STATS = "sys/power/suspend_stats"
+
+
+def _read_counter(path: str) -> int | None:
+    try:
+        with open(path) as f:
+            text = f.read()
+    except OSError:
+        return None
+    if path.endswith("s0ix_stats"):
+        # "Time (in us) in S0i3: 123456"
+        match = re.search(r"Time \(in us\) in S0i3:\s*(\d+)", text)
+        return int(match.group(1)) if match else None
+    try:
+        return int(text.strip())
+    except ValueError:
+        return None
+
+
+def read_residency(root: str = "/") -> dict[str, int]:
+    """Every low-power residency counter we can read right now, in microseconds."""
+    counters = {}
+    for name, rel in RESIDENCY_SOURCES.items():
+        value = _read_counter(os.path.join(root, rel))
+        if value is not None:
+            counters[name] = value
+    for name in ("success", "fail"):
+        value = _read_counter(os.path.join(root, SUSPEND_STATS, name))
+        if value is not None:
+            counters[f"suspend_{name}"] = value
+    return counters
+
+
+def read_clocks() -> tuple[float, float]:
+    """(CLOCK_BOOTTIME, CLOCK_MONOTONIC). Boottime keeps counting through suspend, monotonic doesn't."""
+    return time.clock_gettime(time.CLOCK_BOOTTIME), time.clock_gettime(time.CLOCK_MONOTONIC)
+
+
+@dataclass
+class SuspendResult:
+    requested: float
+    elapsed: float  # boottime, including the suspend
+    suspended: float  # boottime minus monotonic: time the system was actually asleep
+    residency: dict[str, float] = field(default_factory=dict)  # seconds in the deepest state, per source
+    suspends: int | None = None  # successful suspends in between, from suspend_stats
+    energy_wh: float = math.nan  # battery energy drained
+    kind: str = "suspend"  # or "idle" for the awake half of sleep-check
+
+    @property
+    def deepest_s(self) -> float | None:
+        """Time in the deepest state, from the most direct source we have."""
+        for name in RESIDENCY_SOURCES:
+            if name in self.residency:
+                return self.residency[name]
+        return None
+
+    @property
+    def deepest_share(self) -> float | None:
+        deepest = self.deepest_s
+        if deepest is None or self.suspended <= 0:
+            return None
+        return min(deepest / self.suspended, 1.0)
+
+    @property
+    def wh_per_hour(self) -> float:
+        return self.energy_wh * 3600 / self.elapsed if self.elapsed > 0 else math.nan
+
+    def report(self) -> str:
+        if self.kind == "idle":
+            lines = [f"Stayed awake for {self.elapsed:.0f} seconds"]
+            if not math.isnan(self.energy_wh):
+                lines.append(f"Power spent: {self.energy_wh:.3f}Wh ({self.wh_per_hour:.3f}Wh/hour)")
+            return "\n".join(lines)
+        lines = [f"Slept for {self.suspended:.0f} of {self.elapsed:.0f} seconds (requested {self.requested:.0f})"]
+        if self.suspends is not None:
+            lines.append(f"Successful suspends: {self.suspends}")
+        if self.deepest_share is not None:
+            source = next(name for name in RESIDENCY_SOURCES if name in self.residency)
+            lines.append(f"Deepest state: {self.deepest_s:.0f}s, {self.deepest_share:.1%} of the suspend ({source})")
+        else:
+            lines.append("Deepest state: no residency counters readable (debugfs needs root)")
+        if not math.isnan(self.energy_wh):
+            lines.append(f"Power spent: {self.energy_wh:.3f}Wh ({self.wh_per_hour:.3f}Wh/hour)")
+        return "\n".join(lines)
+
+
+def measure_suspend(
+    duration: float,
+    suspend=quick_sleep_dbus,
+    root: str = "/",
+    clocks=read_clocks,
+    battery=None,
+    poll: float = 1.0,
+    wait=time.sleep,
+) -> SuspendResult:
+    """
+    Suspends for `duration` seconds and measures what actually happened.
+
+    `suspend(duration)` only has to ask for the suspend (logind returns right away) with a wakeup
+    `duration` seconds from now. We then wait until that much boottime went by, asleep or not.
+    `battery` is anything with read() -> (Wh, W, V), like a SysfsBattery. Everything is injectable
+    so tests can simulate a suspend.
+    """
+    before = read_residency(root)
+    boot0, mono0 = clocks()
+    energy0 = battery.read()[0] if battery is not None else math.nan
+
+    suspend(duration)
+    while True:
+        boot, mono = clocks()
+        suspended = (boot - boot0) - (mono - mono0)
+        if boot - boot0 >= duration:
+            break
+        wait(poll)
+
+    energy1 = battery.read()[0] if battery is not None else math.nan
+    after = read_residency(root)
+    result = SuspendResult(requested=duration, elapsed=boot - boot0, suspended=max(suspended, 0.0))
+    result.energy_wh = energy0 - energy1
+    for name in RESIDENCY_SOURCES:
+        if name in before and name in after:
+            result.residency[name] = (after[name] - before[name]) / 1e6
+    if "suspend_success" in before and "suspend_success" in after:
+        result.suspends = after["suspend_success"] - before["suspend_success"]
+    return result
 
-    manager = bus.get("org.freedesktop.login1", "/org/freedesktop/login1")
 
-    now = datetime.now()
-    wakeup_time = now + timedelta(seconds=time_secs)
-    wakeup_us = int(wakeup_time.timestamp() * 1000000)
-    manager.SetWakeup("suspend", wakeup_us)
-    manager.Suspend(False)
+def measure_idle(duration: float, battery=None, clocks=read_clocks, wait=time.sleep) -> SuspendResult:
+    """The awake half of sleep-check: sit idle for `duration` seconds and see what the battery says."""
+    boot0, _ = clocks()
+    energy0 = battery.read()[0] if battery is not None else math.nan
+    wait(duration)
+    boot1, _ = clocks()
+    energy1 = battery.read()[0] if battery is not None else math.nan
+    return SuspendResult(duration, boot1 - boot0, suspended=0.0, energy_wh=energy0 - energy1, kind="idle")
@@ -0,0 +1,189 @@
+"""
+Small statistics helpers, so comparing two runs doesn't need scipy.
+"""
+
+import math
+import statistics
+from dataclasses import dataclass
+
+
+def _betacf(a: float, b: float, x: float) -> float:
+    """Continued fraction for the incomplete beta function (modified Lentz)."""
+    tiny = 1e-300
+    qab, qap, qam = a + b, a + 1.0, a - 1.0
+    c, d = 1.0, 1.0 - qab * x / qap
+    d = 1.0 / (d if abs(d) > tiny else tiny)
+    h = d
+    for m in range(1, 300):
+        m2 = 2 * m
+        aa = m * (b - m) * x / ((qam + m2) * (a + m2))
+        d = 1.0 + aa * d
+        d = 1.0 / (d if abs(d) > tiny else tiny)
+        c = 1.0 + aa / c
+        c = c if abs(c) > tiny else tiny
+        h *= d * c
+        aa = -(a + m) * (qab + m) * x / ((a + m2) * (qap + m2))
+        d = 1.0 + aa * d
+        d = 1.0 / (d if abs(d) > tiny else tiny)
+        c = 1.0 + aa / c
+        c = c if abs(c) > tiny else tiny
+        delta = d * c
+        h *= delta
+        if abs(delta - 1.0) < 1e-14:
+            break
+    return h
+
+
+def betainc(a: float, b: float, x: float) -> float:
+    """Regularized incomplete beta function I_x(a, b)."""
+    if x <= 0.0:
+        return 0.0
+    if x >= 1.0:
+        return 1.0
+    lbeta = math.lgamma(a + b) - math.lgamma(a) - math.lgamma(b)
+    front = math.exp(lbeta + a * math.log(x) + b * math.log1p(-x))
+    if x < (a + 1.0) / (a + b + 2.0):
+        return front * _betacf(a, b, x) / a
+    return 1.0 - front * _betacf(b, a, 1.0 - x) / b
+
+
+def t_cdf(t: float, df: float) -> float:
+    """CDF of Student's t distribution."""
+    if math.isinf(df):
+        return statistics.NormalDist().cdf(t)
+    tail = 0.5 * betainc(df / 2.0, 0.5, df / (df + t * t))
+    return 1.0 - tail if t > 0 else tail
+
+
+def t_critical(df: float, confidence: float = 0.95) -> float:
+    """Two-sided critical value: P(|T| < t) == confidence."""
+    target = 1.0 - (1.0 - confidence) / 2.0
+    lo, hi = 0.0, 1.0
+    while t_cdf(hi, df) < target:
+        hi *= 2.0
+    for _ in range(100):
+        mid = (lo + hi) / 2.0
+        if t_cdf(mid, df) < target:
+            lo = mid
+        else:
+            hi = mid
+    return (lo + hi) / 2.0
+
+
+@dataclass(frozen=True)
+class Summary:
+    n: int
+    mean: float
+    median: float
+    stdev: float
+    ci_low: float
+    ci_high: float
+    confidence: float = 0.95
+
+    @property
+    def ci_half_width(self) -> float:
+        return (self.ci_high - self.ci_low) / 2
+
+    @property
+    def relative_error(self) -> float:
+        """CI half width relative to the mean, the thing to look at before calling two runs different"""
+        return self.ci_half_width / abs(self.mean) if self.mean else math.inf
+
+
+def summarize(samples, confidence: float = 0.95) -> Summary:
+    """Mean, median, stdev and a t-based confidence interval of the mean."""
+    samples = list(samples)
+    if not samples:
+        raise ValueError("need at least one sample")
+    n = len(samples)
+    mean = statistics.fmean(samples)
+    if n < 2:
+        return Summary(n, mean, mean, 0.0, -math.inf, math.inf, confidence)
+    stdev = statistics.stdev(samples)
+    half = t_critical(n - 1, confidence) * stdev / math.sqrt(n)
+    return Summary(n, mean, statistics.median(samples), stdev, mean - half, mean + half, confidence)
+
+
+def log2_histogram(samples) -> list[tuple[float, int]]:
+    """
+    Buckets samples into power-of-two bins: (upper bound, count) pairs from the lowest non-empty bin
+    to the highest. Anything up to 1 lands in the first bin. Latencies span orders of magnitude,
+    linear bins hide the tail.
+    """
+    counts = {}
+    for value in samples:
+        exponent = math.ceil(math.log2(value)) if value > 1 else 0
+        counts[exponent] = counts.get(exponent, 0) + 1
+    if not counts:
+        return []
+    return [(2.0**e, counts.get(e, 0)) for e in range(min(counts), max(counts) + 1)]
+
+
+def format_histogram(histogram: list[tuple[float, int]], unit: str = "us", width: int = 40) -> str:
+    """Text bar chart of a log2_histogram."""
+    peak = max((count for _, count in histogram), default=0)
+    lines = []
+    for bound, count in histogram:
+        bar = "#" * (round(width * count / peak) if peak else 0)
+        lines.append(f"  <= {bound:>10.0f}{unit} {count:>8} {bar}".rstrip())
+    return "\n".join(lines)
+
+
+def welch_t_test(n1: int, mean1: float, var1: float, n2: int, mean2: float, var2: float) -> tuple[float, float, float]:
+    """
+    Welch's unequal-variance t test from summary statistics alone.
+    Returns (t, degrees of freedom, two-sided p value). Needs at least two samples a side.
+    """
+    if n1 < 2 or n2 < 2:
+        raise ValueError("need at least two samples in each group")
+    se1, se2 = var1 / n1, var2 / n2
+    se = se1 + se2
+    if se == 0:
+        # both groups are constant: either identical or as different as it gets
+        if mean1 == mean2:
+            return 0.0, math.inf, 1.0
+        return math.copysign(math.inf, mean1 - mean2), math.inf, 0.0
+    t = (mean1 - mean2) / math.sqrt(se)
+    df = se**2 / (se1**2 / (n1 - 1) + se2**2 / (n2 - 1))
+    p = 2.0 * (1.0 - t_cdf(abs(t), df))
+    return t, df, p
+
+
+def merge_moments(a: tuple[int, float, float], b: tuple[int, float, float]) -> tuple[int, float, float]:
+    """
+    Combines two (count, mean, M2) running aggregates (Chan et al.), M2 being the sum of squared deviations.
+    Lets aggregates be updated one run at a time and rolled up without touching the raw samples.
+    """
+    n_a, mean_a, m2_a = a
+    n_b, mean_b, m2_b = b
+    n = n_a + n_b
+    if n == 0:
+        return 0, 0.0, 0.0
+    delta = mean_b - mean_a
+    mean = mean_a + delta * n_b / n
+    m2 = m2_a + m2_b + delta * delta * n_a * n_b / n
+    return n, mean, m2
+
+
+def theil_sen(x, y, confidence: float = 0.95) -> tuple[float, float, float]:
+    """
+    Theil-Sen slope: the median of the slopes between every pair of points, with Sen's rank-based
+    confidence interval. Returns (slope, low, high). A few wild points (a battery reading that jumps
+    after a firmware refresh) barely move it, where they'd drag a least-squares fit around.
+    O(n^2) pairs, computed all at once with numpy, but thin long series first.
+    """
+    import numpy as np
+
+    x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+    i, j = np.triu_indices(len(x), k=1)
+    dx = x[j] - x[i]
+    keep = dx != 0
+    slopes = np.sort((y[j] - y[i])[keep] / dx[keep])
+    if not len(slopes):
+        raise ValueError("need at least two points with different x")
+    n, pairs = len(x), len(slopes)
+    # variance of Kendall's S without ties, normal approximation
+    c = statistics.NormalDist().inv_cdf(0.5 + confidence / 2) * math.sqrt(n * (n - 1) * (2 * n + 5) / 18)
+    low = max(int((pairs - c) / 2), 0)
+    high = min(math.ceil((pairs + c) / 2), pairs - 1)
+    return float(np.median(slopes)), float(slopes[low]), float(slopes[high])
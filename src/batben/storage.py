@@ -0,0 +1,187 @@
+"""
+Storage I/O engine.
+
+A small fio-alike: sequential or random reads/writes of a fixed block size over a scratch file, with a number of
+requests in flight (one thread per slot, pread/pwrite release the GIL), through the page cache, around it with
+O_DIRECT, or through mmap. NVMe APST and runtime PM get tuned differently by ppd, TLP and tuned, and the
+latency percentiles are where that shows up.
+"""
+
+import mmap
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+import numpy as np
+
+PATTERNS = ("seq", "rand")
+OPS = ("read", "write")
+MODES = ("buffered", "direct", "mmap")
+FSYNC_POLICIES = ("none", "end", "every")
+
+
+@dataclass
+class IoJob:
+    pattern: str = "seq"
+    op: str = "read"
+    block_size: int = 4096
+    file_size: int = 64 << 20
+    queue_depth: int = 1
+    mode: str = "buffered"
+    fsync: str = "end"  # none, end (once after the run), every (after each write)
+    target_dir: str | None = None  # defaults to the system temp dir, which may well be tmpfs
+    seed: int = 0
+
+    def __post_init__(self):
+        for value, allowed in (
+            (self.pattern, PATTERNS),
+            (self.op, OPS),
+            (self.mode, MODES),
+            (self.fsync, FSYNC_POLICIES),
+        ):
+            if value not in allowed:
+                raise ValueError(f"{value!r} isn't one of {', '.join(allowed)}")
+        if self.block_size <= 0 or self.file_size < self.block_size:
+            raise ValueError("need block_size > 0 and file_size >= block_size")
+        if self.mode in ("direct", "mmap") and self.block_size % mmap.PAGESIZE:
+            raise ValueError(f"{self.mode} I/O needs the block size to be a multiple of {mmap.PAGESIZE}")
+        if self.queue_depth < 1:
+            raise ValueError("queue depth must be at least 1")
+
+    def describe(self) -> str:
+        bs = f"{self.block_size >> 10}K" if self.block_size % 1024 == 0 else f"{self.block_size}B"
+        return f"{self.pattern} {self.op} bs={bs} qd={self.queue_depth} {self.mode} fsync={self.fsync}"
+
+
+@dataclass
+class IoResult:
+    job: IoJob
+    elapsed: float
+    latencies_ns: np.ndarray = field(repr=False)
+
+    @property
+    def ops(self) -> int:
+        return len(self.latencies_ns)
+
+    @property
+    def iops(self) -> float:
+        return self.ops / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def mb_per_s(self) -> float:
+        return self.iops * self.job.block_size / 1e6
+
+    def percentile_us(self, q: float) -> float:
+        return float(np.percentile(self.latencies_ns, q)) / 1e3
+
+    def report(self) -> str:
+        return (
+            f"{self.job.describe()}: {self.mb_per_s:.1f} MB/s, {self.iops:.0f} IOPS, "
+            f"p50 {self.percentile_us(50):.1f}us, p99 {self.percentile_us(99):.1f}us"
+        )
+
+
+def _fill(path: str, size: int, block_size: int) -> None:
+    """Writes the whole file for real, so reads hit allocated blocks and not holes."""
+    block = np.random.default_rng(1).integers(0, 256, block_size, dtype=np.uint8).tobytes()
+    with open(path, "wb") as f:
+        for _ in range(size // block_size):
+            f.write(block)
+        f.flush()
+        os.fsync(f.fileno())
+    # drop it from the page cache, otherwise buffered reads never touch the disk
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    finally:
+        os.close(fd)
+
+
+def _open(path: str, job: IoJob) -> int:
+    flags = os.O_RDWR
+    if job.mode == "direct":
+        flags |= os.O_DIRECT
+    try:
+        return os.open(path, flags)
+    except OSError as e:
+        if job.mode == "direct":
+            raise OSError(e.errno, f"O_DIRECT isn't supported in {os.path.dirname(path)} (tmpfs?)") from e
+        raise
+
+
+def _worker(fd, mapped, job: IoJob, offsets: np.ndarray, latencies: np.ndarray) -> None:
+    # an anonymous mapping is page aligned, which O_DIRECT needs
+    buf = mmap.mmap(-1, job.block_size)
+    view = memoryview(buf)
+    buf.write(np.random.default_rng(2).integers(0, 256, job.block_size, dtype=np.uint8).tobytes())
+    bs = job.block_size
+    write = job.op == "write"
+    sync_every = write and job.fsync == "every"
+    clock = time.perf_counter_ns
+    try:
+        for i, off in enumerate(offsets.tolist()):
+            start = clock()
+            if mapped is not None:
+                if write:
+                    mapped[off : off + bs] = view
+                    if sync_every:
+                        mapped.flush(off, bs)
+                else:
+                    view[:] = mapped[off : off + bs]
+            elif write:
+                os.pwritev(fd, [view], off)
+                if sync_every:
+                    os.fdatasync(fd)
+            else:
+                os.preadv(fd, [view], off)
+            latencies[i] = clock() - start
+    finally:
+        view.release()
+        buf.close()
+
+
+def run_io_job(job: IoJob) -> IoResult:
+    blocks = job.file_size // job.block_size
+    offsets = np.arange(blocks, dtype=np.int64) * job.block_size
+    if job.pattern == "rand":
+        offsets = np.random.default_rng(job.seed).permutation(offsets)
+    latencies = np.zeros(blocks, dtype=np.int64)
+    # each slot of the queue gets an interleaved share, so a sequential job stays roughly sequential
+    shares = [(offsets[i :: job.queue_depth], latencies[i :: job.queue_depth]) for i in range(job.queue_depth)]
+
+    with tempfile.TemporaryDirectory(prefix="batben-io-", dir=job.target_dir) as tmp:
+        path = os.path.join(tmp, "scratch")
+        _fill(path, blocks * job.block_size, job.block_size)
+        fd = _open(path, job)
+        mapped = mmap.mmap(fd, blocks * job.block_size) if job.mode == "mmap" else None
+        try:
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=job.queue_depth) as pool:
+                futures = [pool.submit(_worker, fd, mapped, job, offs, lats) for offs, lats in shares]
+            for future in futures:
+                future.result()
+            if job.op == "write" and job.fsync == "end":
+                if mapped is not None:
+                    mapped.flush()
+                else:
+                    os.fsync(fd)
+            elapsed = time.perf_counter() - start
+        finally:
+            if mapped is not None:
+                mapped.close()
+            os.close(fd)
+    # strided views wrote straight into `latencies`
+    return IoResult(job, elapsed, latencies)
+
+
+def default_matrix(**overrides) -> list[IoJob]:
+    """The usual suspects: sequential throughput, random 4K at QD1 (latency) and QD32 (IOPS)."""
+    return [
+        IoJob(pattern="seq", op="read", block_size=1 << 20, **overrides),
+        IoJob(pattern="seq", op="write", block_size=1 << 20, **overrides),
+        IoJob(pattern="rand", op="read", block_size=4096, queue_depth=1, **overrides),
+        IoJob(pattern="rand", op="read", block_size=4096, queue_depth=32, **overrides),
+        IoJob(pattern="rand", op="write", block_size=4096, queue_depth=1, **overrides),
+    ]
@@ -0,0 +1,236 @@
+"""
+Results store.
+
+Every bench/sleep-check result goes into a local SQLite file, indexed by machine, power profile,
+workload, kernel and time. Alongside the raw metrics, a running (count, mean, M2) aggregate per
+group and metric is updated in the same transaction, so comparing profiles reads a handful of
+aggregate rows instead of rescanning thousands of runs.
+"""
+
+import math
+import os
+import sqlite3
+import time
+from dataclasses import dataclass
+
+from . import stats
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    machine TEXT NOT NULL,
+    profile TEXT NOT NULL,
+    workload TEXT NOT NULL,
+    kernel TEXT NOT NULL,
+    command TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_group ON runs (machine, profile, workload, kernel, ts);
+CREATE INDEX IF NOT EXISTS runs_ts ON runs (ts);
+CREATE TABLE IF NOT EXISTS metrics (
+    run_id INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    value REAL NOT NULL,
+    PRIMARY KEY (run_id, name)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS aggregates (
+    machine TEXT NOT NULL,
+    profile TEXT NOT NULL,
+    workload TEXT NOT NULL,
+    kernel TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    n INTEGER NOT NULL,
+    mean REAL NOT NULL,
+    m2 REAL NOT NULL,
+    PRIMARY KEY (workload, metric, machine, profile, kernel)
+) WITHOUT ROWID;
+"""
+
+
+def default_path() -> str:
+    data_home = os.environ.get("XDG_DATA_HOME") or os.path.expanduser("~/.local/share")
+    return os.path.join(data_home, "batben", "results.sqlite")
+
+
+def derived_metrics(metrics: dict[str, float]) -> dict[str, float]:
+    """Adds the efficiency numbers we can work out from what a run reported."""
+    metrics = dict(metrics)
+    energy = metrics.get("energy_wh")
+    if energy and energy > 0 and "events" in metrics:
+        metrics.setdefault("events_per_wh", metrics["events"] / energy)
+    if energy is not None and metrics.get("duration"):
+        metrics.setdefault("wh_per_hour", energy * 3600 / metrics["duration"])
+    return metrics
+
+
+@dataclass
+class ProfileStats:
+    profile: str
+    n: int
+    mean: float
+    m2: float
+
+    @property
+    def variance(self) -> float:
+        return self.m2 / (self.n - 1) if self.n > 1 else 0.0
+
+    @property
+    def stdev(self) -> float:
+        return math.sqrt(self.variance)
+
+
+@dataclass
+class Comparison:
+    profile: str
+    baseline: str
+    stats: ProfileStats
+    delta: float  # relative to the baseline mean
+    p_value: float | None  # None when either side has fewer than two runs
+
+
+class ResultStore:
+    def __init__(self, path: str | None = None):
+        self.path = path or default_path()
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.db = sqlite3.connect(self.path)
+        self.db.execute("PRAGMA foreign_keys = ON")
+        self.db.execute("PRAGMA journal_mode = WAL")
+        self.db.executescript(SCHEMA)
+
+    def add_run(
+        self,
+        metrics: dict[str, float],
+        machine: str,
+        profile: str,
+        workload: str,
+        kernel: str,
+        command: str = "bench",
+        ts: float | None = None,
+    ) -> int:
+        """Stores one run and folds its metrics into the aggregates. Returns the run id."""
+        metrics = {k: float(v) for k, v in derived_metrics(metrics).items() if v is not None and math.isfinite(v)}
+        group = (machine, profile, workload, kernel)
+        with self.db:
+            cur = self.db.execute(
+                "INSERT INTO runs (ts, machine, profile, workload, kernel, command) VALUES (?, ?, ?, ?, ?, ?)",
+                (time.time() if ts is None else ts, *group, command),
+            )
+            run_id = cur.lastrowid
+            self.db.executemany(
+                "INSERT INTO metrics (run_id, name, value) VALUES (?, ?, ?)",
+                [(run_id, name, value) for name, value in metrics.items()],
+            )
+            for name, value in metrics.items():
+                row = self.db.execute(
+                    "SELECT n, mean, m2 FROM aggregates "
+                    "WHERE machine = ? AND profile = ? AND workload = ? AND kernel = ? AND metric = ?",
+                    (*group, name),
+                ).fetchone()
+                n, mean, m2 = stats.merge_moments(row or (0, 0.0, 0.0), (1, value, 0.0))
+                self.db.execute(
+                    "INSERT OR REPLACE INTO aggregates (machine, profile, workload, kernel, metric, n, mean, m2) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (*group, name, n, mean, m2),
+                )
+        return run_id
+
+    def run_count(self) -> int:
+        return self.db.execute("SELECT COUNT(*) FROM runs").fetchone()[0]
+
+    def runs_after(self, run_id: int = 0, limit: int = 500) -> list[dict]:
+        """Runs with an id above `run_id`, oldest first, each with its metrics, as plain dicts."""
+        rows = self.db.execute(
+            "SELECT id, ts, machine, profile, workload, kernel, command FROM runs WHERE id > ? ORDER BY id LIMIT ?",
+            (run_id, limit),
+        ).fetchall()
+        runs = []
+        for id_, ts, machine, profile, workload, kernel, command in rows:
+            metrics = dict(self.db.execute("SELECT name, value FROM metrics WHERE run_id = ?", (id_,)))
+            runs.append(
+                {
+                    "id": id_,
+                    "ts": ts,
+                    "machine": machine,
+                    "profile": profile,
+                    "workload": workload,
+                    "kernel": kernel,
+                    "command": command,
+                    "metrics": metrics,
+                }
+            )
+        return runs
+
+    def profile_stats(
+        self, metric: str, workload: str, machine: str | None = None, kernel: str | None = None
+    ) -> dict[str, ProfileStats]:
+        """Per-profile aggregate of `metric`, rolled up over machines/kernels unless those are pinned."""
+        query = "SELECT profile, n, mean, m2 FROM aggregates WHERE workload = ? AND metric = ?"
+        params = [workload, metric]
+        if machine is not None:
+            query += " AND machine = ?"
+            params.append(machine)
+        if kernel is not None:
+            query += " AND kernel = ?"
+            params.append(kernel)
+        rolled = {}
+        for profile, n, mean, m2 in self.db.execute(query, params):
+            rolled[profile] = stats.merge_moments(rolled.get(profile, (0, 0.0, 0.0)), (n, mean, m2))
+        return {profile: ProfileStats(profile, *moments) for profile, moments in sorted(rolled.items())}
+
+    def compare(
+        self,
+        metric: str,
+        workload: str,
+        baseline: str | None = None,
+        machine: str | None = None,
+        kernel: str | None = None,
+    ) -> list[Comparison]:
+        """
+        Every profile against `baseline` (default: the one with the most runs) with Welch's t test.
+        """
+        profiles = self.profile_stats(metric, workload, machine, kernel)
+        if not profiles:
+            return []
+        if baseline is None:
+            baseline = max(profiles.values(), key=lambda p: p.n).profile
+        if baseline not in profiles:
+            raise KeyError(f"no runs for baseline profile {baseline!r}")
+        base = profiles[baseline]
+        result = []
+        for p in profiles.values():
+            delta = (p.mean - base.mean) / base.mean if base.mean else math.nan
+            p_value = None
+            if p.n > 1 and base.n > 1:
+                _, _, p_value = stats.welch_t_test(p.n, p.mean, p.variance, base.n, base.mean, base.variance)
+            result.append(Comparison(p.profile, baseline, p, delta, p_value))
+        return result
+
+    def close(self) -> None:
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def format_comparison(metric: str, rows: list[Comparison], alpha: float = 0.05) -> str:
+    if not rows:
+        return f"no runs recorded for {metric}"
+    lines = [
+        f"{metric} vs {rows[0].baseline}",
+        f"{'profile':<24} {'runs':>5} {'mean':>12} {'stdev':>10} {'delta':>8}  p",
+    ]
+    for row in rows:
+        if row.profile == row.baseline:
+            verdict = "(baseline)"
+        elif row.p_value is None:
+            verdict = "n/a (need 2+ runs)"
+        else:
+            verdict = f"{row.p_value:.3f}" + (" *" if row.p_value < alpha else "")
+        s = row.stats
+        lines.append(f"{row.profile:<24} {s.n:>5} {s.mean:>12.3f} {s.stdev:>10.3f} {row.delta:>+8.1%}  {verdict}")
+    lines.append(f"* significant at p < {alpha}")
+    return "\n".join(lines)
@@ -0,0 +1,56 @@
+"""
+What machine is this and how is it tuned? Used to label results.
+"""
+
+import os
+import platform
+
+DMI_ROOT = "/sys/class/dmi/id"
+
+
+def read_text(path: str) -> str | None:
+    """A sysfs/procfs file's stripped contents, or None if it's empty or can't be read."""
+    try:
+        with open(path) as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def machine_name(dmi_root: str = DMI_ROOT) -> str:
+    """Vendor and model from DMI, e.g. 'LENOVO ThinkPad X12 Detachable Gen 1', or the hostname on anything else."""
+    parts = [read_text(os.path.join(dmi_root, name)) for name in ("sys_vendor", "product_version", "product_name")]
+    parts = [p for p in parts if p and p.lower() not in ("to be filled by o.e.m.", "default string", "none")]
+    # Lenovo puts the marketing name in product_version and an SKU in product_name
+    return " ".join(dict.fromkeys(parts)) or platform.node()
+
+
+def cpu_model(cpuinfo: str = "/proc/cpuinfo") -> str:
+    try:
+        with open(cpuinfo) as f:
+            for line in f:
+                if line.startswith("model name"):
+                    return line.split(":", 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor() or platform.machine()
+
+
+def kernel_release() -> str:
+    return platform.release()
+
+
+def detect_profile(root: str = "/") -> str:
+    """
+    Best guess at which power tuning is active: tuned's active profile, TLP if its run dir exists,
+    otherwise the ACPI platform profile (which is what power-profiles-daemon drives). 'unknown' if none.
+    """
+    tuned = read_text(os.path.join(root, "etc/tuned/active_profile"))
+    if tuned and os.path.exists(os.path.join(root, "run/tuned")):
+        return f"tuned:{tuned}"
+    if os.path.isdir(os.path.join(root, "run/tlp")):
+        return "tlp"
+    platform_profile = read_text(os.path.join(root, "sys/firmware/acpi/platform_profile"))
+    if platform_profile:
+        return f"ppd:{platform_profile}"
+    return "unknown"
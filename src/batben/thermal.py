@@ -0,0 +1,275 @@
+"""
+Sustained performance and thermal throttling.
+
+One events/s figure for a whole run can't tell a profile that holds its clocks from one that boosts for two
+minutes and then throttles hard: both average out to something plausible. This cuts the run into windows,
+scores each one, and lines them up with the hottest thermal zone and the CPU throttle counters, so the
+curve shows where the machine settles and how far below its peak that is.
+"""
+
+import glob
+import math
+import os
+import statistics
+import threading
+import time
+from dataclasses import dataclass, field
+
+from .system import read_text
+
+THERMAL_ROOT = "/sys/class/thermal"
+CPU_ROOT = "/sys/devices/system/cpu"
+SPARKS = "▁▂▃▄▅▆▇█"
+
+
+def _pread_int(fd: int) -> int | None:
+    try:
+        return int(os.pread(fd, 32, 0))
+    except (OSError, ValueError):
+        return None  # some zones return EINVAL or ENODATA while their sensor is off
+
+
+@dataclass
+class ThermalResult:
+    samples: list[tuple[float, float, int]] = field(default_factory=list)  # (s since start, max °C, throttles)
+    zone_max_c: dict[str, float] = field(default_factory=dict)
+    core_throttles: int = 0  # summed over cores
+    package_throttles: int = 0  # per package, counted once
+
+    @property
+    def max_temp_c(self) -> float:
+        return max(self.zone_max_c.values(), default=math.nan)
+
+    def metrics(self) -> dict[str, float]:
+        return {
+            "max_temp_c": self.max_temp_c,
+            "core_throttles": self.core_throttles,
+            "package_throttles": self.package_throttles,
+        }
+
+    def report(self) -> str:
+        zones = ", ".join(f"{name} {temp:.0f}°C" for name, temp in self.zone_max_c.items())
+        return (
+            f"thermal: max {zones or 'no zones'}; "
+            f"throttle events: {self.core_throttles} core, {self.package_throttles} package"
+        )
+
+
+class ThermalCollector:
+    """
+    Samples every thermal zone and the per-core thermal_throttle counters at `rate` Hz on a background thread
+    between `start` and `stop`. False when there's nothing to read (VMs, most ARM boards lack the counters).
+    """
+
+    def __init__(
+        self, thermal_root: str = THERMAL_ROOT, cpu_root: str = CPU_ROOT, rate: float = 1.0, clock=time.monotonic
+    ):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.interval = 1.0 / rate
+        self._clock = clock
+        self._zones = []  # (name, fd)
+        zones = glob.glob(os.path.join(thermal_root, "thermal_zone*"))
+        for zone in sorted(zones, key=lambda z: int(z.rsplit("e", 1)[1])):
+            try:
+                fd = os.open(os.path.join(zone, "temp"), os.O_RDONLY)
+            except OSError:
+                continue
+            name = read_text(os.path.join(zone, "type")) or os.path.basename(zone)
+            if name in dict(self._zones):  # several acpitz zones are common
+                name = f"{name}:{os.path.basename(zone)}"
+            self._zones.append((name, fd))
+        self._core_fds = []
+        self._package_fds = {}  # physical package id -> fd, one core per package
+        for counter in sorted(glob.glob(os.path.join(cpu_root, "cpu*", "thermal_throttle", "core_throttle_count"))):
+            self._core_fds.append(os.open(counter, os.O_RDONLY))
+            cpu = os.path.dirname(os.path.dirname(counter))
+            package = read_text(os.path.join(cpu, "topology", "physical_package_id")) or "0"
+            package_counter = os.path.join(os.path.dirname(counter), "package_throttle_count")
+            if package not in self._package_fds and os.path.exists(package_counter):
+                self._package_fds[package] = os.open(package_counter, os.O_RDONLY)
+        self._first = (0, 0)
+        self._zone_max = {}
+        self._samples = []
+        self._started = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __bool__(self) -> bool:
+        return bool(self._zones or self._core_fds)
+
+    def _throttles(self) -> tuple[int, int]:
+        core = sum(v for fd in self._core_fds if (v := _pread_int(fd)) is not None)
+        package = sum(v for fd in self._package_fds.values() if (v := _pread_int(fd)) is not None)
+        return core, package
+
+    def sample(self) -> None:
+        """Takes one reading. The thread calls this, tests can too."""
+        hottest = math.nan
+        for name, fd in self._zones:
+            milli = _pread_int(fd)
+            if milli is None:
+                continue
+            temp = milli / 1000
+            self._zone_max[name] = max(self._zone_max.get(name, temp), temp)
+            hottest = temp if math.isnan(hottest) else max(hottest, temp)
+        core, package = self._throttles()
+        self._samples.append((self._clock() - self._started, hottest, core + package - sum(self._first)))
+
+    def _run(self) -> None:
+        next_tick = self._clock()
+        while not self._stop.is_set():
+            self.sample()
+            next_tick = max(next_tick + self.interval, self._clock())
+            self._stop.wait(next_tick - self._clock())
+
+    def start(self, thread: bool = True) -> None:
+        self._samples = []
+        self._zone_max = {}
+        self._started = self._clock()
+        self._first = self._throttles()
+        if thread and self:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="batben-thermal", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> ThermalResult:
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        self.sample()
+        core, package = self._throttles()
+        return ThermalResult(list(self._samples), dict(self._zone_max), core - self._first[0], package - self._first[1])
+
+    def close(self) -> None:
+        for _, fd in self._zones:
+            os.close(fd)
+        for fd in [*self._core_fds, *self._package_fds.values()]:
+            os.close(fd)
+        self._zones, self._core_fds, self._package_fds = [], [], {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+@dataclass
+class Window:
+    start_s: float
+    seconds: float
+    events_per_s: float
+    temp_c: float = math.nan  # mean of the hottest zone over the window
+    throttles: int = 0
+
+
+def window_rates(timeline: list[tuple[float, int]], window: float) -> list[Window]:
+    """
+    Cuts a cumulative (seconds, events) timeline, as GovernorResult.timeline has it, into windows of at least
+    `window` seconds. Windows end on a timeline point; a partial one at the end is dropped.
+    """
+    out = []
+    start_t, start_e = 0.0, 0
+    for t, e in timeline:
+        if t - start_t >= window:
+            out.append(Window(start_t, t - start_t, (e - start_e) / (t - start_t)))
+            start_t, start_e = t, e
+    return out
+
+
+def _add_thermal(windows: list[Window], samples: list[tuple[float, float, int]]) -> None:
+    before = 0
+    for w in windows:
+        inside = [s for s in samples if w.start_s <= s[0] < w.start_s + w.seconds]
+        temps = [temp for _, temp, _ in inside if not math.isnan(temp)]
+        w.temp_c = statistics.fmean(temps) if temps else math.nan
+        if inside:
+            w.throttles = max(inside[-1][2] - before, 0)
+            before = inside[-1][2]
+
+
+def steady_state(rates: list[float], sustained: float, tolerance: float = 0.05, share: float = 0.8) -> int | None:
+    """
+    Index of the first window that is within `tolerance` of the sustained rate and from which at least `share`
+    of the remaining windows are too (the odd noisy window doesn't reset it). None if the run never settles.
+    """
+    within = [abs(r - sustained) <= tolerance * sustained for r in rates]
+    for i in range(len(rates)):
+        if within[i] and sum(within[i:]) >= share * (len(rates) - i):
+            return i
+    return None
+
+
+def _sparkline(values: list[float]) -> str:
+    low, high = min(values), max(values)
+    if high <= low:
+        return SPARKS[-1] * len(values)
+    return "".join(SPARKS[round((v - low) / (high - low) * (len(SPARKS) - 1))] for v in values)
+
+
+@dataclass
+class SustainedResult:
+    windows: list[Window]
+    sustained: float  # events/s, median of the last third of the windows
+    steady_index: int | None
+    thermal: ThermalResult | None = None
+
+    @property
+    def peak(self) -> float:
+        return max(w.events_per_s for w in self.windows)
+
+    @property
+    def peak_to_sustained(self) -> float:
+        return self.peak / self.sustained if self.sustained > 0 else math.inf
+
+    @property
+    def steady_state_s(self) -> float:
+        return self.windows[self.steady_index].start_s if self.steady_index is not None else math.nan
+
+    def metrics(self) -> dict[str, float]:
+        out = {
+            "sustained_events_per_s": self.sustained,
+            "peak_events_per_s": self.peak,
+            "peak_to_sustained": self.peak_to_sustained,
+            "steady_state_s": self.steady_state_s,
+        }
+        if self.thermal is not None:
+            out.update(self.thermal.metrics())
+        return out
+
+    def report(self) -> str:
+        rates = [w.events_per_s for w in self.windows]
+        settled = f"steady after {self.steady_state_s:.0f}s" if self.steady_index is not None else "never settled"
+        lines = [
+            f"sustained: {self.sustained:.2f} events/s, peak {self.peak:.2f} "
+            f"(peak/sustained {self.peak_to_sustained:.2f}), {settled}",
+            f"curve ({self.windows[0].seconds:.0f}s windows): {_sparkline(rates)}",
+        ]
+        temps = [w.temp_c for w in self.windows if not math.isnan(w.temp_c)]
+        if temps:
+            lines.append(f"hottest zone per window: {temps[0]:.0f}°C -> {temps[-1]:.0f}°C, max {max(temps):.0f}°C")
+        throttled = [w for w in self.windows if w.throttles]
+        if throttled:
+            lines.append(f"throttling in {len(throttled)} windows, first at {throttled[0].start_s:.0f}s")
+        if self.thermal is not None:
+            lines.append(self.thermal.report())
+        return "\n".join(lines)
+
+
+def sustained_performance(
+    timeline: list[tuple[float, int]],
+    window: float = 30.0,
+    thermal: ThermalResult | None = None,
+    tolerance: float = 0.05,
+) -> SustainedResult | None:
+    """The sustained-performance curve of a run, None if it's too short for three windows."""
+    windows = window_rates(timeline, window)
+    if len(windows) < 3:
+        return None
+    if thermal is not None:
+        _add_thermal(windows, thermal.samples)
+    rates = [w.events_per_s for w in windows]
+    sustained = statistics.median(rates[-max(len(rates) // 3, 1) :])
+    return SustainedResult(windows, sustained, steady_state(rates, sustained, tolerance), thermal)
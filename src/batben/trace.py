@@ -0,0 +1,277 @@
+"""
+Trace-driven "dev" workload.
+
+Sitting in an IDE and a browser doesn't look like any of the synthetic tasks: it's short bursts of work on
+timers and input events, with the machine idle in between. So instead of guessing, record it: sample every
+process in /proc during a real work session, keep the per-interval totals (CPU time, minor faults, I/O bytes,
+context switches as a stand-in for wakeups) in a recording, and replay those bursts later with the load
+governor's CPU, memory and I/O quanta on a fixed timeline.
+
+The replay does a fixed amount of work (the trace carries how long one CPU quantum took on the recording
+machine), so two profiles replaying the same trace did the same work and only differ in the energy they spent.
+"""
+
+import math
+import os
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+
+from . import workload
+from .governor import CpuUtilization, pinned_cpus
+from .noise import parse_io, parse_stat
+from .recording import Recorder, Recording
+
+TRACE_COLUMNS = ["t", "cpu_s", "minor_faults", "read_bytes", "write_bytes", "wakeups"]
+PAGES_PER_MEM_QUANTUM = 256 * 1024 // 4096  # mem_quantum(256) copies 64 pages
+IO_BLOCK_KB = 64
+
+
+@dataclass
+class ProcSample:
+    comm: str
+    cpu_s: float
+    minor_faults: int
+    read_bytes: int
+    write_bytes: int
+    switches: int
+
+
+def read_process(pid_dir: str) -> ProcSample | None:
+    """
+    One process's counters, or None if it went away. /proc/<pid>/io is only readable for our own
+    processes (or as root); without it the I/O counters are 0.
+    """
+    try:
+        with open(os.path.join(pid_dir, "stat")) as f:
+            stat = f.read()
+        with open(os.path.join(pid_dir, "status")) as f:
+            status = f.read()
+    except OSError:
+        return None
+    counters = parse_stat(stat)
+    switches = 0
+    for line in status.splitlines():
+        if line.startswith(("voluntary_ctxt_switches", "nonvoluntary_ctxt_switches")):
+            switches += int(line.split()[1])
+    try:
+        with open(os.path.join(pid_dir, "io")) as f:
+            read_bytes, write_bytes = parse_io(f.read())
+    except OSError:
+        read_bytes = write_bytes = 0
+    return ProcSample(counters.comm, counters.cpu_s, counters.minor_faults, read_bytes, write_bytes, switches)
+
+
+def read_processes(proc_root: str = "/proc", exclude: set[int] = frozenset()) -> dict[int, ProcSample]:
+    processes = {}
+    for name in os.listdir(proc_root):
+        if not name.isdigit() or int(name) in exclude:
+            continue
+        sample = read_process(os.path.join(proc_root, name))
+        if sample is not None:
+            processes[int(name)] = sample
+    return processes
+
+
+def activity_delta(before: dict[int, ProcSample], after: dict[int, ProcSample]) -> dict[int, ProcSample]:
+    """
+    What every process did between two snapshots. A process that showed up in between counts from zero;
+    one that exited in between is lost (its last slice is too small to matter at a 1s interval).
+    """
+    zero = ProcSample("", 0.0, 0, 0, 0, 0)
+    delta = {}
+    for pid, now in after.items():
+        prev = before.get(pid, zero)
+        if prev.comm and prev.comm != now.comm:
+            prev = zero  # pid got reused, or the process exec'd
+        delta[pid] = ProcSample(
+            now.comm,
+            max(now.cpu_s - prev.cpu_s, 0.0),
+            max(now.minor_faults - prev.minor_faults, 0),
+            max(now.read_bytes - prev.read_bytes, 0),
+            max(now.write_bytes - prev.write_bytes, 0),
+            max(now.switches - prev.switches, 0),
+        )
+    return delta
+
+
+def calibrate_quantum_us(runs: int = 50) -> float:
+    """Median wall time of one workload.cpu_quantum, in microseconds."""
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter_ns()
+        workload.cpu_quantum()
+        timings.append((time.perf_counter_ns() - start) / 1e3)
+    return statistics.median(timings)
+
+
+def record_trace(
+    path: str,
+    duration: float,
+    interval: float = 1.0,
+    proc_root: str = "/proc",
+    clock=time.time,
+    wait=time.sleep,
+    quantum_us: float | None = None,
+) -> int:
+    """
+    Samples every process in `proc_root` each `interval` seconds for `duration` seconds into a recording at
+    `path`, one TRACE_COLUMNS row per interval (t is the start of the interval). The busiest processes over
+    the whole session are kept in a closing 'processes' event. Returns the number of intervals recorded.
+    """
+    quantum_us = calibrate_quantum_us() if quantum_us is None else quantum_us
+    exclude = {os.getpid()}
+    meta = {"kind": "trace", "interval": interval, "quantum_us": quantum_us, "io_block_kb": IO_BLOCK_KB}
+    totals = {}
+    rows = 0
+    with Recorder(path, TRACE_COLUMNS, meta=meta) as rec:
+        last = read_processes(proc_root, exclude)
+        start = last_t = clock()
+        while rows * interval < duration:
+            wait(max(last_t + interval - clock(), 0.0))
+            now = read_processes(proc_root, exclude)
+            t = clock()
+            delta = activity_delta(last, now)
+            rec.append(
+                (
+                    last_t,
+                    sum(p.cpu_s for p in delta.values()),
+                    sum(p.minor_faults for p in delta.values()),
+                    sum(p.read_bytes for p in delta.values()),
+                    sum(p.write_bytes for p in delta.values()),
+                    sum(p.switches for p in delta.values()),
+                )
+            )
+            for p in delta.values():
+                totals[p.comm] = totals.get(p.comm, 0.0) + p.cpu_s
+            last, last_t = now, t
+            rows += 1
+        top = dict(sorted(totals.items(), key=lambda item: -item[1])[:10])
+        rec.event("processes", t=clock(), duration=last_t - start, cpu_s={k: round(v, 2) for k, v in top.items()})
+    return rows
+
+
+@dataclass
+class Burst:
+    at: float  # seconds from the start of the replay
+    cpu: int  # quanta of each kind
+    mem: int
+    io: int
+
+
+def _split(total: int, parts: int) -> list[int]:
+    """`total` split into `parts` integers that differ by at most one, larger ones first."""
+    base, extra = divmod(total, parts)
+    return [base + (i < extra) for i in range(parts)]
+
+
+def build_schedule(rec: Recording, max_wakeups: float = 200.0) -> list[Burst]:
+    """
+    Turns a trace into bursts: every interval's context switches become that many evenly spaced wakeups
+    (capped at `max_wakeups` per second), and its CPU time, faults and I/O become quanta spread over them.
+    """
+    interval = rec.meta["interval"]
+    quantum_us = rec.meta["quantum_us"]
+    io_block = rec.meta.get("io_block_kb", IO_BLOCK_KB) * 1024
+    t = rec.column("t")
+    if not len(t):
+        return []
+    cols = {name: rec.column(name) for name in TRACE_COLUMNS[1:]}
+    schedule = []
+    for i in range(len(t)):
+        cpu = round(cols["cpu_s"][i] * 1e6 / quantum_us)
+        mem = int(cols["minor_faults"][i]) // PAGES_PER_MEM_QUANTUM
+        io = math.ceil(max(cols["read_bytes"][i], cols["write_bytes"][i]) / io_block)
+        wakeups = int(min(cols["wakeups"][i], max_wakeups * interval))
+        n = max(wakeups, 1) if cpu or mem or io else wakeups
+        if not n:
+            continue
+        start = t[i] - t[0]
+        for j, (c, m, o) in enumerate(zip(_split(cpu, n), _split(mem, n), _split(io, n))):
+            schedule.append(Burst(float(start + j * interval / n), c, m, o))
+    return schedule
+
+
+def _play(bursts: list[Burst], start_at: float) -> tuple[int, int, list[float]]:
+    """Runs bursts at `start_at` + burst.at on CLOCK_MONOTONIC. Returns (quanta, events, lateness per burst)."""
+    quanta = events = 0
+    late = []
+    for burst in bursts:
+        delay = start_at + burst.at - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        late.append(max(-delay, 0.0))
+        for _ in range(burst.cpu):
+            events += workload.cpu_quantum()
+        for _ in range(burst.mem):
+            events += workload.mem_quantum()
+        for _ in range(burst.io):
+            events += workload.io_quantum(IO_BLOCK_KB)
+        quanta += burst.cpu + burst.mem + burst.io
+    return quanta, events, late
+
+
+@dataclass
+class ReplayResult:
+    duration: float
+    workers: int
+    bursts: int
+    quanta: int
+    events: int
+    achieved: float  # average system load during the replay, percent
+    lateness: list[float] = field(default_factory=list, repr=False)
+
+    @property
+    def events_per_second(self) -> float:
+        return self.events / self.duration if self.duration > 0 else 0.0
+
+    @property
+    def late_p99_ms(self) -> float:
+        if not self.lateness:
+            return 0.0
+        ordered = sorted(self.lateness)
+        return ordered[min(int(len(ordered) * 0.99), len(ordered) - 1)] * 1e3
+
+    def report(self) -> str:
+        return (
+            f"Replayed {self.bursts} bursts ({self.quanta} quanta) in {self.duration:.1f}s "
+            f"on {self.workers} workers, average load {self.achieved:.1f}%\n"
+            f"wakeups late by p99 {self.late_p99_ms:.2f}ms\n"
+            f"perf score of     events per second: {self.events_per_second:.2f}"
+        )
+
+
+def replay_trace(path: str, workers: int | None = None, max_wakeups: float = 200.0) -> ReplayResult:
+    """
+    Replays a trace in real time. Bursts are dealt round-robin to `workers` processes (by default as many
+    as the busiest interval needed cores), which all follow the same timeline.
+    """
+    with Recording(path) as rec:
+        if rec.meta.get("kind") != "trace":
+            raise ValueError(f"{path} isn't a trace (record one with `batben trace record`)")
+        schedule = build_schedule(rec, max_wakeups)
+        cpu_s = rec.column("cpu_s")
+        peak = float(cpu_s.max() / rec.meta["interval"]) if len(cpu_s) else 0.0
+        length = float(len(cpu_s) * rec.meta["interval"])
+    if workers is None:
+        workers = max(1, min(os.cpu_count() or 1, math.ceil(peak)))
+    lanes = [schedule[i::workers] for i in range(workers)]
+
+    utilization = CpuUtilization(cpus=pinned_cpus())
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(_play, [[]] * workers, [0.0] * workers))  # fork the workers before the clock starts
+        start_at = time.monotonic() + 0.1
+        results = list(pool.map(_play, lanes, [start_at] * workers))
+        # the timeline is as long as the trace, even if the last intervals were idle
+        time.sleep(max(start_at + length - time.monotonic(), 0.0))
+    duration = time.monotonic() - start_at
+    return ReplayResult(
+        duration=duration,
+        workers=workers,
+        bursts=len(schedule),
+        quanta=sum(r[0] for r in results),
+        events=sum(r[1] for r in results),
+        achieved=utilization.sample(),
+        lateness=[late for r in results for late in r[2]],
+    )
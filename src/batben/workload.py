@@ -9,25 +9,31 @@ on a side note, i now realize why writing something like a geekbench clone is re
 maybe I SHOULD just ise geekbench (or a clone).
 """
 
+import functools
 import math
 import os
-import random
+import tempfile
 import time
 
-import httpx
-import numpy as np
+from . import harness
+
+
+def _wall_clock_ns() -> int:
+    return int(time.time() * 1e9)
 
 
 def events_per_second(name="task"):
+    """
+    Compatibility shim: one timed call through harness.run_benchmark, printed the old way.
+    For warmups, repeated trials and a confidence interval, call harness.run_benchmark on `func.__wrapped__`.
+    """
+
     def decorator(func):
+        @functools.wraps(func)
         def wrapper(*args, **kwargs):
-            start = time.time()
-            count = func(*args, **kwargs)
-            end = time.time()
-            duration = end - start
-            eps = count / duration if duration > 0 else 0
-            print(f"{name}: {count} events in {duration:.2f}s ({eps:.2f} events/sec)")
-            return count
+            result = harness.run_benchmark(func, args, kwargs, name=name, warmup=0, trials=1, clock=_wall_clock_ns)
+            print(result.legacy_line())
+            return result.counts[0]
 
         return wrapper
 
@@ -62,10 +68,17 @@ def cpu_task(num_primes: int = 500) -> int:
     for i in range(2, num_primes):
         if is_prime(i):
             count += 1
-        print(f"    {i} is prime bring the count to {count}.", end="\r")
     return count
 
 
+def cpu_quantum(start: int = 10_000, span: int = 200) -> int:
+    """
+    One small slice of CPU work for the load governor: count the primes in [start, start + span).
+    Always the same window, so every quantum is the same amount of work.
+    """
+    return sum(1 for i in range(start, start + span) if is_prime(i))
+
+
 # ███╗   ███╗███████╗███╗   ███╗
 # ████╗ ████║██╔════╝████╗ ████║
 # ██╔████╔██║█████╗  ██╔████╔██║
@@ -75,31 +88,47 @@ def cpu_task(num_primes: int = 500) -> int:
 @events_per_second("MEM")
 def mem_task(size_mb=100, iterations=50):
     """
-    Allocates and fills a large list repeatedly.
+    Fills and reduces a preallocated buffer repeatedly.
+    This used to build Python lists of random ints, which mostly measured the interpreter and the RNG.
+    See memory.run_memory_suite for the proper bandwidth/latency numbers.
     """
-    # A standard Python int object is about 28 bytes in 64-bit
-    chunk_size = int(size_mb * 1024 * 1024 / 28)
+    import numpy as np
+
+    rng = np.random.default_rng(0)
+    buf = np.empty(size_mb * 1024 * 1024 // 8, dtype=np.float64)
 
     print(f"Starting MEM task: {size_mb}MB chunks, {iterations} iterations.")
     for i in range(iterations):
-        # 1. Allocation and Fill: Allocate a list and fill it with random data.
-        # This stresses the memory allocation mechanism and the memory itself.
-        big_list = [random.randint(0, 1000) for _ in range(chunk_size)]
+        # 1. Fill: write the whole buffer
+        rng.random(out=buf)
 
-        # 2. Minimal work on the list
-        _ = sum(big_list) % 100  # Inefficiently calculate a hash/sum
-
-        # 3. Deallocation: Delete the reference to free the memory.
-        # This stresses the garbage collector and prepares for the next allocation.
-        del big_list
-        # Using gc.collect() can force the issue, but standard 'del' often suffices
-        # and keeps the benchmark simpler.
+        # 2. Minimal work on the buffer: read it all back
+        _ = buf.sum()
 
         print(f"  Iteration {i + 1}/{iterations} complete.", end="\r")
-        time.sleep(0.01)  # Add a slight pause to allow OS/GC to catch up
+        time.sleep(0.01)  # Add a slight pause, same pacing as before
     return iterations
 
 
+_quantum_buffers = {}
+
+
+def mem_quantum(size_kb: int = 256) -> int:
+    """
+    One slice of memory work for the load governor: copy a buffer into another one.
+    The buffers are allocated once per process, so a quantum doesn't pay for the allocator.
+    Events: KiB copied, so rates compare across calibrated sizes (see calibration.py).
+    """
+    if size_kb not in _quantum_buffers:
+        import numpy as np
+
+        src = np.arange(size_kb * 1024 // 8, dtype=np.float64)
+        _quantum_buffers[size_kb] = (src, np.empty_like(src))
+    src, dst = _quantum_buffers[size_kb]
+    dst[...] = src
+    return size_kb
+
+
 #  ██████╗ ██████╗ ██╗   ██╗
 # ██╔════╝ ██╔══██╗██║   ██║
 # ██║  ███╗██████╔╝██║   ██║
@@ -108,23 +137,23 @@ def mem_task(size_mb=100, iterations=50):
 #  ╚═════╝ ╚═╝      ╚═════╝
 @events_per_second("GPU")
 def gpu_task(matrix_size=512, iterations=10):
-    """Repeatedly performs large matrix multiplications with NumPy."""
+    """
+    Repeatedly performs large matrix multiplications with NumPy.
+    The operands are allocated once and the result goes into the same buffer every time, so this times the
+    multiply and not the allocator and RNG. See matmul.run_matmul for GFLOPS with the BLAS threads pinned.
+    """
+    from .matmul import Operands
+
     print(f"Starting GPU/Math task: {matrix_size}x{matrix_size} matrices, {iterations} iterations.")
+    operands = Operands(matrix_size)
+    flops = 0
     for i in range(iterations):
-        # Create large matrices, forces allocation and movement of data
-        A = np.random.rand(matrix_size, matrix_size)
-        B = np.random.rand(matrix_size, matrix_size)
-
         # Matrix multiplication (A @ B) is highly parallelizable and computationally intensive
-        C = A @ B
-
-        # Perform a simple operation on the result to ensure it's not optimized away
-        _ = np.sum(C)
+        flops += operands.multiply()
 
         print(f"  Iteration {i + 1}/{iterations} complete.", end="\r")
-        # Explicitly delete to encourage deallocation
-        del A, B, C
         time.sleep(0.01)
+    print(f"  {flops / 1e9:.2f} GFLOP in {iterations} multiplies.")
     return iterations
 
 
@@ -172,6 +201,27 @@ def io_task(file_count=50, file_size_kb=4):
     return file_count
 
 
+_quantum_file = None
+
+
+def io_quantum(block_kb: int = 4) -> int:
+    """
+    One slice of I/O work for the load governor: write a block to a scratch file and read it back.
+    The scratch file is opened once per process and unlinked right away so nothing is left behind.
+    Events: KiB written and read back.
+    """
+    global _quantum_file
+    if _quantum_file is None:
+        fd, path = tempfile.mkstemp(prefix="batben-quantum-")
+        os.unlink(path)
+        _quantum_file = fd
+    block = b"A" * (block_kb * 1024)
+    os.pwrite(_quantum_file, block, 0)
+    os.fsync(_quantum_file)
+    os.pread(_quantum_file, len(block), 0)
+    return block_kb
+
+
 # ███╗   ██╗███████╗████████╗
 # ████╗  ██║██╔════╝╚══██╔══╝
 # ██╔██╗ ██║█████╗     ██║
@@ -181,6 +231,8 @@ def io_task(file_count=50, file_size_kb=4):
 @events_per_second("NET")
 def net_task(target_url="https://www.google.com/robots.txt", iterations=50):
     """Repeatedly makes small, synchronous HTTP requests."""
+    import httpx
+
     successful_requests = 0
     for i in range(iterations):
         try:
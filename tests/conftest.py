@@ -0,0 +1,19 @@
+import pytest
+
+
+@pytest.fixture
+def fake_sysfs(tmp_path):
+    """
+    Builds a fake sysfs tree under tmp_path.
+    Call it with a path relative to the fake root and a dict of attribute -> value, get the directory back.
+    """
+
+    def make(relpath, attrs):
+        path = tmp_path / relpath
+        path.mkdir(parents=True, exist_ok=True)
+        for name, value in attrs.items():
+            (path / name).write_text(f"{value}\n")
+        return path
+
+    make.root = tmp_path
+    return make
@@ -0,0 +1,112 @@
+import math
+import time
+
+import numpy as np
+import pytest
+
+from batben import battery, sampler
+
+
+class ScriptedBattery:
+    """Returns a fixed sequence of (Wh, W, V) readings."""
+
+    def __init__(self, readings):
+        self.readings = list(readings)
+
+    def read(self):
+        return self.readings.pop(0)
+
+
+class FakeClock:
+    def __init__(self, step):
+        self.now = 0.0
+        self.step = step
+
+    def __call__(self):
+        value = self.now
+        self.now += self.step
+        return value
+
+
+def test_sysfs_battery_energy_power(fake_sysfs):
+    fake_sysfs(
+        "power_supply/BAT0",
+        {"energy_now": 40_000_000, "power_now": 7_500_000, "voltage_now": 12_000_000, "status": "Discharging"},
+    )
+    bat = battery.SysfsBattery.find(str(fake_sysfs.root / "power_supply"))
+    assert bat.name == "BAT0"
+    assert bat.read() == pytest.approx((40.0, 7.5, 12.0))
+    bat.close()
+
+
+def test_sysfs_battery_rereads_open_files(fake_sysfs):
+    path = fake_sysfs("power_supply/BAT1", {"energy_now": 40_000_000, "power_now": 5_000_000})
+    with battery.SysfsBattery(str(path)) as bat:
+        (path / "energy_now").write_text("39000000\n")
+        energy, power, voltage = bat.read()
+    assert energy == pytest.approx(39.0)
+    assert power == pytest.approx(5.0)
+    assert math.isnan(voltage)
+
+
+def test_sysfs_battery_charge_current(fake_sysfs):
+    # 3Ah at 11V is 33Wh, -0.5A at 11V is 5.5W
+    fake_sysfs("power_supply/BAT0", {"charge_now": 3_000_000, "current_now": -500_000, "voltage_now": 11_000_000})
+    bat = battery.SysfsBattery.find(str(fake_sysfs.root / "power_supply"))
+    assert bat.read() == pytest.approx((33.0, 5.5, 11.0))
+    bat.close()
+
+
+def test_sysfs_battery_missing(fake_sysfs):
+    fake_sysfs("power_supply/AC", {"online": 1})
+    assert battery.SysfsBattery.find(str(fake_sysfs.root / "power_supply")) is None
+
+
+def test_ring_buffer_wraps():
+    ring = sampler.RingBuffer(3, np.dtype([("x", "i8")]))
+    for i in range(5):
+        ring.append((i,))
+    assert len(ring) == 3
+    assert ring.total == 5
+    assert ring.snapshot()["x"].tolist() == [2, 3, 4]
+
+
+def test_ring_buffer_partial():
+    ring = sampler.RingBuffer(4, np.dtype([("x", "i8")]))
+    ring.append((7,))
+    assert ring.snapshot()["x"].tolist() == [7]
+
+
+def test_sampler_integrates_past_the_ring_buffer():
+    # 10W for 36 seconds is 0.1Wh, sampled once a second into a buffer that only holds 4 rows
+    readings = [(50.0 - i * 0.1 / 36, 10.0, 12.0) for i in range(37)]
+    s = sampler.BatterySampler(ScriptedBattery(readings), capacity=4, clock=FakeClock(1.0))
+    for _ in range(37):
+        s.sample()
+    assert s.integrated_wh == pytest.approx(0.1)
+    assert s.samples == 37
+    assert len(s.buffer) == 4
+
+
+def test_sampler_skips_missing_power():
+    readings = [(50.0, 10.0, 12.0), (50.0, float("nan"), 12.0), (50.0, 10.0, 12.0), (50.0, 10.0, 12.0)]
+    s = sampler.BatterySampler(ScriptedBattery(readings), clock=FakeClock(360.0))
+    for _ in range(4):
+        s.sample()
+    # only the last interval has power on both ends: 10W for 0.1h
+    assert s.integrated_wh == pytest.approx(1.0)
+
+
+def test_sampler_thread(fake_sysfs):
+    path = fake_sysfs("power_supply/BAT0", {"energy_now": 40_000_000, "power_now": 3_600_000})
+    with battery.SysfsBattery(str(path)) as bat:
+        s = sampler.BatterySampler(bat, rate=100)
+        s.start()
+        deadline = time.monotonic() + 5
+        while s.samples < 5 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        s.stop()
+    assert s.samples >= 5, "the sampler thread stopped sampling"
+    assert s.samples >= 6
+    assert s.integrated_wh > 0
+    assert s.energy_drop_wh() == 0.0
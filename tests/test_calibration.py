@@ -0,0 +1,98 @@
+import json
+import pickle
+
+import pytest
+
+from batben import calibration
+
+MACHINE = {"cpu": "Test CPU", "cores": 4, "kernel": "6.1.0", "batben": "0.1.0"}
+
+
+def _linear_timer(us_per_unit):
+    """Fake time_quantum: a quantum takes us_per_unit * its size."""
+
+    def timer(quantum):
+        return us_per_unit * next(iter(quantum.keywords.values()))
+
+    return timer
+
+
+def test_calibrate_size_scales_to_target():
+    sizable = calibration.SIZABLE["cpu"]
+    size, us = calibration.calibrate_size(sizable, 1000, timer=_linear_timer(2.0))
+    assert size == 500
+    assert us == pytest.approx(1000)
+
+
+def test_calibrate_size_clamps():
+    sizable = calibration.SIZABLE["io"]
+    size, us = calibration.calibrate_size(sizable, 1000, timer=lambda quantum: 5000.0)  # fsync bound
+    assert size == sizable.low
+    assert us == 5000.0
+
+
+def test_calibrated_quantum_runs_and_pickles():
+    cal = calibration.Calibration(MACHINE, 1000, sizes={"cpu": 50})
+    quantum = cal.quantum("cpu")
+    assert quantum() == calibration.workload.cpu_quantum(span=50)
+    assert pickle.loads(pickle.dumps(quantum)).keywords == {"span": 50}
+    assert cal.quantum("memory").keywords == {"size_kb": 256}
+
+
+def test_time_quantum_median():
+    ticks = iter([0, 1000, 1000, 5000, 5000, 8000])
+    us = calibration.time_quantum(lambda: 1, runs=3, clock=lambda: next(ticks))
+    assert us == pytest.approx(3.0)
+
+
+def test_cache_round_trip(tmp_path):
+    path = str(tmp_path / "cal.json")
+    cal = calibration.calibrate(1000, machine=MACHINE, timer=_linear_timer(1.0), clock=lambda: 100.0)
+    calibration.save_calibration(cal, path)
+    cached = calibration.load_calibration(1000, path, MACHINE, clock=lambda: 200.0)
+    assert cached.cached
+    assert cached.sizes == cal.sizes
+    assert "cached" in cached.report()
+    # another target or another machine doesn't match
+    assert calibration.load_calibration(500, path, MACHINE, clock=lambda: 200.0) is None
+    assert calibration.load_calibration(1000, path, {**MACHINE, "cores": 8}, clock=lambda: 200.0) is None
+    # and it expires
+    assert calibration.load_calibration(1000, path, MACHINE, clock=lambda: 100.0 + calibration.MAX_AGE + 1) is None
+
+
+def test_save_drops_stale_entries(tmp_path):
+    path = tmp_path / "cal.json"
+    timer = _linear_timer(1.0)
+    other = {**MACHINE, "cpu": "Other CPU"}
+    calibration.save_calibration(calibration.calibrate(1000, machine=other, timer=timer, clock=lambda: 0.0), str(path))
+    calibration.save_calibration(
+        calibration.calibrate(1000, machine=MACHINE, timer=timer, clock=lambda: 0.0), str(path)
+    )
+    upgraded = {**MACHINE, "kernel": "6.2.0"}
+    calibration.save_calibration(
+        calibration.calibrate(500, machine=upgraded, timer=timer, clock=lambda: 10.0), str(path)
+    )
+    machines = [e["machine"] for e in json.loads(path.read_text())["entries"]]
+    assert machines == [other, upgraded]
+
+
+def test_get_calibration_uses_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(calibration, "machine_key", lambda: MACHINE)
+    path = str(tmp_path / "cal.json")
+    calls = []
+
+    def timer(quantum):
+        calls.append(quantum)
+        return 1000.0
+
+    first = calibration.get_calibration(1000, path, timer=timer)
+    assert not first.cached and len(calls) == len(calibration.SIZABLE)
+    assert calibration.get_calibration(1000, path, timer=timer).cached
+    assert len(calls) == len(calibration.SIZABLE)
+    assert not calibration.get_calibration(1000, path, refresh=True, timer=timer).cached
+
+
+def test_unreadable_cache(tmp_path):
+    path = tmp_path / "cal.json"
+    path.write_text("not json")
+    assert calibration.load_calibration(1000, str(path), MACHINE) is None
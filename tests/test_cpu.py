@@ -0,0 +1,34 @@
+import pytest
+
+from batben import cpu
+
+
+def test_sieve_kernel():
+    assert cpu.sieve_kernel(100) == (100, 25)
+    assert cpu.sieve_kernel(2) == (2, 1)
+
+
+def test_hash_kernel_is_deterministic():
+    assert cpu.hash_kernel(1000) == cpu.hash_kernel(1000)
+    assert cpu.hash_kernel(1000) != cpu.hash_kernel(1001)
+    assert cpu.hash_kernel(1)[1] < 1 << 64
+
+
+def test_compress_kernel_round_trip():
+    ops, crc = cpu.compress_kernel(4096)
+    assert ops == 4096
+    assert crc == cpu.compress_kernel(4096)[1]
+
+
+def test_kernel_score_efficiency():
+    score = cpu.KernelScore("x", single=100.0, multi=300.0, workers=4, checksum=0)
+    assert score.efficiency == pytest.approx(0.75)
+
+
+def test_run_cpu_suite():
+    result = cpu.run_cpu_suite(kernels=["sieve"], workers=2, repeats=1)
+    assert [k.name for k in result.kernels] == ["sieve"]
+    assert result.kernels[0].checksum == 148933
+    assert result.single_score > 0
+    assert result.multi_score > 0
+    assert "scaling efficiency" in result.report()
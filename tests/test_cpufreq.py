@@ -0,0 +1,155 @@
+import math
+
+import pytest
+
+from batben import cpufreq
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def cpus(fake_sysfs):
+    """Two cores with intel_pstate and three idle states each, plus a non-core 'cpufreq' directory."""
+    for n in range(2):
+        fake_sysfs(
+            f"cpu/cpu{n}/cpufreq",
+            {
+                "scaling_cur_freq": 1_000_000,
+                "scaling_driver": "intel_pstate",
+                "scaling_governor": "powersave",
+                "energy_performance_preference": "balance_power" if n else "power",
+                "scaling_max_freq": 4_000_000,
+            },
+        )
+        for s, name in enumerate(["POLL", "C1", "C10"]):
+            fake_sysfs(f"cpu/cpu{n}/cpuidle/state{s}", {"name": name, "time": 0, "usage": 0})
+    fake_sysfs("cpu/cpufreq/policy0", {})
+    return fake_sysfs.root / "cpu"
+
+
+def _set(cpus, cpu, relpath, value):
+    (cpus / f"cpu{cpu}" / relpath).write_text(f"{value}\n")
+
+
+def test_settings(cpus):
+    assert cpufreq.cpufreq_settings(str(cpus)) == {
+        "driver": "intel_pstate",
+        "governor": "powersave",
+        "epp": "power/balance_power",
+        "max_khz": "4000000",
+    }
+
+
+def test_cpu_dirs_numeric_order(fake_sysfs):
+    for n in (10, 2, 1):
+        fake_sysfs(f"cpu/cpu{n}", {})
+    fake_sysfs("cpu/cpuidle", {})
+    assert [p.rsplit("/", 1)[1] for p in cpufreq.cpu_dirs(str(fake_sysfs.root / "cpu"))] == ["cpu1", "cpu2", "cpu10"]
+
+
+def test_collector(cpus):
+    clock = FakeClock()
+    with cpufreq.CpuStateCollector(str(cpus), clock=clock) as collector:
+        assert collector
+        collector.start(thread=False)
+        collector.sample()  # t=0: both at 1GHz
+        clock.now = 3.0
+        _set(cpus, 0, "cpufreq/scaling_cur_freq", 3_000_000)
+        _set(cpus, 1, "cpufreq/scaling_cur_freq", 2_000_000)
+        collector.sample()  # t=3
+        clock.now = 4.0
+        # over 4s per core: 1s in C1 (40 entries), 2s in C10 (4 entries)
+        for n in range(2):
+            _set(cpus, n, "cpuidle/state1/time", 1_000_000)
+            _set(cpus, n, "cpuidle/state1/usage", 40)
+            _set(cpus, n, "cpuidle/state2/time", 2_000_000)
+            _set(cpus, n, "cpuidle/state2/usage", 4)
+        result = collector.stop()
+
+    assert result.samples == 3
+    # 3s at 1GHz then 1s at 3GHz/2GHz
+    assert result.freq_mhz.tolist() == pytest.approx([1500.0, 1250.0])
+    assert (result.freq_min_mhz, result.freq_max_mhz) == (1000.0, 3000.0)
+    assert result.residency == pytest.approx({"POLL": 0.0, "C1": 0.25, "C10": 0.5})
+    assert result.entries_per_s == pytest.approx({"POLL": 0.0, "C1": 10.0, "C10": 1.0})
+    assert result.metrics()["residency_C10"] == pytest.approx(0.5)
+    report = result.report()
+    assert "avg 1375MHz" in report
+    assert "C10 50.0% (1/s)" in report
+    assert "~active 25.0%" in report
+
+
+def test_collector_keeps_the_whole_run(cpus):
+    # nothing to fill up: the second half of a long run counts as much as the first
+    clock = FakeClock()
+    with cpufreq.CpuStateCollector(str(cpus), clock=clock) as collector:
+        collector.start(thread=False)
+        for mhz in (1000, 3000):
+            _set(cpus, 0, "cpufreq/scaling_cur_freq", mhz * 1000)
+            for _ in range(20_000):
+                collector.sample()
+                clock.now += 0.1
+        result = collector.stop()
+        assert result.samples == 40_001
+        assert result.freq_mhz.tolist() == pytest.approx([2000.0, 1000.0])
+        # a new run starts from scratch
+        collector.start(thread=False)
+        clock.now += 10
+        result = collector.stop()
+    assert result.samples == 1
+    assert result.freq_mhz.tolist() == pytest.approx([3000.0, 1000.0])
+    assert (result.freq_min_mhz, result.freq_max_mhz) == (1000.0, 3000.0)
+
+
+def test_collector_survives_unreadable_files(cpus, monkeypatch):
+    clock = FakeClock()
+    _set(cpus, 1, "cpufreq/scaling_cur_freq", "<unknown>")
+    with cpufreq.CpuStateCollector(str(cpus), clock=clock) as collector:
+        collector.start(thread=False)
+        collector.sample()  # t=0: cpu0 at 1GHz, cpu1 unknown
+        clock.now = 2.0
+        _set(cpus, 0, "cpufreq/scaling_cur_freq", "<unknown>")
+        _set(cpus, 0, "cpuidle/state1/time", 1_000_000)
+        real_pread = cpufreq.os.pread
+
+        def offline(fd, n, offset):
+            if fd == collector._idle_fds[1][1][0]:
+                raise OSError(19, "No such device")
+            return real_pread(fd, n, offset)
+
+        monkeypatch.setattr(cpufreq.os, "pread", offline)
+        clock.now = 4.0
+        result = collector.stop()
+    # cpu0 kept its last reading, cpu1 never had one
+    assert result.freq_mhz[0] == pytest.approx(1000.0)
+    assert math.isnan(result.freq_mhz[1])
+    assert result.avg_freq_mhz == pytest.approx(1000.0)
+    assert result.residency["C1"] == pytest.approx(1 / (4 * 2))
+
+
+def test_collector_skips_mismatched_cores(cpus, fake_sysfs):
+    # an E-core with a different set of states
+    fake_sysfs("cpu/cpu2/cpuidle/state0", {"name": "POLL", "time": 0, "usage": 0})
+    with cpufreq.CpuStateCollector(str(cpus)) as collector:
+        assert len(collector._idle_fds) == 2
+
+
+def test_collector_nothing_to_read(tmp_path):
+    collector = cpufreq.CpuStateCollector(str(tmp_path))
+    assert not collector
+    collector.close()
+
+
+def test_collector_thread(cpus):
+    with cpufreq.CpuStateCollector(str(cpus), rate=200) as collector:
+        collector.start()
+        cpufreq.time.sleep(0.05)
+        result = collector.stop()
+    assert result.samples > 2
+    assert result.freq_mhz.tolist() == pytest.approx([1000.0, 1000.0])
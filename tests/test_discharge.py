@@ -0,0 +1,122 @@
+import math
+
+import numpy as np
+import pytest
+
+from batben import discharge, stats
+
+
+def test_theil_sen_shrugs_off_outliers():
+    x = list(range(20))
+    y = [2.0 * v + 1 for v in x]
+    y[3] = 100.0
+    y[15] = -50.0
+    slope, low, high = stats.theil_sen(x, y)
+    assert slope == pytest.approx(2.0)
+    assert low <= 2.0 <= high
+
+
+def test_theil_sen_interval_narrows_with_more_points():
+    rng = np.random.default_rng(1)
+    widths = []
+    for n in (10, 100):
+        x = np.arange(n, dtype=float)
+        y = 0.5 * x + rng.normal(0, 1, n)
+        _, low, high = stats.theil_sen(x.tolist(), y.tolist())
+        widths.append(high - low)
+    assert widths[1] < widths[0] / 5
+
+
+def test_theil_sen_needs_two_x():
+    with pytest.raises(ValueError):
+        stats.theil_sen([1.0, 1.0], [2.0, 3.0])
+
+
+def _staircase(rate_wh_per_hour, seconds, step_wh=0.01, hz=10, start=50.0):
+    """What a battery reading at `hz` looks like when it only moves in `step_wh` steps."""
+    t = np.arange(0, seconds, 1 / hz)
+    energy = start - np.floor(rate_wh_per_hour * t / 3600 / step_wh) * step_wh
+    return t, energy
+
+
+def test_step_points():
+    t = np.array([0.0, 1, 2, 3, 4, 5])
+    energy = np.array([5.0, 5.0, np.nan, 4.9, 4.9, 4.8])
+    st, se = discharge.step_points(t, energy)
+    assert st.tolist() == [0.0, 3.0, 5.0]
+    assert se.tolist() == [5.0, 4.9, 4.8]
+
+
+def test_estimate_discharge_from_a_staircase():
+    t, energy = _staircase(6.0, 600)  # 6Wh/hour, a 0.01Wh step every 6s
+    estimate = discharge.estimate_discharge(t, energy)
+    assert estimate.wh_per_hour == pytest.approx(6.0, rel=0.01)
+    assert estimate.ci_low <= 6.0 <= estimate.ci_high
+    assert estimate.relative_error < 0.02
+    assert estimate.points == 100
+    assert "Discharge rate: 6.0" in estimate.report()
+
+
+def test_estimate_discharge_needs_steps():
+    t, energy = _staircase(6.0, 10)
+    assert discharge.estimate_discharge(t, energy) is None
+    assert discharge.estimate_discharge(t, np.full_like(t, np.nan)) is None
+
+
+def test_estimate_discharge_thins_long_runs():
+    t, energy = _staircase(6.0, 3600, step_wh=0.001)
+    estimate = discharge.estimate_discharge(t, energy, max_points=200)
+    assert estimate.points == 200
+    assert estimate.wh_per_hour == pytest.approx(6.0, rel=0.01)
+
+
+def test_relative_error_of_a_flat_line():
+    assert math.isinf(discharge.DischargeEstimate(0.0, -1.0, 1.0, 3, 10.0).relative_error)
+
+
+class FakeSampler:
+    def __init__(self, t, energy):
+        self.t, self.energy = t, energy
+        self.upto = 0
+
+    @property
+    def buffer(self):
+        return self
+
+    def snapshot(self):
+        return {"t": self.t[: self.upto], "energy_wh": self.energy[: self.upto]}
+
+
+def test_adaptive_stop():
+    t, energy = _staircase(6.0, 3600)
+    sampler = FakeSampler(t, energy)
+    now = [0.0]
+    stop = discharge.AdaptiveStop(sampler, target=0.05, min_duration=60, every=5, clock=lambda: now[0])
+
+    def advance(seconds):
+        now[0] += seconds
+        sampler.upto = int(now[0] * 10)
+        return stop()
+
+    assert not advance(30)  # too early
+    assert stop.estimate is None
+    stopped_at = None
+    while now[0] < 3600:
+        if advance(1):
+            stopped_at = now[0]
+            break
+    assert stopped_at is not None and stopped_at < 600
+    assert stop.estimate.relative_error <= 0.05
+    assert stop.estimate.wh_per_hour == pytest.approx(6.0, rel=0.05)
+
+
+def test_theil_sen_matches_the_pairwise_definition():
+    rng = np.random.default_rng(2)
+    x = np.sort(rng.uniform(0, 100, 60))
+    x[10] = x[11]  # a tie in x is skipped
+    y = -0.3 * x + rng.normal(0, 2, 60)
+    slopes = [(y[b] - y[a]) / (x[b] - x[a]) for a in range(60) for b in range(a + 1, 60) if x[b] != x[a]]
+    slope, low, high = stats.theil_sen(x.tolist(), y)
+    assert slope == pytest.approx(float(np.median(slopes)))
+    assert type(slope) is float
+    assert min(slopes) < low < slope < high < max(slopes)
@@ -0,0 +1,226 @@
+import gzip
+import json
+import threading
+
+import httpx
+import pytest
+
+from batben import fleet, store
+
+
+def _spool(tmp_path, name="agent", runs=3, machine="x12"):
+    spool = fleet.Spool(str(tmp_path / name))
+    _bench(spool, runs, machine)
+    return spool
+
+
+def _bench(spool, runs, machine="x12"):
+    with store.ResultStore(spool.store_path) as s:
+        for i in range(runs):
+            s.add_run(
+                {"score": 100.0 + i, "duration": 10.0}, machine=machine, profile="tlp", workload="quick", kernel="6.17"
+            )
+
+
+@pytest.fixture
+def collector(tmp_path):
+    with fleet.Collector(str(tmp_path / "collected.sqlite"), token="s3cret") as c:
+        yield c
+
+
+def _agent(spool, collector, **kwargs):
+    uploader = fleet.Uploader(collector.url, token="s3cret", sleep=lambda s: None)
+    return fleet.Agent(spool, [], uploader, log=lambda line: None, **kwargs)
+
+
+def _collected(collector):
+    with store.ResultStore(collector.store_path) as s:
+        return s.run_count()
+
+
+def test_runs_after(tmp_path):
+    spool = _spool(tmp_path)
+    with store.ResultStore(spool.store_path) as s:
+        runs = s.runs_after(1)
+    assert [r["id"] for r in runs] == [2, 3]
+    assert runs[0]["metrics"]["score"] == 101.0
+    assert runs[0]["metrics"]["duration"] == 10.0
+    assert runs[0]["machine"] == "x12"
+
+
+def test_spool_keeps_agent_id_and_acks(tmp_path):
+    spool = _spool(tmp_path)
+    assert [r["uid"] for r in spool.pending()] == [f"{spool.agent}:{i}" for i in (1, 2, 3)]
+    spool.ack(2)
+    again = fleet.Spool(str(tmp_path / "agent"))
+    assert again.agent == spool.agent
+    assert [r["id"] for r in again.pending()] == [3]
+
+
+def test_upload_to_collector(tmp_path, collector):
+    spool = _spool(tmp_path, runs=5)
+    agent = _agent(spool, collector, batch_size=2)
+    assert agent.upload() == 5
+    assert spool.pending() == []
+    assert _collected(collector) == 5
+    with store.ResultStore(collector.store_path) as s:
+        assert s.profile_stats("score", "quick")["tlp"].mean == pytest.approx(102.0)
+    assert agent.upload() == 0
+
+
+def test_resent_batch_is_stored_once(tmp_path, collector):
+    spool = _spool(tmp_path)
+    agent = _agent(spool, collector)
+    batch_id, body = fleet.encode_batch(spool.agent, spool.pending())
+    with agent.uploader.client() as client:
+        first = agent.uploader.send(client, batch_id, body)
+        # the acknowledgement got lost, the agent tries again
+        second = agent.uploader.send(client, batch_id, body)
+    assert first == {"batch": batch_id, "accepted": 3, "duplicates": 0}
+    assert second == {"batch": batch_id, "accepted": 0, "duplicates": 3}
+    assert _collected(collector) == 3
+
+
+def test_runs_in_a_bigger_batch_are_deduplicated(tmp_path, collector):
+    spool = _spool(tmp_path, runs=2)
+    agent = _agent(spool, collector)
+    with agent.uploader.client() as client:
+        agent.uploader.send(client, *fleet.encode_batch(spool.agent, spool.pending()))
+        _bench(spool, 2)
+        reply = agent.uploader.send(client, *fleet.encode_batch(spool.agent, spool.pending()))
+    assert (reply["accepted"], reply["duplicates"]) == (2, 2)
+    assert _collected(collector) == 4
+
+
+def test_concurrent_agents(tmp_path, collector):
+    agents = [
+        _agent(_spool(tmp_path, f"agent{i}", runs=20, machine=f"m{i}"), collector, batch_size=3) for i in range(6)
+    ]
+    sent = []
+    threads = [threading.Thread(target=lambda a=a: sent.append(a.upload())) for a in agents]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sent == [20] * 6
+    assert _collected(collector) == 120
+
+
+def test_bad_token_is_not_retried(tmp_path, collector):
+    spool = _spool(tmp_path)
+    sleeps = []
+    uploader = fleet.Uploader(collector.url, token="wrong", sleep=sleeps.append)
+    agent = fleet.Agent(spool, [], uploader, log=lambda line: None)
+    with pytest.raises(fleet.UploadError, match="401"):
+        agent.upload()
+    assert sleeps == []
+    assert len(spool.pending()) == 3
+
+
+def test_collector_rejects_garbage(collector):
+    headers = {"Authorization": "Bearer s3cret", "Content-Encoding": "gzip"}
+    response = httpx.post(collector.url + fleet.BATCH_PATH, content=b"not gzip", headers=headers)
+    assert response.status_code == 400
+    response = httpx.post(collector.url + fleet.BATCH_PATH, content=gzip.compress(b"[1, 2]"), headers=headers)
+    assert response.status_code == 400
+    assert httpx.get(collector.url + "/v1/health").json() == {"ok": True}
+
+
+def test_retries_with_backoff():
+    replies = iter([503, 429, 200])
+    seen = []
+
+    def handler(request):
+        seen.append((request.headers["x-batch-id"], request.headers["authorization"]))
+        status = next(replies)
+        return httpx.Response(status, json={"accepted": 1} if status == 200 else {"error": "busy"})
+
+    sleeps = []
+    uploader = fleet.Uploader(
+        "http://collector:8642/", token="t", backoff=0.5, transport=httpx.MockTransport(handler), sleep=sleeps.append
+    )
+    with uploader.client() as client:
+        assert uploader.send(client, "b1", b"{}") == {"accepted": 1}
+    assert sleeps == [0.5, 1.0]
+    assert seen == [("b1", "Bearer t")] * 3
+
+
+def test_gives_up_after_attempts():
+    def handler(request):
+        raise httpx.ConnectError("connection refused")
+
+    sleeps = []
+    uploader = fleet.Uploader(
+        "http://collector", attempts=3, transport=httpx.MockTransport(handler), sleep=sleeps.append
+    )
+    with uploader.client() as client, pytest.raises(fleet.UploadError, match="3 attempts.*ConnectError"):
+        uploader.send(client, "b1", b"{}")
+    assert sleeps == [1.0, 2.0]
+
+
+def test_no_upload_while_measuring(tmp_path, collector):
+    spool = _spool(tmp_path)
+    agent = _agent(spool, collector)
+
+    def runner(args, store_path):
+        with pytest.raises(RuntimeError):
+            agent.upload()
+        return 0
+
+    agent.runner = runner
+    agent.measure(fleet.MatrixEntry(["-t", "1"]))
+    assert not agent.measuring
+    assert len(spool.pending()) == 3
+
+
+def test_round_measures_then_uploads(tmp_path, collector):
+    spool = fleet.Spool(str(tmp_path / "agent"))
+    calls = []
+
+    def runner(args, store_path):
+        calls.append((args, _collected(collector)))
+        _bench(spool, 1)
+        return 0
+
+    matrix = [fleet.MatrixEntry(["-w", "cpu"]), fleet.MatrixEntry(["-w", "io"])]
+    agent = fleet.Agent(spool, matrix, fleet.Uploader(collector.url, token="s3cret"), runner, log=lambda line: None)
+    clock = iter(range(100)).__next__
+    sleeps = []
+    agent.run(every=60, rounds=2, sleep=sleeps.append, clock=clock)
+    # the first round's results only go up once the whole round is done
+    assert calls == [(["-w", "cpu"], 0), (["-w", "io"], 0), (["-w", "cpu"], 2), (["-w", "io"], 2)]
+    assert _collected(collector) == 4
+    assert sleeps == [59]
+
+
+def test_failed_upload_stays_spooled(tmp_path):
+    spool = _spool(tmp_path)
+    transport = httpx.MockTransport(lambda request: httpx.Response(500))
+    uploader = fleet.Uploader("http://collector", attempts=2, transport=transport, sleep=lambda s: None)
+    logged = []
+    agent = fleet.Agent(spool, [], uploader, log=logged.append)
+    agent.run_round()
+    assert "upload failed" in logged[-1]
+    assert len(spool.pending()) == 3
+
+
+def test_load_matrix(tmp_path):
+    path = tmp_path / "matrix.json"
+    path.write_text(
+        json.dumps(
+            [["-w", "cpu", "-t", 600], {"args": ["-w", "io"], "setup": ["powerprofilesctl", "set", "power-saver"]}]
+        )
+    )
+    matrix = fleet.load_matrix(str(path))
+    assert matrix[0] == fleet.MatrixEntry(["-w", "cpu", "-t", "600"])
+    assert matrix[1].setup == ["powerprofilesctl", "set", "power-saver"]
+    path.write_text("{}")
+    with pytest.raises(ValueError):
+        fleet.load_matrix(str(path))
+
+
+def test_gunzip_limit():
+    body = gzip.compress(b"x" * 10_000)
+    assert fleet.gunzip(body) == b"x" * 10_000
+    with pytest.raises(ValueError, match="more than 1000"):
+        fleet.gunzip(body, limit=1000)
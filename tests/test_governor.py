@@ -0,0 +1,174 @@
+import pytest
+
+from batben import governor
+
+
+def _quantum():
+    return 3
+
+
+class FakeUtilization:
+    """Reports a constant system load, no matter what the workers do."""
+
+    def __init__(self, background=2.0):
+        self.background = background
+        self.calls = 0
+
+    def sample(self):
+        self.calls += 1
+        return self.background
+
+
+def test_read_proc_stat(tmp_path):
+    stat = tmp_path / "stat"
+    stat.write_text("cpu  100 0 50 800 50 0 0 0 0 0\ncpu0 100 0 50 800 50 0 0 0 0 0\n")
+    busy, total = governor.read_proc_stat(str(stat))
+    assert total == 1000
+    assert busy == 150
+
+
+def test_read_proc_stat_leaves_out_steal(tmp_path):
+    stat = tmp_path / "stat"
+    stat.write_text("cpu  100 0 50 800 50 0 0 500 30 0\n")
+    assert governor.read_proc_stat(str(stat)) == (150, 1000)
+
+
+def test_read_proc_stat_rejects_garbage(tmp_path):
+    stat = tmp_path / "stat"
+    stat.write_text("intr 1 2 3\n")
+    with pytest.raises(ValueError):
+        governor.read_proc_stat(str(stat))
+
+
+def test_cpu_utilization_deltas(tmp_path):
+    stat = tmp_path / "stat"
+    stat.write_text("cpu  100 0 0 900 0 0 0 0 0 0\n")
+    util = governor.CpuUtilization(str(stat))
+    stat.write_text("cpu  125 0 0 975 0 0 0 0 0 0\n")
+    assert util.sample() == pytest.approx(25.0)
+    # no time passed at all
+    assert util.sample() == 0.0
+
+
+PER_CPU_STAT = """cpu  {total_busy} 0 0 {total_idle} 0 0 0 0 0 0
+cpu0 {p_busy} 0 0 {p_idle} 0 0 0 0 0 0
+cpu1 {p_busy} 0 0 {p_idle} 0 0 0 0 0 0
+cpu2 {e_busy} 0 0 {e_idle} 0 0 0 0 0 0
+cpu3 {e_busy} 0 0 {e_idle} 0 0 0 0 0 0
+intr 1 2 3
+"""
+
+
+def _per_cpu_stat(path, p_busy, e_busy, elapsed):
+    """Two idle-ish CPUs (0, 1) and two we're pinned to (2, 3), `elapsed` jiffies each."""
+    path.write_text(
+        PER_CPU_STAT.format(
+            total_busy=2 * (p_busy + e_busy),
+            total_idle=2 * (2 * elapsed - p_busy - e_busy),
+            p_busy=p_busy,
+            p_idle=elapsed - p_busy,
+            e_busy=e_busy,
+            e_idle=elapsed - e_busy,
+        )
+    )
+
+
+def test_utilization_over_pinned_cpus(tmp_path):
+    stat = tmp_path / "stat"
+    _per_cpu_stat(stat, 0, 0, 1000)
+    system = governor.CpuUtilization(str(stat))
+    pinned = governor.CpuUtilization(str(stat), cpus={2, 3})
+    # the pinned CPUs run flat out, the others stay idle
+    _per_cpu_stat(stat, 0, 1000, 2000)
+    assert system.sample() == pytest.approx(50.0)
+    assert pinned.sample() == pytest.approx(100.0)
+    assert governor.read_proc_stat(str(stat), {2}) == (1000, 2000)
+    with pytest.raises(ValueError):
+        governor.read_proc_stat(str(stat), {7})
+
+
+def test_pinned_cpus(monkeypatch):
+    monkeypatch.setattr(governor.os, "cpu_count", lambda: 12)
+    monkeypatch.setattr(governor.os, "sched_getaffinity", lambda pid: {4, 5, 6, 7}, raising=False)
+    assert governor.pinned_cpus() == {4, 5, 6, 7}
+    monkeypatch.setattr(governor.os, "sched_getaffinity", lambda pid: set(range(12)), raising=False)
+    assert governor.pinned_cpus() is None
+
+
+def test_run_governed_measures_the_pinned_cpus(monkeypatch):
+    made = []
+
+    class Recording(FakeUtilization):
+        def __init__(self, path="/proc/stat", cpus=None):
+            super().__init__()
+            made.append(cpus)
+
+    monkeypatch.setattr(governor, "CpuUtilization", Recording)
+    monkeypatch.setattr(governor, "pinned_cpus", lambda: {0})
+    governor.run_governed(_quantum, target=50, duration=0.2, workers=1, interval=0.05)
+    assert made == [{0}]
+
+
+def test_controller_converges_on_target():
+    controller = governor.DutyCycleController(target=10)
+    assert controller.duty == pytest.approx(0.1)
+    # a plant with 5% of background load on top of the duty cycle
+    for _ in range(50):
+        controller.update(controller.duty * 100 + 5)
+    assert controller.duty == pytest.approx(0.05, abs=1e-3)
+
+
+def test_controller_clamps():
+    controller = governor.DutyCycleController(target=50)
+    for _ in range(20):
+        controller.update(100)
+    assert controller.duty == 0.0
+    for _ in range(20):
+        controller.update(0)
+    assert controller.duty == 1.0
+
+
+@pytest.mark.parametrize("target", [0, -5, 101])
+def test_controller_rejects_bad_target(target):
+    with pytest.raises(ValueError):
+        governor.DutyCycleController(target=target)
+
+
+def test_run_governed_reports_work():
+    util = FakeUtilization()
+    result = governor.run_governed(
+        _quantum, target=20, duration=0.5, workers=1, period=0.05, interval=0.1, utilization=util
+    )
+
+    assert util.calls == len(result.load_samples) >= 4
+    assert result.achieved == pytest.approx(2.0)
+    assert result.quanta > 0
+    assert result.events == 3 * result.quanta
+    assert result.events_per_quantum == pytest.approx(3.0)
+    # the fake plant never reaches the target, so the controller keeps pushing the duty cycle up
+    assert result.duty_samples[-1] > result.duty_samples[0]
+    assert len(result.timeline) == len(result.load_samples)
+    assert [e for _, e in result.timeline] == sorted(e for _, e in result.timeline)
+    assert result.timeline[-1][1] <= result.events
+    assert "requested load: 20.0%" in result.report()
+
+
+def test_run_governed_stops_early():
+    checks = []
+
+    def should_stop():
+        checks.append(1)
+        return len(checks) == 2
+
+    result = governor.run_governed(
+        _quantum,
+        target=20,
+        duration=30,
+        workers=1,
+        period=0.05,
+        interval=0.05,
+        utilization=FakeUtilization(),
+        should_stop=should_stop,
+    )
+    assert len(checks) == 2
+    assert result.duration < 5
@@ -0,0 +1,72 @@
+import pytest
+
+from batben import harness, stats
+
+
+class FakeClock:
+    """Nanosecond clock that advances by a scripted step on every call."""
+
+    def __init__(self, steps):
+        self.steps = list(steps)
+        self.now = 0
+
+    def __call__(self):
+        value = self.now
+        self.now += self.steps.pop(0) if self.steps else 0
+        return value
+
+
+def test_run_benchmark_warmup_and_trials():
+    calls = []
+
+    def work(n):
+        calls.append(n)
+        return n
+
+    # start/end pairs: 1s, 2s, 1s per trial
+    clock = FakeClock([1_000_000_000, 0, 2_000_000_000, 0, 1_000_000_000, 0])
+    result = harness.run_benchmark(work, args=(100,), warmup=2, trials=3, clock=clock)
+
+    assert len(calls) == 5
+    assert result.name == "work"
+    assert result.counts == [100, 100, 100]
+    assert result.rates == [100.0, 50.0, 100.0]
+    assert result.summary.median == 100.0
+    assert result.summary.n == 3
+    assert result.summary.ci_low < result.summary.mean < result.summary.ci_high
+    assert "median 100.00 events/sec" in result.report()
+
+
+def test_run_benchmark_needs_a_trial():
+    with pytest.raises(ValueError):
+        harness.run_benchmark(lambda: 1, trials=0)
+
+
+def test_single_trial_has_no_spread():
+    result = harness.run_benchmark(lambda: 5, warmup=0, trials=1, clock=FakeClock([500_000_000]))
+    assert result.summary.stdev == 0.0
+    assert "no spread" in result.report()
+    assert result.legacy_line() == "<lambda>: 5 events in 0.50s (10.00 events/sec)"
+
+
+@pytest.mark.parametrize(
+    "df, expected",
+    [(1, 12.706), (4, 2.776), (9, 2.262), (29, 2.045), (float("inf"), 1.960)],
+)
+def test_t_critical(df, expected):
+    assert stats.t_critical(df) == pytest.approx(expected, abs=1e-3)
+
+
+def test_summarize():
+    s = stats.summarize([10.0, 12.0, 11.0, 13.0, 9.0])
+    assert s.mean == 11.0
+    assert s.median == 11.0
+    assert s.stdev == pytest.approx(1.5811, abs=1e-4)
+    # t(4) = 2.776, stdev/sqrt(5) = 0.7071
+    assert s.ci_half_width == pytest.approx(1.963, abs=1e-3)
+    assert s.relative_error == pytest.approx(1.963 / 11, abs=1e-3)
+
+
+def test_summarize_empty():
+    with pytest.raises(ValueError):
+        stats.summarize([])
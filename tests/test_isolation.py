@@ -0,0 +1,185 @@
+import math
+import os
+
+import pytest
+
+from batben import isolation
+
+
+def test_cpu_lists():
+    assert isolation.parse_cpu_list("0-3,8,10-11\n") == {0, 1, 2, 3, 8, 10, 11}
+    assert isolation.format_cpu_list({11, 0, 1, 2, 3, 8, 10}) == "0-3,8,10-11"
+    assert isolation.parse_cpu_list("") == set()
+
+
+def test_core_types_intel_hybrid(fake_sysfs):
+    fake_sysfs("devices/cpu_core", {"cpus": "0-3"})
+    fake_sysfs("devices/cpu_atom", {"cpus": "4-11"})
+    types = isolation.core_types(str(fake_sysfs.root / "cpu"), str(fake_sysfs.root / "devices"))
+    assert types == {"performance": {0, 1, 2, 3}, "efficiency": set(range(4, 12))}
+
+
+def test_core_types_from_capacity(fake_sysfs):
+    for cpu, capacity in enumerate([446, 446, 1024, 1024, 871]):
+        fake_sysfs(f"cpu/cpu{cpu}", {"cpu_capacity": capacity})
+    fake_sysfs("cpu/cpufreq", {})
+    types = isolation.core_types(str(fake_sysfs.root / "cpu"), str(fake_sysfs.root / "devices"))
+    assert types == {"performance": {2, 3}, "efficiency": {0, 1, 4}}
+
+
+def test_not_hybrid(fake_sysfs, monkeypatch):
+    for cpu in range(4):
+        fake_sysfs(f"cpu/cpu{cpu}", {"cpu_capacity": 1024})
+    roots = str(fake_sysfs.root / "cpu"), str(fake_sysfs.root / "devices")
+    assert isolation.core_types(*roots) == {}
+    with pytest.raises(ValueError, match="hybrid"):
+        isolation.resolve_cpus("performance", *roots)
+
+
+def test_resolve_cpus(fake_sysfs, monkeypatch):
+    monkeypatch.setattr(isolation.os, "sched_getaffinity", lambda pid: set(range(8)), raising=False)
+    fake_sysfs("devices/cpu_core", {"cpus": "0-3"})
+    fake_sysfs("devices/cpu_atom", {"cpus": "4-11"})
+    roots = str(fake_sysfs.root / "cpu"), str(fake_sysfs.root / "devices")
+    assert isolation.resolve_cpus("all", *roots) is None
+    assert isolation.resolve_cpus("efficiency", *roots) == {4, 5, 6, 7}  # only what we may run on
+    assert isolation.resolve_cpus("6-9", *roots) == {6, 7}
+    with pytest.raises(ValueError, match="available"):
+        isolation.resolve_cpus("12-15", *roots)
+    with pytest.raises(ValueError, match="CPU list"):
+        isolation.resolve_cpus("fast", *roots)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class Readings:
+    """Plays back a list, then keeps returning its last value."""
+
+    def __init__(self, values):
+        self.values = list(values)
+
+    def next(self):
+        return self.values.pop(0) if len(self.values) > 1 else self.values[0]
+
+
+class FakeUtilization(Readings):
+    def sample(self):
+        return self.next()
+
+
+class FakeBattery(Readings):
+    def read(self):
+        return 50.0, self.next(), 12.0
+
+
+def test_waits_for_idle_and_flat_power():
+    clock = FakeClock()
+    utilization = FakeUtilization([60, 40, 20] + [2] * 30)
+    # draw still falling after the burst, then flat with a little noise
+    battery = FakeBattery([9.0, 8.0, 7.0, 6.5, 6.0, 5.6, 5.3] + [5.0, 5.1, 4.9, 5.0] * 10)
+    quiet = isolation.wait_for_quiet(utilization, battery, clock=clock, sleep=clock.sleep)
+    assert quiet.settled
+    assert 10 < quiet.waited_s < 25
+    assert quiet.load == pytest.approx(2.0)
+    assert quiet.power_w == pytest.approx(5.0, abs=0.1)
+    assert quiet.power_spread < 0.05
+    assert quiet.metrics()["quiet_settled"] == 1.0
+
+
+def test_drifting_power_times_out():
+    clock = FakeClock()
+    draw = [10.0 - 0.1 * i for i in range(100)]  # 1%/s and more, never flat over a 10s window
+    quiet = isolation.wait_for_quiet(
+        FakeUtilization([1.0]), FakeBattery(draw), timeout=60, clock=clock, sleep=clock.sleep
+    )
+    assert not quiet.settled
+    assert quiet.waited_s == 60
+    assert "gave up" in quiet.report()
+
+
+def test_without_battery_only_load_counts():
+    clock = FakeClock()
+    quiet = isolation.wait_for_quiet(FakeUtilization([30, 3]), None, window=5, clock=clock, sleep=clock.sleep)
+    assert quiet.settled
+    assert quiet.waited_s == 6
+    assert math.isnan(quiet.power_w)
+    assert "quiet_power_w" not in quiet.metrics()
+
+
+@pytest.fixture
+def scheduler(monkeypatch):
+    """Stands in for the priority and scheduling syscalls, which mostly need privileges to go one way."""
+    state = {"nice": 0, "policy": 0, "param": os.sched_param(0)}
+    monkeypatch.setattr(isolation.os, "getpriority", lambda which, who: state["nice"])
+    monkeypatch.setattr(isolation.os, "setpriority", lambda which, who, value: state.update(nice=value))
+    monkeypatch.setattr(isolation.os, "sched_getscheduler", lambda pid: state["policy"])
+    monkeypatch.setattr(isolation.os, "sched_getparam", lambda pid: state["param"])
+
+    def setscheduler(pid, policy, param):
+        state.update(policy=policy, param=param)
+
+    monkeypatch.setattr(isolation.os, "sched_setscheduler", setscheduler)
+    return state
+
+
+def test_isolation_applies_and_restores(tmp_path, scheduler):
+    drop = tmp_path / "drop_caches"
+    cpu = min(os.sched_getaffinity(0))
+    before = os.sched_getaffinity(0)
+    with isolation.Isolation(cpus={cpu}, nice=-5, policy="batch", drop_caches_path=str(drop)) as result:
+        assert os.sched_getaffinity(0) == {cpu}
+        assert scheduler["nice"] == -5
+        assert scheduler["policy"] == os.SCHED_BATCH
+    assert os.sched_getaffinity(0) == before
+    assert scheduler["nice"] == 0 and scheduler["policy"] == 0
+    assert drop.read_text() == "3\n"
+    assert result.applied == {
+        "cpus": str(cpu),
+        "nice": "-5",
+        "policy": "batch",
+        "ionice": "best-effort 0",
+        "caches": "dropped",
+    }
+    metrics = result.metrics()
+    assert metrics["pinned_cpus"] == 1
+    assert metrics["nice"] == -5
+    assert metrics["sched_policy"] == os.SCHED_BATCH
+    assert metrics["caches_dropped"] == 1.0
+
+
+def test_refused_settings_are_recorded(tmp_path, scheduler, monkeypatch):
+    def refuse(*args):
+        raise PermissionError(1, "Operation not permitted")
+
+    monkeypatch.setattr(isolation.os, "setpriority", refuse)
+    monkeypatch.setattr(isolation.os, "sched_setscheduler", refuse)
+    with isolation.Isolation(
+        nice=-10, policy="fifo", ionice=False, drop_caches_path=str(tmp_path / "no/such")
+    ) as result:
+        pass
+    assert result.applied == {}
+    assert result.skipped["nice"] == "Operation not permitted"
+    assert set(result.skipped) == {"nice", "policy", "caches"}
+    assert result.metrics() == {"isolated": 1.0, "caches_dropped": 0.0}
+    assert "not applied: policy" in result.report()
+
+
+def test_realtime_policy_takes_lowest_priority(scheduler):
+    with isolation.Isolation(nice=None, policy="fifo", ionice=False, drop_caches=False) as result:
+        assert scheduler["policy"] == os.SCHED_FIFO
+        assert scheduler["param"].sched_priority == os.sched_get_priority_min(os.SCHED_FIFO)
+    assert result.applied == {"policy": f"fifo priority {os.sched_get_priority_min(os.SCHED_FIFO)}"}
+
+
+def test_unknown_policy():
+    with pytest.raises(ValueError, match="policy"):
+        isolation.Isolation(policy="deadline")
@@ -0,0 +1,157 @@
+import importlib.metadata
+import pickle
+
+import pytest
+
+from batben import kernels
+
+
+def test_corpus_is_shipped_data():
+    names = [name for name, _ in kernels.corpus()]
+    assert "kernels.py" not in names  # a frozen snapshot, not whatever batben's sources are today
+    assert names and all(name.endswith(".py") for name in names)
+    assert names == sorted(names)
+    for _, text in kernels.corpus():
+        compile(text, "corpus", "exec")
+    assert len(kernels.corpus_fingerprint()) == 12
+
+
+@pytest.mark.parametrize("name", sorted(kernels.BUILTIN_KERNELS))
+def test_builtin_kernels(name):
+    kernel = kernels.BUILTIN_KERNELS[name]
+    assert kernel.name == name
+    assert kernel.unit
+    assert kernel.func() > 0
+    # the governor ships kernels to its worker processes
+    assert pickle.loads(pickle.dumps(kernel.func)) is kernel.func
+
+
+def test_kernels_walk_the_corpus():
+    kernels._cursors.clear()
+    sizes = [kernels.zlib_kernel() for _ in kernels.corpus()]
+    assert sizes == [len(text.encode()) for _, text in kernels.corpus()]
+    assert kernels.zlib_kernel() == sizes[0]  # and start over
+
+
+def _extra_kernel():
+    return 7
+
+
+EXTRA = kernels.Kernel("extra", _extra_kernel, "widgets")
+
+
+class FakeEntryPoint:
+    def __init__(self, name, obj=None, error=None):
+        self.name, self.obj, self.error = name, obj, error
+
+    def load(self):
+        if self.error:
+            raise self.error
+        return self.obj
+
+
+def test_available_kernels_from_entry_points(monkeypatch):
+    points = [
+        FakeEntryPoint("extra", EXTRA),
+        FakeEntryPoint("broken", error=ImportError("nope")),
+        FakeEntryPoint("not_a_kernel", obj=len),
+    ]
+    monkeypatch.setattr(
+        importlib.metadata, "entry_points", lambda group: points if group == kernels.ENTRY_POINT_GROUP else []
+    )
+    available = kernels.available_kernels()
+    assert available["extra"] is EXTRA
+    assert "broken" not in available and "not_a_kernel" not in available
+    assert set(kernels.BUILTIN_KERNELS) <= set(available)
+
+
+class FakeUtilization:
+    def sample(self):
+        return 5.0
+
+
+def test_run_kernels():
+    result = kernels.run_kernels(
+        [EXTRA, kernels.HASH],
+        target=20,
+        duration=0.4,
+        workers=1,
+        period=0.05,
+        interval=0.05,
+        utilization=FakeUtilization(),
+    )
+    assert list(result.runs) == ["extra", "hash"]
+    assert result.events == sum(r.events for _, r in result.runs.values())
+    assert result.runs["extra"][1].events == 7 * result.runs["extra"][1].quanta
+    rates = [r.events_per_second for _, r in result.runs.values()]
+    assert result.events_per_second == pytest.approx((rates[0] * rates[1]) ** 0.5)
+    assert set(result.metrics()) == {"kernel_extra_per_s", "kernel_hash_per_s"}
+    assert "widgets/s" in result.report()
+
+
+def test_run_kernels_stops_the_rest():
+    result = kernels.run_kernels(
+        [EXTRA, kernels.HASH],
+        target=20,
+        duration=60,
+        workers=1,
+        period=0.05,
+        interval=0.05,
+        utilization=FakeUtilization(),
+        should_stop=lambda: True,
+    )
+    assert list(result.runs) == ["extra"]
+
+
+def test_run_kernels_needs_kernels():
+    with pytest.raises(ValueError):
+        kernels.run_kernels([], target=10, duration=1)
+
+
+def test_benchmark_kernels():
+    calls = []
+
+    def counted():
+        calls.append(1)
+        return 3
+
+    results = kernels.benchmark_kernels(
+        [kernels.Kernel("counted", counted, "widgets")],
+        quanta=4,
+        warmup=1,
+        trials=3,
+        clock=iter(range(0, 60, 10)).__next__,
+    )
+    (result,) = results
+    assert len(calls) == 4 * (1 + 3)
+    assert result.name == "counted (widgets)"
+    assert result.counts == [12, 12, 12]
+    assert result.rates == [1.2e9] * 3  # 12 events in 10ns
+    with pytest.raises(ValueError):
+        kernels.benchmark_kernels([])
+
+
+class FakePool:
+    def __init__(self, threads):
+        self._threads = threads
+        self.history = []
+
+    @property
+    def threads(self):
+        return self._threads
+
+    @threads.setter
+    def threads(self, n):
+        self.history.append(n)
+        self._threads = n
+
+
+def test_matmul_kernel_uses_one_blas_thread(monkeypatch):
+    from batben import matmul
+
+    pool = FakePool(8)
+    monkeypatch.setattr(matmul, "thread_pools", lambda: [pool])
+    monkeypatch.setattr(kernels, "_matmul", None)
+    assert kernels.matmul_kernel() == 2 * 128**3
+    assert kernels.matmul_kernel() == 2 * 128**3
+    assert pool.history == [1]  # set once on first use, not per quantum
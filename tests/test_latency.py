@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from batben import latency
+
+
+@pytest.mark.parametrize(
+    "deadline, now, expected",
+    [
+        (100, 101, 110),  # on time
+        (100, 109, 110),  # late, but the next deadline is still ahead
+        (100, 135, 140),  # overran three periods: skip them
+        (100, 130, 140),
+    ],
+)
+def test_next_deadline(deadline, now, expected):
+    assert latency._next_deadline(deadline, now, 10) == expected
+
+
+def test_probe_records_every_mechanism():
+    probe = latency.LatencyProbe(interval=0.002, timers=2)
+    probe.start()
+    latency.time.sleep(0.1)
+    result = probe.stop()
+    assert set(result.lateness_ns) == set(latency.MECHANISMS)
+    for values in result.lateness_ns.values():
+        assert len(values) > 10
+        assert values.min() >= 0
+    assert result.percentile_us(50) <= result.percentile_us(99) <= result.percentile_us(100)
+    assert "p99.9" in result.report()
+
+
+def test_probe_rejects_unknown_mechanism():
+    with pytest.raises(ValueError, match="poll"):
+        latency.LatencyProbe(mechanisms=("sleep", "poll"))
+
+
+def test_result_metrics():
+    result = latency.LatencyResult(
+        1000.0, 1.0, {"sleep": np.array([1000, 2000, 3000, 4000]), "select": np.array([], dtype=np.int64)}
+    )
+    metrics = result.metrics()
+    assert metrics["latency_p50_us"] == pytest.approx(2.5)
+    assert metrics["latency_max_us"] == pytest.approx(4.0)
+    assert np.isnan(metrics["select_p99_us"])
+    assert "select   no wakeups" in result.report()
+
+
+def test_burst_latency():
+    waits = []
+    calls = []
+    result = latency.burst_latency(idle=0.25, repeats=3, quanta=5, kernel=lambda: calls.append(1), wait=waits.append)
+    assert waits == [0.25] * 3
+    assert len(calls) == 3 * 2 * 5
+    assert len(result.cold_ns) == len(result.warm_ns) == 3
+    assert result.ramp_penalty > 0
+    assert set(result.metrics()) == {"burst_cold_us", "burst_warm_us", "ramp_penalty"}
@@ -0,0 +1,96 @@
+import pytest
+
+from batben import matmul
+
+
+class FakePool:
+    def __init__(self, threads):
+        self.calls = [threads]
+
+    @property
+    def threads(self):
+        return self.calls[-1]
+
+    @threads.setter
+    def threads(self, n):
+        self.calls.append(n)
+
+
+def test_limit_threads_restores():
+    pools = [FakePool(8), FakePool(4)]
+    with matmul.limit_threads(2, pools):
+        assert [p.threads for p in pools] == [2, 2]
+    assert [p.calls for p in pools] == [[8, 2, 8], [4, 2, 4]]
+
+
+def test_limit_threads_restores_on_error():
+    pool = FakePool(8)
+    with pytest.raises(KeyError), matmul.limit_threads(1, [pool]):
+        raise KeyError
+    assert pool.threads == 8
+
+
+def test_loaded_libraries(tmp_path):
+    maps = tmp_path / "maps"
+    maps.write_text(
+        "7f00-7f01 r-xp 00000000 08:01 1 /usr/lib/libopenblas.so.0\n"
+        "7f01-7f02 r--p 00001000 08:01 1 /usr/lib/libopenblas.so.0\n"
+        "7f02-7f03 rw-p 00000000 00:00 0 [heap]\n"
+        "7f03-7f04 r-xp 00000000 08:01 2 /usr/bin/python3.13\n"
+    )
+    assert matmul._loaded_libraries(str(maps)) == ["/usr/lib/libopenblas.so.0"]
+    assert matmul._loaded_libraries(str(tmp_path / "missing")) == []
+    # nothing there to load: no pools, no error
+    assert matmul.thread_pools(str(maps)) == []
+
+
+def test_operands_reuse_buffers():
+    operands = matmul.Operands(16)
+    c = operands.c
+    assert operands.multiply() == 2 * 16**3
+    assert operands.c is c
+    assert operands.c == pytest.approx(operands.a @ operands.b)
+
+
+def test_time_multiply_median():
+    ticks = iter([0.0, 0.0, 0.1, 0.1, 0.4, 0.4, 0.6, 0.6])
+
+    class Counting:
+        calls = 0
+
+        def multiply(self):
+            self.calls += 1
+
+    operands = Counting()
+    seconds = matmul.time_multiply(operands, min_time=0, min_repeats=3, clock=lambda: next(ticks))
+    assert seconds == pytest.approx(0.2)
+    assert operands.calls == 4  # warmup plus three timed
+
+
+def test_result_scaling_and_report():
+    result = matmul.MatmulResult(["openblas (libopenblas.so)"])
+    result.points += [matmul.MatmulPoint(100, 1, 2e-3), matmul.MatmulPoint(100, 2, 1.25e-3)]
+    assert result.point(100, 1).gflops == pytest.approx(1.0)
+    assert result.scaling(100) == pytest.approx({1: 1.0, 2: 0.8})
+    assert result.peak_gflops == pytest.approx(1.6)
+    assert set(result.metrics()) == {"peak_gflops", "gflops_100_t1", "gflops_100_t2"}
+    report = result.report()
+    assert "openblas" in report and "2 thr 80%" in report
+
+
+def test_default_threads(monkeypatch):
+    monkeypatch.setattr(matmul.os, "sched_getaffinity", lambda pid: set(range(6)))
+    assert matmul.default_threads() == [1, 2, 4, 6]
+
+
+def test_run_matmul():
+    result = matmul.run_matmul(sizes=(32, 64), threads=[1], min_time=0.01)
+    assert [(p.size, p.threads) for p in result.points] == [(32, 1), (64, 1)]
+    assert all(p.gflops > 0 for p in result.points)
+
+
+def test_run_matmul_without_pools(monkeypatch):
+    monkeypatch.setattr(matmul, "thread_pools", lambda: [])
+    result = matmul.run_matmul(sizes=(32,), threads=[1, 2], min_time=0.01)
+    assert [(p.size, p.threads) for p in result.points] == [(32, 0)]
+    assert "threading left to the BLAS" in result.report()
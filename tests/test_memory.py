@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from batben import memory
+
+
+def test_cache_sizes(fake_sysfs):
+    for index, (level, kind, size) in enumerate(
+        [(1, "Data", "48K"), (1, "Instruction", "32K"), (2, "Unified", "1280K"), (3, "Unified", "12M")]
+    ):
+        fake_sysfs(f"cache/index{index}", {"level": level, "type": kind, "size": size})
+    sizes = memory.cache_sizes(str(fake_sysfs.root / "cache"))
+    assert sizes == {"L1": 48 << 10, "L2": 1280 << 10, "L3": 12 << 20}
+
+
+def test_working_sets():
+    sets = memory.working_sets({"L1": 32 << 10, "L2": 1 << 20, "L3": 8 << 20})
+    assert sets == [("L1", 16 << 10), ("L2", 512 << 10), ("L3", 4 << 20), ("DRAM", 32 << 20)]
+    # nothing in sysfs, use the fallback sizes
+    assert memory.working_sets({})[-1][0] == "DRAM"
+
+
+def test_chase_buffer_is_one_cycle():
+    buf = memory.chase_buffer(64 * 100)
+    slots = memory.CACHE_LINE // 8
+    seen = set()
+    i = 0
+    for _ in range(100):
+        assert i % slots == 0
+        seen.add(i)
+        i = int(buf[i])
+    assert i == 0
+    assert len(seen) == 100
+    assert np.array_equal(buf, memory.chase_buffer(64 * 100))
+
+
+def test_pointer_chase_positive():
+    assert memory.pointer_chase(memory.chase_buffer(4096), steps=1000) > 0
+
+
+def test_stream_reports_every_kernel():
+    bandwidth = memory.stream(48 << 10, repeats=1, min_bytes=1 << 20)
+    assert set(bandwidth) == set(memory.STREAM_BYTES)
+    assert all(v > 0 for v in bandwidth.values())
+
+
+def test_run_memory_suite():
+    result = memory.run_memory_suite([("L1", 16 << 10), ("L2", 256 << 10)], repeats=1, steps=1000)
+    assert [lvl.label for lvl in result.levels] == ["L1", "L2"]
+    assert result.baseline_ns == pytest.approx(min(lvl.latency_ns for lvl in result.levels))
+    assert "triad GB/s" in result.report()
@@ -0,0 +1,57 @@
+import httpx
+import pytest
+
+from batben import network, stats
+
+
+@pytest.mark.parametrize("pooled", [True, False])
+def test_run_network(pooled):
+    result = network.run_network(requests=40, concurrency=4, payload=2048, pooled=pooled)
+    assert result.failures == 0
+    assert len(result.latencies_ns) == 40
+    assert result.requests_per_s > 0
+    assert result.percentile_us(50) <= result.percentile_us(99)
+    assert ("pooled keep-alive" if pooled else "cold connects") in result.report()
+
+
+def test_local_server_payload_and_404():
+    with network.LocalServer() as server:
+        with httpx.Client() as client:
+            response = client.get(f"{server.url}/bytes/300")
+            assert response.status_code == 200
+            assert response.content == network._payload(300)
+            assert response.headers["connection"] == "keep-alive"
+            assert client.get(f"{server.url}/nope").status_code == 404
+
+
+def test_local_server_startup_error(monkeypatch):
+    async def refuse(*args, **kwargs):
+        raise OSError(98, "Address already in use")
+
+    monkeypatch.setattr(network.asyncio, "start_server", refuse)
+    server = network.LocalServer()
+    with pytest.raises(OSError, match="Address already in use"):
+        with server:
+            pass
+    assert not server._thread.is_alive()
+
+
+def test_failures_are_counted():
+    # nothing listens on port 1
+    result = network.run_network(requests=5, concurrency=1, url="http://127.0.0.1:1")
+    assert result.failures == 5
+    assert result.requests_per_s == 0
+
+
+def test_log2_histogram():
+    assert stats.log2_histogram([]) == []
+    assert stats.log2_histogram([0.5, 1, 3, 4, 20]) == [(1.0, 2), (2.0, 0), (4.0, 2), (8.0, 0), (16.0, 0), (32.0, 1)]
+
+
+def test_format_histogram():
+    text = stats.format_histogram([(1.0, 2), (2.0, 0), (4.0, 1)], unit="us", width=4)
+    assert text.splitlines() == [
+        "  <=          1us        2 ####",
+        "  <=          2us        0",
+        "  <=          4us        1 ##",
+    ]
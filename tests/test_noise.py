@@ -0,0 +1,98 @@
+import shutil
+
+import pytest
+
+from batben import noise
+
+
+def _proc(fake_sysfs, pid, comm, ticks, ppid=1, starttime=100, io=None):
+    # proc(5) fields 3 to 22: state ppid pgrp session tty tpgid flags minflt cminflt majflt cmajflt utime stime
+    # cutime cstime priority nice num_threads itrealvalue starttime
+    rest = f"S {ppid} 1 1 0 -1 0 0 0 0 0 {ticks} 0 0 0 20 0 1 0 {starttime} 0"
+    attrs = {"stat": f"{pid} ({comm}) {rest}"}
+    if io is not None:
+        attrs["io"] = f"rchar: 0\nread_bytes: {io[0]}\nwrite_bytes: {io[1]}\n"
+    fake_sysfs(f"proc/{pid}", attrs)
+
+
+def test_parse_stat():
+    counters = noise.parse_stat("42 (Web Content (x)) S 7 1 1 0 -1 0 33 0 0 0 150 100 0 0 20 0 1 0 555 0")
+    assert counters.comm == "Web Content (x)"
+    assert (counters.ppid, counters.starttime, counters.minor_faults) == (7, 555, 33)
+    assert counters.cpu_s == pytest.approx(250 / noise._TICK)
+
+
+def test_process_table_follows_pids(fake_sysfs):
+    _proc(fake_sysfs, 1, "systemd", 10)
+    _proc(fake_sysfs, 2, "kthreadd", 10, io=(4096, 0))
+    fake_sysfs("proc/self", {})
+    table = noise.ProcessTable(str(fake_sysfs.root / "proc"))
+    assert set(table.sample()) == {1, 2}
+    assert table.sample()[2].read_bytes == 4096
+    shutil.rmtree(fake_sysfs.root / "proc/2")
+    _proc(fake_sysfs, 3, "tracker-miner", 5)
+    assert set(table.sample()) == {1, 3}
+    assert len(table) == 2
+    table.close()
+    assert len(table) == 0
+
+
+def test_sampler_attribution(fake_sysfs):
+    tick = noise._TICK
+    proc = fake_sysfs.root / "proc"
+    _proc(fake_sysfs, 1, "systemd", 0)
+    _proc(fake_sysfs, 100, "batben", 0)
+    _proc(fake_sysfs, 200, "tracker-miner", 0, io=(0, 0))
+    _proc(fake_sysfs, 300, "firefox", 0)
+    now = [0.0]
+    sampler = noise.NoiseSampler(str(proc), threshold=0.2, pid=100, clock=lambda: now[0])
+    sampler.start(thread=False)
+
+    _proc(fake_sysfs, 101, "python", 8 * tick, ppid=100)  # a governor worker, started during the run
+    _proc(fake_sysfs, 200, "tracker-miner", 2 * tick, io=(10_000_000, 0))
+    _proc(fake_sysfs, 301, "firefox", 1 * tick, ppid=300)
+    sampler.sample()
+    shutil.rmtree(proc / "301")  # exits, keeps what it had
+    _proc(fake_sysfs, 100, "batben", 2 * tick)
+    _proc(fake_sysfs, 300, "firefox", 1 * tick)
+    now[0] = 10.0
+    result = sampler.stop()
+
+    assert result.duration == 10.0
+    assert result.ours_cpu_s == pytest.approx(10.0)
+    assert result.other_cpu_s == pytest.approx(4.0)
+    assert result.share == pytest.approx(4 / 14)
+    assert result.flagged
+    assert [(u.comm, u.processes, u.cpu_s) for u in result.offenders] == [
+        ("tracker-miner", 1, pytest.approx(2.0)),
+        ("firefox", 2, pytest.approx(2.0)),
+    ]
+    assert result.offenders[0].read_bytes == 10_000_000
+
+    result.energy_wh = 1.4
+    assert result.other_wh == pytest.approx(0.4)
+    assert result.metrics()["noise_flagged"] == 1.0
+    report = result.report()
+    assert "WARNING" in report
+    assert "firefox x2" in report
+
+
+def test_pid_reuse_counts_as_new_process(fake_sysfs):
+    _proc(fake_sysfs, 100, "batben", 0)
+    _proc(fake_sysfs, 200, "old", 50 * noise._TICK, starttime=10)
+    sampler = noise.NoiseSampler(str(fake_sysfs.root / "proc"), pid=100)
+    sampler.start(thread=False)
+    _proc(fake_sysfs, 200, "new", 1 * noise._TICK, starttime=20)
+    result = sampler.stop()
+    assert result.other_cpu_s == pytest.approx(1.0)
+    assert result.share == 1.0  # batben itself did nothing here
+    assert [u.comm for u in result.offenders] == ["new"]
+
+
+def test_sampler_thread():
+    sampler = noise.NoiseSampler(interval=0.01)
+    sampler.start()
+    sum(range(100_000))
+    result = sampler.stop()
+    assert result.processes >= 1
+    assert result.ours_cpu_s >= 0
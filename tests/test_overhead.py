@@ -0,0 +1,82 @@
+import math
+import os
+import subprocess
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+from batben import overhead
+
+HEAVY = ("numpy", "httpx", "psutil", "dasbus")
+
+
+def _usage(cpu, nvcsw, nivcsw, rss_kb):
+    return SimpleNamespace(ru_utime=cpu / 2, ru_stime=cpu / 2, ru_nvcsw=nvcsw, ru_nivcsw=nivcsw, ru_maxrss=rss_kb)
+
+
+def test_meter():
+    now = [10.0]
+    usages = iter([_usage(0.1, 5, 1, 20_480), _usage(0.6, 105, 3, 51_200)])
+    meter = overhead.OverheadMeter(clock=lambda: now[0], usage=lambda: next(usages))
+    now[0] = 20.0
+    result = meter.stop()
+    assert result.cpu_s == pytest.approx(0.5)
+    assert result.cpu_percent == pytest.approx(5.0)
+    assert (result.wakeups, result.preemptions) == (100, 2)
+    assert result.wakeups_per_s == pytest.approx(10.0)
+    assert result.max_rss_mb == 50.0
+    assert result.startup_cpu_s == pytest.approx(0.1)
+    assert set(result.metrics()) >= {"overhead_cpu_s", "overhead_wakeups_per_s", "startup_s"}
+    assert "10.0 wakeups/s" in result.report()
+
+
+def test_in_process_benchmark_only_counts_startup():
+    usages = iter([_usage(0.1, 5, 1, 20_480), _usage(8.1, 105, 3, 512_000)])
+    result = overhead.OverheadMeter(clock=iter([0.0, 10.0]).__next__, usage=lambda: next(usages)).stop(in_process=True)
+    assert result.cpu_s == pytest.approx(8.0)
+    assert set(result.metrics()) == {"startup_s"}
+    assert "ran in-process" in result.report()
+
+
+def test_process_age(tmp_path):
+    assert overhead.process_age() >= 0
+    (tmp_path / "stat").write_text("1 (odd) name) S" + " 0" * 30)
+    assert overhead.process_age(str(tmp_path / "stat")) > 0
+    assert math.isnan(overhead.process_age(str(tmp_path / "missing")))
+
+
+def _run_python(code: str) -> str:
+    src = os.path.join(os.path.dirname(__file__), "..", "src")
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [src, os.environ.get("PYTHONPATH")]))}
+    return subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True).stdout
+
+
+@pytest.mark.parametrize("args", [["--help"], ["bench", "--help"], ["sleep-check", "--help"], ["suite", "--help"]])
+def test_help_stays_light(args):
+    """Startup regression: help and argument parsing must not pull in the heavy dependencies."""
+    out = _run_python(
+        "import sys\n"
+        "from batben import cli\n"
+        f"try:\n    cli.cli({args!r})\nexcept SystemExit:\n    pass\n"
+        f"print('LOADED', [m for m in {HEAVY!r} if m in sys.modules])"
+    )
+    assert out.strip().endswith("LOADED []")
+
+
+@pytest.mark.parametrize("module", ["batben.workload", "batben.sleep", "batben.battery", "batben.governor"])
+def test_modules_import_light(module):
+    out = _run_python(f"import sys, {module}\nprint([m for m in {HEAVY!r} if m in sys.modules])")
+    assert out.strip() == "[]"
+
+
+def test_startup_time():
+    """Importing the cli and parsing --help in a fresh interpreter, measured from inside. Generous bound."""
+    out = _run_python(
+        "import time\n"
+        "t = time.perf_counter()\n"
+        "from batben import cli\n"
+        "try:\n    cli.cli(['--help'])\nexcept SystemExit:\n    pass\n"
+        "print('STARTUP', time.perf_counter() - t)"
+    )
+    assert float(out.rsplit("STARTUP", 1)[1]) < 0.5
@@ -0,0 +1,108 @@
+import pytest
+
+from batben import rapl
+
+
+@pytest.fixture
+def powercap(fake_sysfs):
+    """A one-package machine: package-0 with core and uncore subzones, plus a zone we can't read."""
+    fake_sysfs("powercap/intel-rapl:0", {"name": "package-0", "energy_uj": 1_000_000, "max_energy_range_uj": 9_999_999})
+    fake_sysfs("powercap/intel-rapl:0:0", {"name": "core", "energy_uj": 500_000, "max_energy_range_uj": 9_999_999})
+    fake_sysfs("powercap/intel-rapl:0:1", {"name": "uncore", "energy_uj": 0, "max_energy_range_uj": 9_999_999})
+    fake_sysfs("powercap/intel-rapl:1", {"name": "psys"})  # no counter files
+    return fake_sysfs.root / "powercap"
+
+
+def _set(powercap, zone, uj):
+    (powercap / zone / "energy_uj").write_text(f"{uj}\n")
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_find_domains(powercap):
+    domains = rapl.find_domains(str(powercap))
+    assert [d.name for d in domains] == ["package-0", "package-0/core", "package-0/uncore"]
+    assert domains[0].read_uj() == 1_000_000
+    for d in domains:
+        d.close()
+
+
+def test_find_domains_skips_mmio_twin(powercap, fake_sysfs):
+    fake_sysfs("powercap/intel-rapl-mmio:0", {"name": "package-0", "energy_uj": 7, "max_energy_range_uj": 9_999_999})
+    domains = rapl.find_domains(str(powercap))
+    assert [d.name for d in domains] == ["package-0", "package-0/core", "package-0/uncore"]
+    assert domains[0].read_uj() == 1_000_000
+    for d in domains:
+        d.close()
+
+
+@pytest.mark.parametrize(
+    "before, after, expected",
+    [(100, 250, 150), (9_999_900, 50, 150), (5, 5, 0)],
+)
+def test_counter_delta(before, after, expected):
+    assert rapl.counter_delta(before, after, 9_999_999) == expected
+
+
+def test_meter_handles_wraparound(powercap):
+    clock = FakeClock()
+    meter = rapl.EnergyMeter(rapl.find_domains(str(powercap)), clock=clock)
+    meter.start(thread=False)
+    # package wraps on the way: 1J -> 9.9J -> (wrap) 0.5J is 8.9J + 0.6J
+    _set(powercap, "intel-rapl:0", 9_900_000)
+    meter.poll()
+    _set(powercap, "intel-rapl:0", 500_000)
+    _set(powercap, "intel-rapl:0:0", 2_500_000)
+    clock.now = 2.0
+    energy = meter.stop(events=1000)
+    meter.close()
+
+    assert energy.joules["package-0"] == pytest.approx(9.5)
+    assert energy.joules["package-0/core"] == pytest.approx(2.0)
+    assert energy.joules["package-0/uncore"] == 0.0
+    assert energy.watts("package-0") == pytest.approx(4.75)
+    assert energy.joules_per_event("package-0") == pytest.approx(0.0095)
+    assert energy.events_per_joule("package-0") == pytest.approx(1000 / 9.5)
+    assert "RAPL package-0: 9.500J (4.75W), 9500.00uJ/event, 105.3 events/J" in energy.report()
+
+
+def test_meter_thread(powercap):
+    meter = rapl.EnergyMeter(rapl.find_domains(str(powercap)), interval=0.01)
+    meter.start()
+    _set(powercap, "intel-rapl:0", 1_250_000)
+    energy = meter.stop()
+    meter.close()
+    assert energy.joules["package-0"] == pytest.approx(0.25)
+    assert energy.events is None
+
+
+def test_measure_energy_decorator(powercap, monkeypatch, capsys):
+    monkeypatch.setattr(rapl, "POWERCAP_ROOT", str(powercap))
+
+    @rapl.measure_energy
+    def work():
+        _set(powercap, "intel-rapl:0", 3_000_000)
+        return 400
+
+    assert work() == 400
+    assert work.last_energy.joules["package-0"] == pytest.approx(2.0)
+    assert work.last_energy.events == 400
+    assert "RAPL package-0: 2.000J" in capsys.readouterr().out
+
+
+def test_measure_energy_without_rapl(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(rapl, "POWERCAP_ROOT", str(tmp_path))
+
+    @rapl.measure_energy(events=lambda result: result["n"])
+    def work():
+        return {"n": 3}
+
+    assert work() == {"n": 3}
+    assert work.last_energy is None
+    assert capsys.readouterr().out == ""
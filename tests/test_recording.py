@@ -0,0 +1,112 @@
+import math
+
+import numpy as np
+import pytest
+
+from batben import recording, sampler
+
+
+def _write(path, rows, chunk_rows=4):
+    with recording.Recorder(str(path), ["t", "power_w"], meta={"profile": "tlp"}, chunk_rows=chunk_rows) as rec:
+        rec.event("start", t=0.0, workload="cpu")
+        for i in range(rows):
+            rec.append((float(i), 10.0 + i))
+        rec.event("end", t=rows - 0.5)
+
+
+def test_round_trip_across_chunks(tmp_path):
+    path = tmp_path / "run.rec"
+    _write(path, 10)
+    with recording.Recording(str(path)) as rec:
+        assert rec.columns == ["t", "power_w"]
+        assert rec.meta == {"profile": "tlp"}
+        assert len(rec) == 10
+        assert len(list(rec.chunks())) == 3  # 4 + 4 + the 2 left over at close
+        assert rec.column("t").tolist() == list(map(float, range(10)))
+        assert rec.column("power_w")[-1] == 19.0
+        assert [(e.name, e.data) for e in rec.events] == [("start", {"workload": "cpu"}), ("end", {})]
+
+
+def test_chunks_are_views_into_the_map(tmp_path):
+    path = tmp_path / "run.rec"
+    _write(path, 3)
+    rec = recording.Recording(str(path))
+    chunk = next(rec.chunks())
+    assert not chunk["t"].flags.owndata
+    assert chunk["t"].ctypes.data % 8 == 0
+    del chunk
+    rec.close()
+
+
+def test_torn_chunk_is_ignored(tmp_path):
+    path = tmp_path / "run.rec"
+    _write(path, 8)
+    data = path.read_bytes()
+    path.write_bytes(data[:-5])
+    with recording.Recording(str(path)) as rec:
+        # the "end" event at the tail got cut off, both data chunks survive
+        assert len(rec) == 8
+        assert [e.name for e in rec.events] == ["start"]
+
+
+def test_not_a_recording(tmp_path):
+    path = tmp_path / "notes.txt"
+    path.write_text("Slept for 3600 seconds (probably)\n")
+    with pytest.raises(ValueError):
+        recording.Recording(str(path))
+
+
+def test_recorder_refuses_to_overwrite(tmp_path):
+    path = tmp_path / "run.rec"
+    _write(path, 1)
+    with pytest.raises(FileExistsError):
+        recording.Recorder(str(path), ["t"])
+
+
+def test_recorder_needs_time_column(tmp_path):
+    with pytest.raises(ValueError):
+        recording.Recorder(str(tmp_path / "x.rec"), ["power_w"])
+
+
+def test_replay_order(tmp_path):
+    path = tmp_path / "run.rec"
+    _write(path, 2)
+    with recording.Recording(str(path)) as rec:
+        items = list(rec.replay())
+    kinds = [item.name if isinstance(item, recording.Event) else item["t"] for _, item in items]
+    # events sort before samples with the same timestamp
+    assert kinds == ["start", 0.0, 1.0, "end"]
+
+
+def test_summary(tmp_path):
+    path = tmp_path / "run.rec"
+    _write(path, 4)
+    with recording.Recording(str(path)) as rec:
+        text = rec.summary()
+    assert "4 samples over 3.0s, 2 events" in text
+    assert "profile: tlp" in text
+    assert "max     13.000" in text
+
+
+class FakeBattery:
+    def read(self):
+        return 40.0, 5.0, 12.0
+
+
+class FakeUtilization:
+    def sample(self):
+        return 10.0
+
+
+def test_telemetry_sampler_into_recorder(tmp_path):
+    path = tmp_path / "run.rec"
+    with recording.Recorder(str(path), sampler.TELEMETRY_COLUMNS) as rec:
+        telemetry = sampler.TelemetrySampler(rec, battery=FakeBattery(), utilization=FakeUtilization(), freq=None)
+        for _ in range(3):
+            telemetry.sample()
+    with recording.Recording(str(path)) as rec:
+        assert len(rec) == 3
+        assert rec.column("power_w").tolist() == [5.0] * 3
+        assert rec.column("cpu_percent").tolist() == [10.0] * 3
+        assert all(math.isnan(v) for v in rec.column("freq_mhz"))
+        assert np.all(np.diff(rec.column("t")) >= 0)
@@ -0,0 +1,122 @@
+import math
+
+import numpy as np
+import pytest
+
+from batben import report
+from batben.recording import Recorder
+from batben.sampler import TELEMETRY_COLUMNS
+
+
+def _record(path, profile, seconds=600, hz=2, rate_w=6.0, plug=None, events=1000):
+    """A bench recording draining at `rate_w`, charging at 30W during `plug` (start, end), or a list of them."""
+    t = 1_000_000 + np.arange(0, seconds, 1 / hz)
+    rel = t - t[0]
+    power = np.full(len(t), rate_w)
+    energy = 50 - rate_w * rel / 3600
+    for start, end in [plug] if isinstance(plug, tuple) else plug or []:
+        charging = (rel >= start) & (rel < end)
+        gained = np.cumsum(np.where(charging, (30 + rate_w) / hz / 3600, 0))
+        energy = energy + gained
+        power[charging] = 30.0
+    energy = np.floor(energy / 0.01) * 0.01  # the battery reports 10mWh steps
+    meta = {"command": "bench", "workload": "quick", "profile": profile}
+    with Recorder(str(path), TELEMETRY_COLUMNS, meta=meta) as rec:
+        rec.event("bench-start", t=t[0] + 60)
+        for row in zip(t, energy, power, np.full(len(t), 12.0), np.full(len(t), 10.0), np.full(len(t), 2000.0)):
+            rec.append(row)
+        rec.event("bench-end", t=t[0] + seconds - 60, events=events)
+    return str(path)
+
+
+def test_resample():
+    t = np.array([0.0, 0.4, 1.1, 3.5])
+    grid, means = report.resample(t, np.array([1.0, 3.0, np.nan, 5.0]), 1.0)
+    assert grid.tolist() == [0.0, 1.0, 2.0, 3.0]
+    assert means[0] == 2.0 and means[3] == 5.0
+    assert math.isnan(means[1]) and math.isnan(means[2])
+
+
+def test_charging_intervals_and_mask():
+    t = np.arange(10.0)
+    energy = np.array([5.0, 4.9, 4.9, 5.0, 5.1, 5.1, 5.0, 4.9, 5.0, 4.9])
+    intervals = report.charging_intervals(t, energy)
+    assert intervals == [(2.0, 4.0), (7.0, 8.0)]  # from the reading before the rise
+    assert report.in_intervals(t, intervals).tolist() == [
+        False,
+        False,
+        True,
+        True,
+        False,
+        False,
+        False,
+        True,
+        False,
+        False,
+    ]
+
+
+def test_analyze(tmp_path):
+    run = report.analyze(_record(tmp_path / "a.rec", "ppd:power-saver"))
+    assert run.profile == "ppd:power-saver"
+    assert run.plugged == []
+    assert run.discharge.wh_per_hour == pytest.approx(6.0, rel=0.02)
+    assert [p.name for p in run.phases] == ["before", "bench", "after bench"]
+    bench = run.main_phase
+    assert bench.name == "bench"
+    assert bench.duration == pytest.approx(480)
+    assert bench.energy_wh == pytest.approx(6.0 * 480 / 3600, rel=0.01)
+    assert bench.score == pytest.approx(1000 / 480)
+    assert bench.avg_cpu == 10.0
+    assert len(run.curve[0]) == pytest.approx(600, abs=2)
+
+
+def test_plug_in_is_left_out(tmp_path):
+    run = report.analyze(_record(tmp_path / "a.rec", "ppd:balanced", seconds=1200, plug=(300, 400)))
+    ((start, end),) = run.plugged
+    assert start == pytest.approx(300, abs=5) and end == pytest.approx(400, abs=5)
+    assert run.discharge.wh_per_hour == pytest.approx(6.0, rel=0.02)
+    bench = run.main_phase
+    assert bench.plugged_s == pytest.approx(100, abs=5)
+    # charging power isn't drain
+    assert bench.energy_wh == pytest.approx(6.0 * (1080 - bench.plugged_s) / 3600, rel=0.02)
+
+
+def test_charging_gaps_are_stitched_out(tmp_path):
+    # with most point pairs straddling a charge, a fit straight across the gaps comes out negative
+    run = report.analyze(_record(tmp_path / "a.rec", "tlp", seconds=1200, plug=[(200, 300), (500, 600), (800, 900)]))
+    assert len(run.plugged) == 3
+    assert run.discharge.wh_per_hour == pytest.approx(6.0, rel=0.03)
+    assert run.discharge.span_s == pytest.approx(900, abs=10)  # the 300s of charging are cut out
+
+
+def test_stitch_on_battery():
+    t = np.arange(8.0)
+    energy = np.array([5.0, 4.9, 4.8, 5.0, 5.2, 5.1, 5.0, 4.9])
+    stitched_t, stitched_energy = report.stitch_on_battery(t, energy, report.charging_intervals(t, energy))
+    assert stitched_t.tolist() == [0.0, 1.0, 2.0, 3.0, 4.0, 5.0]
+    assert stitched_energy == pytest.approx([5.0, 4.9, 4.8, 4.7, 4.6, 4.5])
+
+
+def test_report(tmp_path):
+    paths = [
+        _record(tmp_path / "saver1.rec", "ppd:power-saver", rate_w=5.0),
+        _record(tmp_path / "saver2.rec", "ppd:power-saver", rate_w=5.4),
+        _record(tmp_path / "perf.rec", "ppd:performance", rate_w=9.0, events=1500, plug=(100, 150)),
+    ]
+    (tmp_path / "notes.txt").write_text("not a recording")
+    assert sorted(report.find_recordings([str(tmp_path)])) == sorted(paths)
+
+    runs = [report.analyze(p) for p in paths]
+    rows = {row.profile: row for row in report.profile_table(runs)}
+    assert rows["ppd:power-saver"].runs == 2
+    assert rows["ppd:power-saver"].wh_per_hour == pytest.approx(5.2, rel=0.02)
+    assert rows["ppd:performance"].plugged_runs == 1
+    assert rows["ppd:performance"].score > rows["ppd:power-saver"].score
+
+    page = report.render_html(runs, title="saver vs perf <test>")
+    assert page.startswith("<!DOCTYPE html>")
+    assert "saver vs perf &lt;test&gt;" in page
+    assert page.count("<svg") == 2
+    assert "<script" not in page
+    assert "plugged in" in page
@@ -0,0 +1,257 @@
+import os
+import time
+
+import pytest
+
+from batben import sandbox
+
+CPU_STAT = """usage_usec 2500000
+user_usec 2000000
+system_usec 500000
+nr_periods 40
+nr_throttled 12
+throttled_usec 750000
+"""
+IO_STAT = """8:0 rbytes=1048576 wbytes=4194304 rios=10 wios=40 dbytes=0 dios=0
+259:0 rbytes=1048576 wbytes=0 rios=3 wios=0 dbytes=0 dios=0
+"""
+
+
+def _pressure(some_us, full_us):
+    return (
+        f"some avg10=1.50 avg60=0.40 avg300=0.10 total={some_us}\n"
+        f"full avg10=0.70 avg60=0.20 avg300=0.05 total={full_us}\n"
+    )
+
+
+def test_parsers():
+    assert sandbox.parse_keyed(CPU_STAT)["throttled_usec"] == 750_000
+    assert sandbox.parse_keyed("anon 4096\nfile 8192\nbogus\n") == {"anon": 4096, "file": 8192}
+    io = sandbox.parse_io_stat(IO_STAT)
+    assert (io["rbytes"], io["wbytes"], io["rios"]) == (2 * 1048576, 4194304, 13)
+    pressure = sandbox.parse_pressure(_pressure(1200, 300))
+    assert pressure["some_total"] == 1200 and pressure["full_avg10"] == 0.7
+
+
+def test_cgroup2_mount(tmp_path):
+    mountinfo = tmp_path / "mountinfo"
+    mountinfo.write_text(
+        "25 30 0:23 / /sys/fs/cgroup ro,nosuid - tmpfs tmpfs ro,mode=755\n"
+        "26 25 0:24 / /sys/fs/cgroup/unified rw,nosuid shared:5 - cgroup2 cgroup2 rw,nsdelegate\n"
+        "27 25 0:25 / /sys/fs/cgroup/cpu rw,nosuid shared:6 - cgroup cgroup rw,cpu\n"
+    )
+    assert sandbox.cgroup2_mount(str(mountinfo)) == "/sys/fs/cgroup/unified"
+    mountinfo.write_text("25 30 0:23 / /sys/fs/cgroup ro,nosuid - tmpfs tmpfs ro,mode=755\n")
+    assert sandbox.cgroup2_mount(str(mountinfo)) is None
+
+
+def test_cgroup_of(fake_sysfs):
+    fake_sysfs("proc/42", {"cgroup": "4:memory:/x\n0::/user.slice/user-1000.slice/batben-42.scope"})
+    assert sandbox.cgroup_of(42, str(fake_sysfs.root / "proc")) == "/user.slice/user-1000.slice/batben-42.scope"
+    assert sandbox.cgroup_of(7, str(fake_sysfs.root / "proc")) is None
+
+
+def test_read_cgroup_usage(fake_sysfs):
+    path = fake_sysfs(
+        "cg",
+        {
+            "cpu.stat": CPU_STAT,
+            "memory.peak": 52428800,
+            "memory.stat": "anon 20971520\nfile 10485760\n",
+            "io.stat": IO_STAT,
+            "cpu.pressure": _pressure(1_500_000, 400_000),
+        },
+    )
+    usage = sandbox.read_cgroup_usage(str(path), 5.0, "cgroup", {"some": 1.0, "full": 0.1})
+    assert (usage.user_s, usage.system_s, usage.cpu_s) == (2.0, 0.5, 2.5)
+    assert usage.cpu_percent == pytest.approx(50.0)
+    assert usage.throttled_s == 0.75
+    assert usage.cpu_pressure == pytest.approx({"some": 0.5, "full": 0.3})
+    metrics = usage.metrics()
+    assert metrics["sandbox_cgroup"] == 1.0
+    assert metrics["sandbox_memory_peak_mb"] == 50.0
+    assert metrics["sandbox_memory_anon_mb"] == 20.0
+    assert metrics["sandbox_io_read_mb"] == 2.0
+    assert metrics["sandbox_io_write_mb"] == 4.0
+    assert metrics["sandbox_cpu_pressure_some_s"] == pytest.approx(0.5)
+
+
+def test_cgroup_without_controllers(fake_sysfs):
+    path = fake_sysfs("cg", {"cpu.stat": "usage_usec 100\nuser_usec 60\nsystem_usec 40\n"})
+    usage = sandbox.read_cgroup_usage(str(path), 1.0, "cgroup", {})
+    assert usage.cpu_s == pytest.approx(1e-4)
+    assert usage.memory_peak_bytes is None and usage.io_read_bytes is None and usage.throttled_s is None
+    assert set(usage.metrics()) == {
+        "sandbox_cgroup",
+        "sandbox_cpu_s",
+        "sandbox_user_s",
+        "sandbox_system_s",
+        "sandbox_cpu_percent",
+    }
+
+
+def _spin(seconds):
+    end = time.process_time() + seconds
+    while time.process_time() < end:
+        pass
+    return os.getpid()
+
+
+def test_runs_in_a_child_with_rusage():
+    pid, usage = sandbox.run_sandboxed(_spin, (0.2,))
+    assert pid != os.getpid()
+    assert usage.backend == "rusage" and not usage.exact
+    assert usage.user_s + usage.system_s >= 0.15
+    assert usage.memory_peak_bytes > 0
+    assert usage.metrics()["sandbox_cgroup"] == 0.0
+
+
+def test_closures_and_workers_are_counted():
+    import multiprocessing as mp
+
+    ctx = mp.get_context("fork")
+
+    def workload(n):
+        procs = [ctx.Process(target=_spin, args=(0.15,)) for _ in range(n)]
+        for p in procs:
+            p.start()
+        for p in procs:
+            p.join()
+        return n
+
+    result, usage = sandbox.run_sandboxed(workload, (2,))
+    assert result == 2
+    assert usage.cpu_s >= 0.25  # both workers, which the child waited for
+
+
+def test_exceptions_come_back():
+    def fail():
+        raise KeyError("no such kernel")
+
+    with pytest.raises(KeyError, match="no such kernel"):
+        sandbox.run_sandboxed(fail)
+
+
+def test_child_dying():
+    with pytest.raises(sandbox.SandboxError, match="exit code 3"):
+        sandbox.run_sandboxed(os._exit, (3,))
+
+
+class FakeBackend:
+    """Hands out a prepared directory as the cgroup; the child can write its 'accounting' into it."""
+
+    name = "cgroup"
+
+    def __init__(self, path, cpu_max=None, fail=None):
+        self.path = path
+        self.cpu_max = self.cap = cpu_max
+        self.fail = fail
+        self.notes = []
+        self.placed = self.released = None
+
+    def place(self, pid):
+        if self.fail:
+            raise sandbox.SandboxError(self.fail)
+        self.placed = pid
+        return self.path
+
+    def release(self):
+        self.released = True
+
+
+def test_cgroup_accounting(fake_sysfs):
+    path = fake_sysfs("cg", {"cpu.stat": "", "cpu.pressure": _pressure(2_000_000, 0)})
+
+    def workload():
+        (path / "cpu.stat").write_text(CPU_STAT)
+        (path / "cpu.pressure").write_text(_pressure(2_250_000, 0))
+        return "done"
+
+    backend = FakeBackend(str(path), cpu_max=1.5)
+    result, usage = sandbox.run_sandboxed(workload, backend=backend)
+    assert result == "done"
+    assert backend.placed is not None and backend.released
+    assert usage.backend == "cgroup"
+    assert usage.cpu_s == 2.5
+    assert usage.cpu_pressure == pytest.approx({"some": 0.25, "full": 0.0})  # only what happened during the run
+    assert usage.metrics()["sandbox_cpu_max"] == 1.5
+    assert "capped at 1.5 CPUs, throttled 0.75s" in usage.report()
+
+
+def test_falls_back_when_placing_fails(tmp_path):
+    backend = FakeBackend(str(tmp_path), cpu_max=2.0, fail="systemd wouldn't start batben-1.scope")
+    wrapped = sandbox.sandboxed(_spin, backend=backend)
+    assert wrapped(0.05) != os.getpid()
+    usage = wrapped.last_usage
+    assert usage.backend == "rusage"
+    assert usage.notes == [
+        "systemd wouldn't start batben-1.scope; falling back to getrusage",
+        "no cgroup, so the CPU cap wasn't enforced",
+    ]
+    assert "sandbox_cpu_max" not in usage.metrics()
+
+
+def test_delegated_cgroup(fake_sysfs):
+    parent = fake_sysfs("delegated", {"cgroup.controllers": "cpuset cpu io memory pids", "cgroup.subtree_control": ""})
+    backend = sandbox.DelegatedCgroup(str(parent), cpu_max=1.5)
+    path = backend.place(1234)
+    assert path == str(parent / "batben-1234")
+    assert (parent / "cgroup.subtree_control").read_text() == "+cpu +memory +io"
+    assert (parent / "batben-1234" / "cpu.max").read_text() == "150000 100000"
+    assert (parent / "batben-1234" / "cgroup.procs").read_text() == "1234"
+    assert backend.cap == 1.5 and backend.notes == []
+
+
+def test_delegated_cgroup_needs_cgroup2(tmp_path):
+    with pytest.raises(sandbox.SandboxError, match="not a cgroup v2"):
+        sandbox.DelegatedCgroup(str(tmp_path))
+
+
+class FakeBus:
+    """A dasbus bus whose systemd manager records StartTransientUnit calls."""
+
+    def __init__(self, fail=None):
+        self.fail = fail
+        self.proxies, self.calls = [], []
+
+    def get_proxy(self, service, path):
+        self.proxies.append((service, path))
+        return self
+
+    def StartTransientUnit(self, name, mode, properties, aux):
+        if self.fail:
+            raise RuntimeError(self.fail)
+        self.calls.append((name, mode, properties, aux))
+        return "/org/freedesktop/systemd1/job/42"
+
+
+@pytest.fixture
+def fake_variants(monkeypatch):
+    monkeypatch.setattr(sandbox, "_variant", lambda signature, value: (signature, value))
+
+
+def test_systemd_scope(fake_variants, monkeypatch):
+    bus = FakeBus()
+    monkeypatch.setattr(sandbox, "cgroup_of", lambda pid: f"/user.slice/batben-{pid}.scope")
+    backend = sandbox.SystemdScope(cpu_max=0.5, mount="/sys/fs/cgroup", bus=bus)
+    assert backend.place(1234) == "/sys/fs/cgroup/user.slice/batben-1234.scope"
+    assert bus.proxies == [("org.freedesktop.systemd1", "/org/freedesktop/systemd1")]
+    (name, mode, properties, aux), *_ = bus.calls
+    assert (name, mode, aux) == ("batben-1234.scope", "fail", [])
+    assert dict(properties)["PIDs"] == ("au", [1234])
+    assert dict(properties)["CPUAccounting"] == ("b", True)
+    assert dict(properties)["CPUQuotaPerSecUSec"] == ("t", 500_000)
+
+
+def test_systemd_scope_refused(fake_variants):
+    backend = sandbox.SystemdScope(mount="/sys/fs/cgroup", bus=FakeBus(fail="Access denied"))
+    with pytest.raises(sandbox.SandboxError, match="wouldn't start batben-7.scope: Access denied"):
+        backend.place(7)
+
+
+def test_systemd_scope_never_shows_up(fake_variants, monkeypatch):
+    monkeypatch.setattr(sandbox, "cgroup_of", lambda pid: "/user.slice/something-else.scope")
+    backend = sandbox.SystemdScope(mount="/sys/fs/cgroup", timeout=0.05, bus=FakeBus())
+    assert "CPUQuotaPerSecUSec" not in [name for name, _, _ in backend.properties(7)]
+    with pytest.raises(sandbox.SandboxError, match="didn't show up"):
+        backend.place(7)
@@ -0,0 +1,155 @@
+import math
+import time
+
+import pytest
+
+from batben import sleep
+
+
+class FakeMachine:
+    """
+    Simulates logind suspending the box: suspend() arms it, the next wait() spends `asleep` seconds
+    of boottime only (monotonic stops), then bumps the residency counters like the kernel would.
+    """
+
+    def __init__(self, fake_sysfs, asleep, hw_sleep_us):
+        self.fake_sysfs = fake_sysfs
+        self.boot = 1000.0
+        self.mono = 500.0
+        self.asleep = asleep
+        self.hw_sleep_us = hw_sleep_us
+        self.armed = False
+        self.energy = 50.0
+        self._counters(0, 3)
+
+    def _counters(self, hw_sleep, success):
+        self.fake_sysfs(
+            "sys/power/suspend_stats", {"total_hw_sleep": 1_000_000 + hw_sleep, "success": success, "fail": 1}
+        )
+        self.fake_sysfs(
+            "sys/kernel/debug/amd_pmc",
+            {"s0ix_stats": f"=== S0ix statistics ===\nS0ix Entry Time: 1\nTime (in us) in S0i3: {hw_sleep}"},
+        )
+
+    def suspend(self, duration):
+        self.armed = True
+
+    def clocks(self):
+        return self.boot, self.mono
+
+    def wait(self, seconds):
+        if self.armed:
+            self.armed = False
+            self.boot += self.asleep
+            self.energy -= 0.01
+            self._counters(self.hw_sleep_us, 4)
+        else:
+            self.boot += seconds
+            self.mono += seconds
+
+    def read(self):
+        return self.energy, 0.5, 12.0
+
+
+def test_read_residency(fake_sysfs):
+    FakeMachine(fake_sysfs, 0, 0)._counters(2_500_000, 7)
+    counters = sleep.read_residency(str(fake_sysfs.root))
+    assert counters == {
+        "total_hw_sleep": 3_500_000,
+        "amd_pmc_s0i3": 2_500_000,
+        "suspend_success": 7,
+        "suspend_fail": 1,
+    }
+
+
+def test_read_residency_nothing_readable(tmp_path):
+    assert sleep.read_residency(str(tmp_path)) == {}
+
+
+def test_measure_suspend(fake_sysfs):
+    machine = FakeMachine(fake_sysfs, asleep=60.0, hw_sleep_us=54_000_000)
+    result = sleep.measure_suspend(
+        60,
+        suspend=machine.suspend,
+        root=str(fake_sysfs.root),
+        clocks=machine.clocks,
+        battery=machine,
+        wait=machine.wait,
+    )
+    assert result.elapsed == pytest.approx(60.0)
+    assert result.suspended == pytest.approx(60.0)
+    assert result.suspends == 1
+    assert result.residency == {"total_hw_sleep": 54.0, "amd_pmc_s0i3": 54.0}
+    assert result.deepest_share == pytest.approx(0.9)
+    assert result.energy_wh == pytest.approx(0.01)
+    assert result.wh_per_hour == pytest.approx(0.6)
+    assert "90.0% of the suspend (total_hw_sleep)" in result.report()
+
+
+def test_measure_suspend_never_slept(fake_sysfs):
+    machine = FakeMachine(fake_sysfs, asleep=60.0, hw_sleep_us=0)
+    result = sleep.measure_suspend(
+        10, suspend=lambda duration: None, root=str(fake_sysfs.root), clocks=machine.clocks, wait=machine.wait
+    )
+    assert result.suspended == 0
+    assert result.elapsed == pytest.approx(10.0)
+    assert result.suspends == 0
+    assert result.deepest_share is None
+    assert math.isnan(result.energy_wh)
+
+
+def test_measure_idle(fake_sysfs):
+    machine = FakeMachine(fake_sysfs, asleep=0, hw_sleep_us=0)
+    machine.read = lambda: (machine.energy - (machine.boot - 1000.0) / 3600, 1.0, 12.0)  # a steady 1W
+    result = sleep.measure_idle(120, battery=machine, clocks=machine.clocks, wait=machine.wait)
+    assert result.kind == "idle"
+    assert result.wh_per_hour == pytest.approx(1.0)
+    assert result.report().startswith("Stayed awake for 120 seconds")
+
+
+class FakeLogind:
+    """A dasbus bus whose logind manager records calls, or refuses them with `error`."""
+
+    def __init__(self, error=None):
+        self.error = error
+        self.calls = []
+
+    def get_proxy(self, service, path):
+        assert (service, path) == ("org.freedesktop.login1", "/org/freedesktop/login1")
+        return self
+
+    def SetWakeup(self, what, usec):
+        self.calls.append(("SetWakeup", what, usec))
+
+    def Suspend(self, interactive):
+        if self.error:
+            raise self.error
+        self.calls.append(("Suspend", interactive))
+
+
+def test_quick_sleep_dbus():
+    bus = FakeLogind()
+    before = time.time()
+    sleep.quick_sleep_dbus(600, bus=bus)
+    (_, what, usec), suspend = bus.calls
+    assert what == "suspend" and usec / 1e6 == pytest.approx(before + 600, abs=5)
+    assert suspend == ("Suspend", False)
+
+
+def test_quick_sleep_dbus_refused():
+    with pytest.raises(sleep.SuspendError, match="Interactive authentication required"):
+        sleep.quick_sleep_dbus(600, bus=FakeLogind(PermissionError("Interactive authentication required")))
+
+
+def test_sleep_check_refused(monkeypatch):
+    from click.testing import CliRunner
+
+    from batben import cli
+
+    def refuse(duration, battery=None):
+        sleep.quick_sleep_dbus(duration, bus=FakeLogind(PermissionError("Access denied")))
+
+    monkeypatch.setattr(sleep, "measure_suspend", refuse)
+    result = CliRunner().invoke(cli.cli, ["sleep-check", "-t", "1", "--no-wake", "--no-save"])
+    assert result.exit_code == 1
+    assert "Error: logind wouldn't suspend: Access denied" in result.output
@@ -0,0 +1,81 @@
+import os
+
+import pytest
+
+from batben import storage
+
+
+@pytest.mark.parametrize("mode", ["buffered", "mmap"])
+@pytest.mark.parametrize("op", ["read", "write"])
+@pytest.mark.parametrize("pattern", ["seq", "rand"])
+def test_run_io_job(tmp_path, mode, op, pattern):
+    job = storage.IoJob(
+        pattern=pattern, op=op, mode=mode, block_size=4096, file_size=256 << 10, queue_depth=2, target_dir=str(tmp_path)
+    )
+    result = storage.run_io_job(job)
+    assert result.ops == 64
+    assert (result.latencies_ns > 0).all()
+    assert result.iops > 0
+    assert result.mb_per_s == pytest.approx(result.iops * 4096 / 1e6)
+    assert result.percentile_us(50) <= result.percentile_us(99)
+    # the scratch directory is gone afterwards
+    assert os.listdir(tmp_path) == []
+
+
+def test_run_io_job_direct(tmp_path):
+    job = storage.IoJob(op="write", mode="direct", fsync="every", file_size=64 << 10, target_dir=str(tmp_path))
+    try:
+        result = storage.run_io_job(job)
+    except OSError as e:
+        pytest.skip(f"no O_DIRECT here: {e}")
+    assert result.ops == 16
+
+
+def test_report(tmp_path):
+    result = storage.run_io_job(storage.IoJob(file_size=64 << 10, target_dir=str(tmp_path)))
+    assert result.report().startswith("seq read bs=4K qd=1 buffered fsync=end: ")
+    assert storage.IoJob(block_size=512).describe().startswith("seq read bs=512B ")
+    assert storage.IoJob(block_size=1536).describe().startswith("seq read bs=1536B ")
+
+
+def test_suite_io_errors(tmp_path, monkeypatch):
+    from click.testing import CliRunner
+
+    from batben import cli
+
+    args = ["suite", "io", "--pattern", "seq", "--size", "1", "--dir", str(tmp_path)]
+    result = CliRunner().invoke(cli.cli, [*args, "--mode", "direct", "--block-size", "1000"])
+    assert result.exit_code == 2
+    assert "multiple of" in result.output
+
+    def refuse(job):
+        raise OSError(22, "O_DIRECT isn't supported in /tmp (tmpfs?)")
+
+    monkeypatch.setattr(storage, "run_io_job", refuse)
+    result = CliRunner().invoke(cli.cli, [*args, "--mode", "direct"])
+    assert result.exit_code == 1
+    assert "Error: seq read bs=4K qd=1 direct fsync=end: O_DIRECT isn't supported" in result.output
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {"pattern": "zigzag"},
+        {"op": "trim"},
+        {"mode": "aio"},
+        {"fsync": "sometimes"},
+        {"block_size": 0},
+        {"block_size": 8192, "file_size": 4096},
+        {"mode": "direct", "block_size": 1000},
+        {"queue_depth": 0},
+    ],
+)
+def test_io_job_validation(kwargs):
+    with pytest.raises(ValueError):
+        storage.IoJob(**kwargs)
+
+
+def test_default_matrix_overrides():
+    jobs = storage.default_matrix(mode="mmap", file_size=8 << 20)
+    assert len(jobs) == 5
+    assert all(job.mode == "mmap" and job.file_size == 8 << 20 for job in jobs)
@@ -0,0 +1,121 @@
+import math
+import statistics
+
+import pytest
+
+from batben import stats, store, system
+
+
+@pytest.fixture
+def results():
+    with store.ResultStore(":memory:") as s:
+        yield s
+
+
+def _add(results, profile, scores, energy=None, machine="x12", workload="quick"):
+    for score in scores:
+        metrics = {"score": score, "events": score * 10, "duration": 10.0}
+        if energy is not None:
+            metrics["energy_wh"] = energy
+        results.add_run(metrics, machine=machine, profile=profile, workload=workload, kernel="6.17")
+
+
+def test_aggregates_match_raw_samples(results):
+    scores = [11180.9, 11184.05, 11190.0, 11175.2]
+    _add(results, "ppd:balanced", scores)
+    (p,) = results.profile_stats("score", "quick").values()
+    assert p.n == 4
+    assert p.mean == pytest.approx(statistics.fmean(scores))
+    assert p.stdev == pytest.approx(statistics.stdev(scores))
+    assert results.run_count() == 4
+
+
+def test_rollup_over_machines(results):
+    _add(results, "tlp", [1.0, 2.0], machine="x12")
+    _add(results, "tlp", [3.0, 4.0], machine="t14")
+    rolled = results.profile_stats("score", "quick")["tlp"]
+    assert rolled.n == 4
+    assert rolled.mean == pytest.approx(2.5)
+    assert rolled.variance == pytest.approx(statistics.variance([1, 2, 3, 4]))
+    assert results.profile_stats("score", "quick", machine="t14")["tlp"].mean == pytest.approx(3.5)
+
+
+def test_derived_metrics(results):
+    _add(results, "tlp", [100.0], energy=2.0)
+    assert results.profile_stats("events_per_wh", "quick")["tlp"].mean == pytest.approx(500.0)
+    assert results.profile_stats("wh_per_hour", "quick")["tlp"].mean == pytest.approx(720.0)
+
+
+def test_non_finite_metrics_are_dropped(results):
+    results.add_run({"score": math.nan, "duration": 1.0}, machine="m", profile="p", workload="quick", kernel="k")
+    assert results.profile_stats("score", "quick") == {}
+
+
+def test_compare(results):
+    _add(results, "ppd:balanced", [11180.0, 11185.0, 11182.0, 11178.0, 11184.0])
+    _add(results, "ppd:power-saver", [5395.0, 5398.0, 5391.0])
+    _add(results, "tlp", [11183.0])
+    rows = {row.profile: row for row in results.compare("score", "quick")}
+    # the baseline defaults to the profile with the most runs
+    assert rows["tlp"].baseline == "ppd:balanced"
+    assert rows["ppd:balanced"].delta == 0.0
+    assert rows["ppd:power-saver"].delta == pytest.approx(-0.517, abs=1e-3)
+    assert rows["ppd:power-saver"].p_value < 0.001
+    assert rows["tlp"].p_value is None
+    text = store.format_comparison("score", list(rows.values()))
+    assert "(baseline)" in text
+    assert "n/a (need 2+ runs)" in text
+
+
+def test_compare_unknown_baseline(results):
+    _add(results, "tlp", [1.0, 2.0])
+    with pytest.raises(KeyError):
+        results.compare("score", "quick", baseline="tuned:laptop")
+    assert results.compare("score", "cpu") == []
+
+
+def test_store_on_disk(tmp_path):
+    path = tmp_path / "nested" / "results.sqlite"
+    with store.ResultStore(str(path)) as s:
+        _add(s, "tlp", [1.0, 2.0])
+    with store.ResultStore(str(path)) as s:
+        assert s.run_count() == 2
+
+
+def test_merge_moments():
+    a, b = [1.0, 2.0, 4.0], [10.0, 11.0]
+    m_a = (3, statistics.fmean(a), sum((x - statistics.fmean(a)) ** 2 for x in a))
+    m_b = (2, statistics.fmean(b), sum((x - statistics.fmean(b)) ** 2 for x in b))
+    n, mean, m2 = stats.merge_moments(m_a, m_b)
+    assert n == 5
+    assert mean == pytest.approx(statistics.fmean(a + b))
+    assert m2 / (n - 1) == pytest.approx(statistics.variance(a + b))
+
+
+def test_welch_t_test():
+    # standard errors 4/5 and 9/6: t = 3 / sqrt(2.3), df = 2.3**2 / (0.8**2 / 4 + 1.5**2 / 5)
+    t, df, p = stats.welch_t_test(5, 20.0, 4.0, 6, 17.0, 9.0)
+    assert t == pytest.approx(1.9781, abs=1e-4)
+    assert df == pytest.approx(8.6721, abs=1e-4)
+    # between the two-sided 10% (1.833) and 5% (2.262) critical values for df ~ 9
+    assert 0.05 < p < 0.10
+    assert p == pytest.approx(2 * (1 - stats.t_cdf(t, df)))
+    assert stats.welch_t_test(3, 1.0, 0.0, 3, 1.0, 0.0)[2] == 1.0
+    with pytest.raises(ValueError):
+        stats.welch_t_test(1, 1.0, 0.0, 3, 1.0, 1.0)
+
+
+def test_detect_profile(tmp_path, fake_sysfs):
+    assert system.detect_profile(str(tmp_path)) == "unknown"
+    fake_sysfs("sys/firmware/acpi", {"platform_profile": "low-power"})
+    assert system.detect_profile(str(tmp_path)) == "ppd:low-power"
+    (tmp_path / "run" / "tlp").mkdir(parents=True)
+    assert system.detect_profile(str(tmp_path)) == "tlp"
+    fake_sysfs("etc/tuned", {"active_profile": "laptop-battery-powersave"})
+    (tmp_path / "run" / "tuned").mkdir()
+    assert system.detect_profile(str(tmp_path)) == "tuned:laptop-battery-powersave"
+
+
+def test_machine_name(fake_sysfs):
+    dmi = fake_sysfs("dmi", {"sys_vendor": "LENOVO", "product_version": "ThinkPad X12", "product_name": "20UW"})
+    assert system.machine_name(str(dmi)) == "LENOVO ThinkPad X12 20UW"
@@ -0,0 +1,103 @@
+import math
+
+import pytest
+
+from batben import thermal
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def sensors(fake_sysfs):
+    """Two zones (one of them a second acpitz) and two cores in one package with throttle counters."""
+    fake_sysfs("thermal/thermal_zone0", {"type": "x86_pkg_temp", "temp": 50_000})
+    fake_sysfs("thermal/thermal_zone1", {"type": "acpitz", "temp": 40_000})
+    fake_sysfs("thermal/thermal_zone2", {"type": "acpitz", "temp": 30_000})
+    for n in range(2):
+        fake_sysfs(f"cpu/cpu{n}/thermal_throttle", {"core_throttle_count": 5, "package_throttle_count": 7})
+        fake_sysfs(f"cpu/cpu{n}/topology", {"physical_package_id": 0})
+    return fake_sysfs.root
+
+
+def _set(root, relpath, value):
+    (root / relpath).write_text(f"{value}\n")
+
+
+def test_collector(sensors):
+    clock = FakeClock()
+    with thermal.ThermalCollector(str(sensors / "thermal"), str(sensors / "cpu"), clock=clock) as collector:
+        assert collector
+        collector.start(thread=False)
+        collector.sample()
+        clock.now = 1.0
+        _set(sensors, "thermal/thermal_zone0/temp", 95_000)
+        _set(sensors, "cpu/cpu0/thermal_throttle/core_throttle_count", 8)
+        _set(sensors, "cpu/cpu1/thermal_throttle/package_throttle_count", 9)  # same package, same count
+        _set(sensors, "cpu/cpu0/thermal_throttle/package_throttle_count", 9)
+        result = collector.stop()
+
+    assert result.samples == [(0.0, 50.0, 0), (1.0, 95.0, 5)]
+    assert result.zone_max_c == {"x86_pkg_temp": 95.0, "acpitz": 40.0, "acpitz:thermal_zone2": 30.0}
+    assert (result.core_throttles, result.package_throttles) == (3, 2)
+    assert result.metrics()["max_temp_c"] == 95.0
+    assert "3 core, 2 package" in result.report()
+
+
+def test_collector_nothing_to_read(tmp_path):
+    collector = thermal.ThermalCollector(str(tmp_path), str(tmp_path))
+    assert not collector
+    collector.start()
+    result = collector.stop()
+    assert math.isnan(result.max_temp_c)
+    collector.close()
+
+
+def test_window_rates():
+    timeline = [(0.5 * i, 100 * i) for i in range(1, 14)]  # 200 events/s for 6.5s
+    windows = thermal.window_rates(timeline, 2.0)
+    assert [w.start_s for w in windows] == [0.0, 2.0, 4.0]
+    assert [w.events_per_s for w in windows] == pytest.approx([200.0] * 3)
+
+
+def _boost_then_throttle():
+    """1000 events/s for 20s, then 600 events/s for 60s, sampled every second."""
+    timeline, events = [], 0
+    for t in range(1, 81):
+        events += 1000 if t <= 20 else 600
+        timeline.append((float(t), events))
+    return timeline
+
+
+def test_sustained_performance():
+    samples = [(float(t), 60.0 + min(t, 30), 0 if t < 20 else t - 19) for t in range(81)]
+    heat = thermal.ThermalResult(samples, {"x86_pkg_temp": 90.0}, core_throttles=61)
+    result = thermal.sustained_performance(_boost_then_throttle(), window=10, thermal=heat)
+    assert len(result.windows) == 8
+    assert result.sustained == pytest.approx(600.0)
+    assert result.peak == pytest.approx(1000.0)
+    assert result.peak_to_sustained == pytest.approx(1000 / 600)
+    assert result.steady_state_s == 20.0
+    assert result.windows[0].temp_c == pytest.approx(64.5)
+    assert [w.throttles for w in result.windows[:3]] == [0, 0, 10]
+    metrics = result.metrics()
+    assert metrics["steady_state_s"] == 20.0
+    assert metrics["max_temp_c"] == 90.0
+    report = result.report()
+    assert "steady after 20s" in report
+    assert "██▁▁▁▁▁▁" in report
+    assert "throttling in 6 windows, first at 20s" in report
+
+
+def test_sustained_performance_needs_three_windows():
+    assert thermal.sustained_performance([(10.0, 100), (20.0, 200)], window=10) is None
+
+
+def test_steady_state_never_settles():
+    assert thermal.steady_state([100, 300, 100, 300, 100, 300], sustained=200) is None
+    assert thermal.steady_state([100, 100, 100], sustained=100) == 0
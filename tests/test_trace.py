@@ -0,0 +1,126 @@
+import pytest
+
+from batben import noise, trace
+from batben.recording import Recorder, Recording
+
+
+def _proc(fake_sysfs, pid, comm, ticks, minflt, switches, io=None):
+    # proc(5) fields 3 onwards: state ppid pgrp session tty tpgid flags minflt cminflt majflt cmajflt utime stime
+    # cutime cstime priority nice num_threads itrealvalue starttime vsize
+    rest = f"S 1 1 1 0 -1 0 {minflt} 0 0 0 {ticks} 0 0 0 20 0 1 0 500 0"
+    attrs = {
+        "stat": f"{pid} ({comm}) {rest}",
+        "status": f"Name:\t{comm}\nvoluntary_ctxt_switches:\t{switches}\nnonvoluntary_ctxt_switches:\t1\n",
+    }
+    if io is not None:
+        attrs["io"] = f"rchar: 0\nread_bytes: {io[0]}\nwrite_bytes: {io[1]}\n"
+    fake_sysfs(f"proc/{pid}", attrs)
+
+
+def test_read_process(fake_sysfs):
+    _proc(fake_sysfs, 42, "Web Content (x)", 250, 1000, 9, io=(4096, 8192))
+    sample = trace.read_process(str(fake_sysfs.root / "proc/42"))
+    assert sample.comm == "Web Content (x)"
+    assert sample.cpu_s == pytest.approx(250 / noise._TICK)
+    assert (sample.minor_faults, sample.read_bytes, sample.write_bytes, sample.switches) == (1000, 4096, 8192, 10)
+
+
+def test_read_processes_skips_unreadable(fake_sysfs):
+    _proc(fake_sysfs, 1, "systemd", 10, 0, 0)
+    _proc(fake_sysfs, 2, "kthreadd", 10, 0, 0)
+    fake_sysfs("proc/3", {})  # exited while we were looking
+    fake_sysfs("proc/self", {})
+    assert set(trace.read_processes(str(fake_sysfs.root / "proc"), exclude={2})) == {1}
+
+
+def test_activity_delta():
+    a = trace.ProcSample("code", 1.0, 100, 0, 0, 10)
+    before = {1: a, 2: trace.ProcSample("old", 5.0, 0, 0, 0, 0)}
+    after = {
+        1: trace.ProcSample("code", 1.5, 164, 4096, 0, 30),
+        2: trace.ProcSample("new", 0.2, 0, 0, 0, 3),  # pid reused
+        3: trace.ProcSample("spawned", 0.1, 10, 0, 0, 1),
+    }
+    delta = trace.activity_delta(before, after)
+    assert delta[1] == trace.ProcSample("code", 0.5, 64, 4096, 0, 20)
+    assert delta[2].cpu_s == pytest.approx(0.2)
+    assert delta[3].minor_faults == 10
+
+
+def test_record_trace(fake_sysfs, tmp_path):
+    _proc(fake_sysfs, 10, "code", 0, 0, 0, io=(0, 0))
+    now = [100.0]
+
+    def wait(seconds):
+        # one second of activity in the editor per interval
+        now[0] += seconds
+        ticks = int(now[0] - 100) * noise._TICK // 4
+        _proc(fake_sysfs, 10, "code", ticks, int(now[0] - 100) * 128, int(now[0] - 100) * 50, io=(0, 0))
+
+    path = str(tmp_path / "session.trace")
+    rows = trace.record_trace(
+        path, 3, proc_root=str(fake_sysfs.root / "proc"), clock=lambda: now[0], wait=wait, quantum_us=100.0
+    )
+    assert rows == 3
+    with Recording(path) as rec:
+        assert rec.meta["kind"] == "trace"
+        assert rec.column("t").tolist() == [100.0, 101.0, 102.0]
+        assert rec.column("cpu_s").tolist() == pytest.approx([0.25] * 3)
+        assert rec.column("minor_faults").tolist() == [128.0] * 3
+        assert rec.column("wakeups").tolist() == [50.0] * 3
+        assert rec.events[-1].data["cpu_s"] == {"code": 0.75}
+
+
+def _trace(path, rows, interval=1.0, quantum_us=100.0):
+    with Recorder(
+        path, trace.TRACE_COLUMNS, meta={"kind": "trace", "interval": interval, "quantum_us": quantum_us}
+    ) as r:
+        for row in rows:
+            r.append(row)
+
+
+def test_build_schedule(tmp_path):
+    path = str(tmp_path / "t.trace")
+    _trace(
+        path,
+        [
+            (0.0, 0.001, 128, 0, 65536 * 3, 4),  # 10 cpu quanta, 2 mem, 3 io over 4 wakeups
+            (1.0, 0.0, 0, 0, 0, 0),  # idle
+            (2.0, 0.0, 0, 0, 0, 1000),  # timer storm: capped, and no work in the wakeups
+        ],
+    )
+    with Recording(path) as rec:
+        schedule = trace.build_schedule(rec, max_wakeups=5)
+    first = [b for b in schedule if b.at < 1]
+    assert [b.at for b in first] == [0.0, 0.25, 0.5, 0.75]
+    assert [b.cpu for b in first] == [3, 3, 2, 2]
+    assert sum(b.mem for b in first) == 2 and sum(b.io for b in first) == 3
+    storm = [b for b in schedule if b.at >= 2]
+    assert len(storm) == 5
+    assert all(b.cpu == b.mem == b.io == 0 for b in storm)
+
+
+def test_play_keeps_the_timeline():
+    bursts = [trace.Burst(0.0, 2, 1, 0), trace.Burst(0.02, 1, 0, 0)]
+    quanta, events, late = trace._play(bursts, trace.time.monotonic())
+    assert quanta == 4
+    assert events > 0
+    assert len(late) == 2
+
+
+def test_replay_trace(tmp_path):
+    path = str(tmp_path / "t.trace")
+    _trace(path, [(0.0, 0.002, 64, 0, 0, 10)], interval=0.2, quantum_us=100.0)
+    result = trace.replay_trace(path, workers=1)
+    assert result.bursts == 10
+    assert result.quanta == 21  # 20 cpu + 1 mem
+    assert result.duration >= 0.2
+    assert "perf score of     events per second" in result.report()
+
+
+def test_replay_rejects_other_recordings(tmp_path):
+    path = str(tmp_path / "run.rec")
+    with Recorder(path, ["t", "power_w"]) as r:
+        r.append((0.0, 1.0))
+    with pytest.raises(ValueError, match="isn't a trace"):
+        trace.replay_trace(path)
@@ -317,3 +317,8 @@ def test_net_task_failure(mock_get, monkeypatch, capsys):
     # Assert the decorator output
     expected_output_end = "NET: 0 events in 1.00s (0.00 events/sec)\n"
     assert captured.out.strip().endswith(expected_output_end.strip())
+
+
+def test_events_per_second_keeps_the_undecorated_function():
+    """The shim wraps with functools.wraps, so the harness can run the bare task."""
+    assert workload.cpu_task.__wrapped__(num_primes=10) == 4